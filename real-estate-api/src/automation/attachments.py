@@ -0,0 +1,121 @@
+"""
+Attachment Encoding Cache
+Streams attachments through base64 in chunks and keeps the encoded payloads
+in a bounded LRU cache keyed by content hash, so a file sent to many
+recipients is read and encoded once
+"""
+import base64
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from email.mime.base import MIMEBase
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 57 raw bytes encode to one 76-character base64 line, so chunks of whole
+# lines give the same output as encoding the file in one piece
+CHUNK_SIZE = 57 * 1024
+
+class AttachmentCache:
+    """
+    Encoded attachment payloads by SHA-256 of the file content, evicted least
+    recently used once they exceed `max_bytes`. A (path, size, mtime) map
+    remembers each file's digest, so an unchanged file is not even re-read.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_files: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.payloads = OrderedDict()
+        self.digests = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _file_key(self, path: str) -> Tuple[str, int, int]:
+        """Identity of a file version: a rewrite changes its size or mtime"""
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    def _encode(self, path: str) -> Tuple[str, str]:
+        """Hash and base64-encode a file in one streamed pass. Returns (digest, payload)."""
+        digest = hashlib.sha256()
+        chunks = []
+
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                chunks.append(base64.encodebytes(chunk).decode('ascii'))
+
+        return digest.hexdigest(), ''.join(chunks)
+
+    def encoded_payload(self, path: str) -> str:
+        """Base64 payload of a file, from the cache when its content was encoded before"""
+        file_key = self._file_key(path)
+
+        with self.lock:
+            digest = self.digests.get(file_key)
+            payload = self.payloads.get(digest) if digest else None
+            if payload is not None:
+                self.payloads.move_to_end(digest)
+                self.digests.move_to_end(file_key)
+                self.stats['hits'] += 1
+                return payload
+
+        digest, payload = self._encode(path)
+
+        with self.lock:
+            self.stats['misses'] += 1
+            self.digests[file_key] = digest
+            self.digests.move_to_end(file_key)
+            while len(self.digests) > self.max_files:
+                self.digests.popitem(last=False)
+
+            if digest not in self.payloads and len(payload) <= self.max_bytes:
+                self.payloads[digest] = payload
+                self.size += len(payload)
+                while self.size > self.max_bytes:
+                    _, evicted = self.payloads.popitem(last=False)
+                    self.size -= len(evicted)
+                    self.stats['evictions'] += 1
+
+        return payload
+
+    def mime_part(self, path: str) -> MIMEBase:
+        """A new attachment part for a file, sharing the cached encoded payload"""
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(self.encoded_payload(path))
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename= {os.path.basename(path)}'
+        )
+        return part
+
+    def clear(self):
+        """Drop every cached payload"""
+        with self.lock:
+            self.payloads.clear()
+            self.digests.clear()
+            self.size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size and hit counters"""
+        with self.lock:
+            return {
+                'entries': len(self.payloads),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                **self.stats
+            }
+
+# Global attachment cache instance
+attachment_cache = AttachmentCache(
+    max_bytes=int(os.environ.get('ATTACHMENT_CACHE_MB', 64)) * 1024 * 1024
+)
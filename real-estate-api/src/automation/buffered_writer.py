@@ -0,0 +1,120 @@
+"""
+Buffered Insert Writer
+Collects rows in memory and writes them with batched INSERTs by size or time,
+so logging a row never costs its own transaction
+"""
+import atexit
+import logging
+import threading
+from typing import Dict, List, Any
+from sqlalchemy.exc import DBAPIError, OperationalError, InterfaceError
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+class BufferedInsertWriter:
+    """
+    Buffers row dicts for one model and bulk-inserts them from a background thread
+    once `batch_size` rows are waiting or `flush_interval` seconds pass. Rows still
+    buffered at interpreter exit are flushed synchronously.
+    """
+
+    def __init__(self, model, app=None, batch_size: int = 1000, flush_interval: float = 1.0):
+        self.model = model
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        self.flusher_thread = None
+        self.rows_written = 0
+        atexit.register(self._flush_at_exit)
+
+    def add(self, row: Dict[str, Any]):
+        """Queue one row for the next batch insert"""
+        self.add_many([row])
+
+    def add_many(self, rows: List[Dict[str, Any]]):
+        """Queue several rows for the next batch insert"""
+        with self.lock:
+            self.buffer.extend(rows)
+            full = len(self.buffer) >= self.batch_size
+
+            if not self.flusher_thread or not self.flusher_thread.is_alive():
+                self.flusher_thread = threading.Thread(target=self._run_flusher, daemon=True)
+                self.flusher_thread.start()
+
+        if full:
+            self.flush_event.set()
+
+    def _run_flusher(self):
+        """Flush on a timer, or early when a batch fills up"""
+        while True:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error writing {self.model.__tablename__} rows: {e}")
+
+    def flush(self) -> int:
+        """Write all buffered rows with batched INSERTs. Returns the number written."""
+        with self.flush_lock:
+            with self.lock:
+                rows, self.buffer = self.buffer, []
+
+            if not rows:
+                return 0
+
+            with self.app.app_context():
+                try:
+                    self._insert(rows)
+                except (OperationalError, InterfaceError):
+                    # Database unavailable or locked: put the rows back for the next flush
+                    db.session.rollback()
+                    with self.lock:
+                        self.buffer[:0] = rows
+                    raise
+                except DBAPIError as e:
+                    # Some row is bad; write the rest one by one and drop the offenders
+                    db.session.rollback()
+                    logger.error(f"Batch insert into {self.model.__tablename__} failed, retrying row by row: {e}")
+                    rows = self._insert_individually(rows)
+
+            self.rows_written += len(rows)
+            return len(rows)
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        """Insert rows as plain Core executemany batches in one transaction"""
+        table = self.model.__table__
+        connection = db.session.connection()
+        for start in range(0, len(rows), self.batch_size):
+            connection.execute(table.insert(), rows[start:start + self.batch_size])
+        db.session.commit()
+
+    def _insert_individually(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert rows one at a time, skipping any the database rejects. Returns the rows written."""
+        written = []
+        for row in rows:
+            try:
+                self._insert([row])
+                written.append(row)
+            except DBAPIError as e:
+                db.session.rollback()
+                logger.error(f"Dropped {self.model.__tablename__} row rejected by the database: {e.orig}")
+        return written
+
+    def _flush_at_exit(self):
+        """Last-chance synchronous flush when the process exits"""
+        if self.buffer and self.app:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error writing {self.model.__tablename__} rows at exit: {e}")
+
+    def pending(self) -> int:
+        """Rows buffered and not yet written"""
+        with self.lock:
+            return len(self.buffer)
@@ -0,0 +1,331 @@
+"""
+Campaign Executor
+Sends a marketing campaign's email to its target audience. Recipients are
+streamed from leads and clients in keyset-paginated chunks, rendered and sent
+through a generator pipeline, and checkpointed per chunk so memory stays
+bounded and an interrupted send resumes where it stopped
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import make_msgid
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional
+from src.models.user import db
+from src.models.lead import Lead
+from src.models.client import Client
+from src.models.marketing_campaign import MarketingCampaign
+from src.models.campaign_run import CampaignRun
+from src.automation.leader import LeaderElection
+from src.automation.rate_limit import TokenBucket
+from src.automation.report_metrics import ACTIVE_LEAD_STATUSES
+from src.automation.templates import CompiledTemplate
+from src.automation.communication_log import communication_log
+from src.automation.email_service import email_service
+from src.automation.tracking import add_tracking, tracking_base_url
+from src.automation.suppression import normalize_email, permanent_bounce
+
+logger = logging.getLogger(__name__)
+
+# Variables a campaign template may use
+CAMPAIGN_VARIABLES = frozenset({
+    'first_name', 'last_name', 'full_name', 'email', 'recipient_type',
+    'campaign_name', 'company_name'
+})
+
+class Recipient(NamedTuple):
+    recipient_type: str  # Lead or Client
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+
+class CampaignMessage(NamedTuple):
+    recipient: Recipient
+    subject: str
+    body: str
+    message_id: str
+    html_body: Optional[str] = None
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of up to `size` items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class CampaignExecutor:
+    """
+    Runs email campaigns. Only one process sends a given campaign at a time,
+    guarded by a named lease that is renewed at every checkpoint. Each chunk is
+    sent concurrently over the pooled SMTP transport, paced by a token bucket,
+    and then committed in one transaction: the keyset checkpoint, the run's
+    progress and the campaign's emails_sent / emails_delivered increments.
+    """
+
+    def __init__(self, email_service, chunk_size: int = 500, rate_per_second: float = 10,
+                 lease_seconds: int = 300, workers: int = None):
+        self.email_service = email_service
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.workers = workers or email_service.pool_size
+        self.limiter = TokenBucket(rate_per_second)
+
+    def compile_template(self, campaign: MarketingCampaign) -> CompiledTemplate:
+        """Compile the campaign's email template. Raises TemplateError if it is invalid."""
+        return CompiledTemplate(
+            f'campaign_{campaign.id}',
+            campaign.campaign_name,
+            campaign.email_template or '',
+            allowed_variables=CAMPAIGN_VARIABLES
+        )
+
+    def run(self, campaign_id: int, resend: bool = False) -> Optional[CampaignRun]:
+        """
+        Send a campaign, resuming its unfinished run if there is one. A campaign
+        that was already sent is only sent again with `resend`. Returns the run,
+        or None if another process is already sending the campaign.
+        Raises ValueError if the campaign cannot be sent.
+        """
+        campaign = db.session.get(MarketingCampaign, campaign_id)
+        if not campaign:
+            raise ValueError(f"Campaign {campaign_id} not found")
+        if campaign.campaign_type != 'Email' or not campaign.email_template:
+            raise ValueError(f"Campaign {campaign_id} has no email to send")
+        if campaign.campaign_status != 'Active':
+            raise ValueError(f"Campaign {campaign_id} is {campaign.campaign_status}, not Active")
+
+        template = self.compile_template(campaign)
+
+        lease = LeaderElection(f'campaign:{campaign_id}', self.lease_seconds)
+        if not lease.acquire():
+            logger.info(f"Campaign {campaign_id} is already being sent by another worker")
+            return None
+
+        run = CampaignRun.query.filter(
+            CampaignRun.campaign_id == campaign_id
+        ).order_by(CampaignRun.id.desc()).first()
+        if run is not None and run.status == 'Completed':
+            if not resend:
+                lease.release()
+                raise ValueError(f"Campaign {campaign_id} was already sent")
+            run = None
+        if run is None:
+            run = CampaignRun(campaign_id=campaign_id, last_lead_id=0, last_client_id=0,
+                              recipients_sent=0, recipients_delivered=0, recipients_failed=0)
+            db.session.add(run)
+        run.status = 'Running'
+        db.session.commit()
+
+        logger.info(f"Sending campaign {campaign_id} (run {run.id}) from lead {run.last_lead_id}, client {run.last_client_id}")
+
+        try:
+            messages = self._render(campaign, template, self._deliverable(self._audience(campaign, run)))
+
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='campaign') as pool:
+                for chunk in _batches(messages, self.chunk_size):
+                    errors = list(pool.map(self._send, chunk))
+                    self._checkpoint(campaign, run, chunk, errors)
+
+                    if not lease.acquire():
+                        logger.warning(f"Lost the send lease for campaign {campaign_id}, stopping")
+                        return run
+                    if self._campaign_status(campaign_id) != 'Active':
+                        run.status = 'Paused'
+                        db.session.commit()
+                        logger.info(f"Campaign {campaign_id} paused after {run.recipients_sent} recipients")
+                        return run
+
+            run.status = 'Completed'
+            run.finished_date = datetime.utcnow()
+            db.session.commit()
+            logger.info(f"Campaign {campaign_id} sent to {run.recipients_sent} recipients, {run.recipients_failed} failed")
+            return run
+
+        except Exception as e:
+            db.session.rollback()
+            run.status = 'Failed'
+            run.last_error = str(e)
+            db.session.commit()
+            raise
+
+        finally:
+            lease.release()
+
+    def _audience(self, campaign: MarketingCampaign, run: CampaignRun) -> Iterator[Recipient]:
+        """Stream matching leads, then clients, after the run's checkpoint. Reads one page at a time."""
+        lead_filters, client_filters = self._audience_filters(campaign)
+
+        for recipient_type, model, last_id, filters in (
+            ('Lead', Lead, run.last_lead_id or 0, lead_filters),
+            ('Client', Client, run.last_client_id or 0, client_filters)
+        ):
+            while True:
+                rows = db.session.query(
+                    model.id, model.email, model.first_name, model.last_name
+                ).filter(
+                    model.id > last_id,
+                    *filters
+                ).order_by(model.id).limit(self.chunk_size).all()
+
+                if not rows:
+                    break
+                for row in rows:
+                    yield Recipient(recipient_type, row.id, row.email, row.first_name, row.last_name)
+                last_id = rows[-1].id
+
+    def _audience_filters(self, campaign: MarketingCampaign):
+        """
+        Lead and client filters for the campaign's targeting. `target_audience`
+        narrows to buyers or sellers when it names one of them, and
+        `geographic_targeting` (a JSON list of areas) to matching preferred areas.
+        Converted leads are skipped since they are reached as clients.
+        """
+        lead_filters = [Lead.lead_status.in_(ACTIVE_LEAD_STATUSES), Lead.email.isnot(None), Lead.email != '']
+        client_filters = [Client.client_status == 'Active', Client.email.isnot(None), Client.email != '']
+
+        audience = (campaign.target_audience or '').lower()
+        buyers, sellers = 'buyer' in audience, 'seller' in audience
+        if buyers != sellers:
+            lead_filters.append(Lead.property_interest.in_(['Buying', 'Both'] if buyers else ['Selling', 'Both']))
+            client_filters.append(Client.client_type.in_(['Buyer', 'Both'] if buyers else ['Seller', 'Both']))
+
+        if campaign.geographic_targeting:
+            try:
+                areas = json.loads(campaign.geographic_targeting)
+            except ValueError:
+                areas = None
+            if isinstance(areas, list) and areas:
+                lead_filters.append(db.or_(*[Lead.preferred_areas.ilike(f'%{area}%') for area in areas]))
+                client_filters.append(db.or_(*[Client.preferred_areas.ilike(f'%{area}%') for area in areas]))
+            else:
+                logger.warning(f"Ignoring geographic targeting of campaign {campaign.id}: expected a JSON list of areas")
+
+        return lead_filters, client_filters
+
+    def _deliverable(self, recipients: Iterable[Recipient]) -> Iterator[Recipient]:
+        """Drop suppressed addresses, a chunk at a time, before anything is rendered"""
+        for batch in _batches(recipients, self.chunk_size):
+            suppressed = self.email_service.suppressions.suppressed(recipient.email for recipient in batch)
+            for recipient in batch:
+                if normalize_email(recipient.email) not in suppressed:
+                    yield recipient
+
+    def _render(self, campaign: MarketingCampaign, template: CompiledTemplate,
+                recipients: Iterable[Recipient]) -> Iterator[CampaignMessage]:
+        """
+        Personalise the campaign email for each recipient as it streams past.
+        With TRACKING_BASE_URL set, links are tracked and an open pixel is added.
+        """
+        company_name = (campaign.created_by.brokerage_name if campaign.created_by else None) or 'Premier Realty Group'
+        domain = self.email_service.message_id_domain
+        base_url = tracking_base_url()
+        shared = {'campaign_name': campaign.campaign_name, 'company_name': company_name}
+
+        for recipient in recipients:
+            subject, body = template.render({
+                **shared,
+                'first_name': recipient.first_name,
+                'last_name': recipient.last_name,
+                'full_name': f"{recipient.first_name} {recipient.last_name}",
+                'email': recipient.email,
+                'recipient_type': recipient.recipient_type
+            })
+            message_id = make_msgid(domain=domain)
+            if base_url:
+                body, html_body = add_tracking(body, message_id, base_url)
+                yield CampaignMessage(recipient, subject, body, message_id, html_body)
+            else:
+                yield CampaignMessage(recipient, subject, body, message_id)
+
+    def _send(self, message: CampaignMessage) -> Optional[Exception]:
+        """Deliver one message at the campaign's rate. Runs in a pool thread; returns the error, if any."""
+        self.limiter.acquire()
+        try:
+            self.email_service.deliver_email(
+                message.recipient.email,
+                message.subject,
+                message.body,
+                message_id=message.message_id,
+                html_body=message.html_body
+            )
+            return None
+        except Exception as e:
+            logger.warning(f"Campaign email to {message.recipient.email} failed: {e}")
+            return e
+
+    def _checkpoint(self, campaign: MarketingCampaign, run: CampaignRun,
+                    chunk: List[CampaignMessage], errors: List[Optional[Exception]]):
+        """
+        Record a sent chunk: counters, keyset position, communications and
+        suppressions for permanent bounces, in one commit
+        """
+        delivered = errors.count(None)
+        bounced = []
+        communications = []
+        now = datetime.utcnow()
+
+        for message, error in zip(chunk, errors):
+            recipient = message.recipient
+            if error is not None and permanent_bounce(error, recipient.email):
+                bounced.append(recipient.email)
+
+            communications.append({
+                'subject': message.subject,
+                'content': message.body,
+                'status': 'Sent' if error is None else 'Failed',
+                'external_id': message.message_id,
+                'user_id': campaign.created_by_id,
+                'lead_id': recipient.id if recipient.recipient_type == 'Lead' else None,
+                'client_id': recipient.id if recipient.recipient_type == 'Client' else None,
+                'campaign_id': campaign.id,
+                'automation_trigger': 'campaign_send'
+            })
+
+            if recipient.recipient_type == 'Lead':
+                run.last_lead_id = max(run.last_lead_id or 0, recipient.id)
+            else:
+                run.last_client_id = max(run.last_client_id or 0, recipient.id)
+
+        # Written in this transaction, not through the buffer, so a chunk's
+        # communications exist exactly when its checkpoint does
+        communication_log.write(communications)
+
+        run.recipients_sent += len(chunk)
+        run.recipients_delivered += delivered
+        run.recipients_failed += len(chunk) - delivered
+        run.checkpoint_date = now
+
+        MarketingCampaign.query.filter(MarketingCampaign.id == campaign.id).update({
+            'emails_sent': db.func.coalesce(MarketingCampaign.emails_sent, 0) + len(chunk),
+            'emails_delivered': db.func.coalesce(MarketingCampaign.emails_delivered, 0) + delivered
+        }, synchronize_session=False)
+
+        if bounced:
+            self.email_service.suppressions.add_many(bounced, 'Bounced', 'Permanent bounce during campaign send')
+
+        db.session.commit()
+
+    def _campaign_status(self, campaign_id: int) -> Optional[str]:
+        """Current status straight from the database, so a pause takes effect mid-send"""
+        return db.session.query(MarketingCampaign.campaign_status).filter(
+            MarketingCampaign.id == campaign_id
+        ).scalar()
+
+    def get_stats(self, campaign_id: int) -> Dict[str, Any]:
+        """Runs of a campaign, newest first"""
+        runs = CampaignRun.query.filter(
+            CampaignRun.campaign_id == campaign_id
+        ).order_by(CampaignRun.id.desc()).all()
+        return {'campaign_id': campaign_id, 'runs': [run.to_dict() for run in runs]}
+
+# Global campaign executor, sending through the shared email service's SMTP pool
+campaign_executor = CampaignExecutor(
+    email_service,
+    chunk_size=int(os.environ.get('CAMPAIGN_CHUNK_SIZE', 500)),
+    rate_per_second=float(os.environ.get('CAMPAIGN_SEND_RATE', 10))
+)
@@ -0,0 +1,62 @@
+"""
+Communication Log
+Bulk logging of sent communications for high-volume sends. Rows are written
+with one executemany INSERT in the caller's transaction, so they commit or
+roll back together with the sends they record.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Any
+from src.models.user import db
+from src.models.communication import Communication
+
+logger = logging.getLogger(__name__)
+
+# Every row carries the same keys so a batch is one executemany
+COMMUNICATION_DEFAULTS = {
+    'communication_type': 'Email',
+    'direction': 'Outbound',
+    'subject': None,
+    'content': None,
+    'status': 'Sent',
+    'priority': 'Normal',
+    'is_automated': True,
+    'automation_trigger': None,
+    'follow_up_required': False,
+    'opened': False,
+    'clicked': False,
+    'replied': False,
+    'external_id': None,
+    'user_id': None,
+    'lead_id': None,
+    'client_id': None,
+    'transaction_id': None,
+    'campaign_id': None
+}
+
+LOGGED_FIELDS = frozenset(COMMUNICATION_DEFAULTS) | {'sent_date'}
+
+class CommunicationLog:
+    """Completes Communication rows with the usual automated email defaults and inserts them in bulk"""
+
+    def write(self, entries: List[Dict[str, Any]]):
+        """
+        Insert communications in the caller's session with one statement; the
+        caller commits them with the rest of its transaction
+        """
+        if entries:
+            db.session.execute(db.insert(Communication), [self._row(fields) for fields in entries])
+
+    def _row(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Complete a row with defaults, rejecting unknown columns"""
+        if not fields.keys() <= LOGGED_FIELDS:
+            unknown = sorted(set(fields) - LOGGED_FIELDS)
+            raise ValueError(f"Unknown communication fields: {', '.join(unknown)}")
+
+        row = dict(COMMUNICATION_DEFAULTS)
+        row.update(fields)
+        row.setdefault('sent_date', datetime.now())
+        return row
+
+# Global communication log instance
+communication_log = CommunicationLog()
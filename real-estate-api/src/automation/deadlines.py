@@ -0,0 +1,240 @@
+"""
+Deadline Index
+In-memory min-heap of upcoming lead follow-ups and transaction milestones,
+so the scheduler can sleep until the next one comes due. Writers in any
+process record changed deadlines in a change table within their own
+transaction; the scheduler applies them with a short indexed poll.
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime, date, time
+from typing import Dict, List, Optional, Iterable
+from src.models.user import db
+from src.models.lead import Lead
+from src.models.transaction import TransactionMilestone
+from src.models.deadline_change import DeadlineChange
+
+logger = logging.getLogger(__name__)
+
+LEAD_FOLLOW_UP = 'lead_follow_up'
+MILESTONE = 'milestone'
+
+ACTIVE_LEAD_STATUSES = ['New', 'Contacted', 'Qualified', 'Nurturing']
+OPEN_MILESTONE_STATUSES = ['Pending', 'In Progress']
+
+def _due_at(due_date: date) -> datetime:
+    """Deadlines are dates; an item becomes due at the start of that day"""
+    return datetime.combine(due_date, time.min)
+
+class DeadlineIndex:
+    """
+    Min-heap of (due_at, kind, entity_id). Rescheduled or removed entries are
+    left in the heap and skipped when they surface (lazy deletion), with the
+    live due time per entity kept in `current`.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.current = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+
+    def load(self):
+        """Rebuild the index from the database. Requires an app context."""
+        leads = db.session.query(Lead.id, Lead.next_follow_up).filter(
+            Lead.next_follow_up.isnot(None),
+            Lead.lead_status.in_(ACTIVE_LEAD_STATUSES)
+        ).all()
+
+        milestones = db.session.query(TransactionMilestone.id, TransactionMilestone.due_date).filter(
+            TransactionMilestone.due_date.isnot(None),
+            TransactionMilestone.milestone_status.in_(OPEN_MILESTONE_STATUSES)
+        ).all()
+
+        current = {}
+        for lead_id, due_date in leads:
+            current[(LEAD_FOLLOW_UP, lead_id)] = _due_at(due_date)
+        for milestone_id, due_date in milestones:
+            current[(MILESTONE, milestone_id)] = _due_at(due_date)
+
+        heap = [(due_at, kind, entity_id) for (kind, entity_id), due_at in current.items()]
+        heapq.heapify(heap)
+
+        with self.lock:
+            self.heap = heap
+            self.current = current
+            self.loaded = True
+
+        self.changed.set()
+        logger.info(f"Deadline index loaded {len(leads)} follow-ups and {len(milestones)} milestones")
+
+    def unload(self):
+        """Drop the index when this process stops running the scheduler"""
+        with self.lock:
+            self.heap = []
+            self.current = {}
+            self.loaded = False
+
+    def notify(self, kind: str, entity_ids: Iterable[int]):
+        """
+        Record that entities' deadlines may have changed. The rows are added to the
+        caller's session and commit or roll back with the change itself; the
+        scheduler picks them up on its next poll, whichever process it runs in.
+        """
+        rows = [{'kind': kind, 'entity_id': entity_id, 'created_date': datetime.utcnow()} for entity_id in entity_ids]
+        if rows:
+            db.session.execute(db.insert(DeadlineChange), rows)
+
+    def lead_changed(self, *lead_ids: int):
+        """Record leads whose follow-up date or status changed"""
+        self.notify(LEAD_FOLLOW_UP, lead_ids)
+
+    def milestone_changed(self, *milestone_ids: int):
+        """Record milestones whose due date or status changed"""
+        self.notify(MILESTONE, milestone_ids)
+
+    def apply_changes(self, limit: int = 1000) -> int:
+        """
+        Apply recorded changes to the loaded index: re-read the current deadline of
+        each changed entity, reschedule it, and delete the change rows applied.
+        Returns the number of rows applied. Requires an app context; does nothing
+        in a process that has not loaded the index.
+        """
+        if not self.loaded:
+            return 0
+
+        changes = db.session.query(DeadlineChange.id, DeadlineChange.kind, DeadlineChange.entity_id).order_by(
+            DeadlineChange.id
+        ).limit(limit).all()
+        if not changes:
+            db.session.rollback()
+            return 0
+
+        lead_ids = {entity_id for _, kind, entity_id in changes if kind == LEAD_FOLLOW_UP}
+        milestone_ids = {entity_id for _, kind, entity_id in changes if kind == MILESTONE}
+
+        leads = {}
+        if lead_ids:
+            leads = {
+                lead_id: (next_follow_up, status) for lead_id, next_follow_up, status in db.session.query(
+                    Lead.id, Lead.next_follow_up, Lead.lead_status
+                ).filter(Lead.id.in_(lead_ids))
+            }
+        milestones = {}
+        if milestone_ids:
+            milestones = {
+                milestone_id: (due_date, status) for milestone_id, due_date, status in db.session.query(
+                    TransactionMilestone.id, TransactionMilestone.due_date, TransactionMilestone.milestone_status
+                ).filter(TransactionMilestone.id.in_(milestone_ids))
+            }
+
+        # Deleted entities are absent from the lookups and drop out of the index
+        for lead_id in lead_ids:
+            self.schedule_lead(lead_id, *leads.get(lead_id, (None, None)))
+        for milestone_id in milestone_ids:
+            self.schedule_milestone(milestone_id, *milestones.get(milestone_id, (None, None)))
+
+        db.session.execute(db.delete(DeadlineChange).where(DeadlineChange.id.in_([row[0] for row in changes])))
+        db.session.commit()
+        return len(changes)
+
+    def purge(self, created_before: datetime) -> int:
+        """Delete change rows no scheduler consumed, e.g. while no engine ran"""
+        deleted = DeadlineChange.query.filter(DeadlineChange.created_date < created_before).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def schedule(self, kind: str, entity_id: int, due_date: Optional[date]):
+        """Add, move or (with due_date=None) remove an entity's deadline in this process's index"""
+        if not self.loaded:
+            # Nothing in this process consumes the index until the engine loads it
+            return
+
+        with self.lock:
+            if due_date is None:
+                self.current.pop((kind, entity_id), None)
+                return
+
+            due_at = _due_at(due_date)
+            if self.current.get((kind, entity_id)) == due_at:
+                return
+
+            earliest = self._peek()
+            self.current[(kind, entity_id)] = due_at
+            heapq.heappush(self.heap, (due_at, kind, entity_id))
+
+            # Compact once stale entries outnumber live ones
+            if len(self.heap) > 2 * len(self.current) + 1000:
+                self.heap = [(due, k, i) for (k, i), due in self.current.items()]
+                heapq.heapify(self.heap)
+
+        # Wake the scheduler if this deadline is now the next one
+        if earliest is None or due_at < earliest:
+            self.changed.set()
+
+    def schedule_lead(self, lead_id: int, next_follow_up: Optional[date], lead_status: str = None):
+        """Track a lead's next follow-up while the lead is active"""
+        if lead_status is not None and lead_status not in ACTIVE_LEAD_STATUSES:
+            next_follow_up = None
+        self.schedule(LEAD_FOLLOW_UP, lead_id, next_follow_up)
+
+    def schedule_milestone(self, milestone_id: int, due_date: Optional[date], milestone_status: str = None):
+        """Track a milestone's due date while the milestone is open"""
+        if milestone_status is not None and milestone_status not in OPEN_MILESTONE_STATUSES:
+            due_date = None
+        self.schedule(MILESTONE, milestone_id, due_date)
+
+    def _peek(self) -> Optional[datetime]:
+        """Earliest live deadline, discarding stale heap entries. Caller holds the lock."""
+        while self.heap:
+            due_at, kind, entity_id = self.heap[0]
+            if self.current.get((kind, entity_id)) == due_at:
+                return due_at
+            heapq.heappop(self.heap)
+        return None
+
+    def next_due(self) -> Optional[datetime]:
+        """When the next deadline comes due, or None if nothing is scheduled"""
+        with self.lock:
+            return self._peek()
+
+    def pop_due(self, now: datetime = None) -> Dict[str, List[int]]:
+        """Remove and return every entity whose deadline has passed, grouped by kind"""
+        now = now or datetime.now()
+        due = {LEAD_FOLLOW_UP: [], MILESTONE: []}
+
+        with self.lock:
+            while True:
+                due_at = self._peek()
+                if due_at is None or due_at > now:
+                    break
+
+                _, kind, entity_id = heapq.heappop(self.heap)
+                del self.current[(kind, entity_id)]
+                due[kind].append(entity_id)
+
+        return due
+
+    def requeue(self, kind: str, entity_ids: Iterable[int], due_at: datetime):
+        """
+        Put back popped entities whose check failed, due again at `due_at`.
+        Entities rescheduled since they were popped keep their new deadline.
+        """
+        with self.lock:
+            if not self.loaded:
+                return
+            for entity_id in entity_ids:
+                key = (kind, entity_id)
+                if key not in self.current:
+                    self.current[key] = due_at
+                    heapq.heappush(self.heap, (due_at, kind, entity_id))
+
+        self.changed.set()
+
+    def __len__(self):
+        return len(self.current)
+
+# Global deadline index instance
+deadline_index = DeadlineIndex()
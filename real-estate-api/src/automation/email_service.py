@@ -2,41 +2,34 @@
 Email Automation Service
 Handles all email-related automation workflows
 """
+import os
+import json
+import hashlib
 import smtplib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from typing import List, Dict, Any, Optional
+from email.utils import make_msgid
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
 from src.models.user import db
 from src.models.communication import Communication
 from src.models.lead import Lead
 from src.models.client import Client
+from src.models.email_outbox import EmailOutbox
+from src.automation.smtp_pool import SMTPConnectionPool
+from src.automation.templates import template_registry, TemplateError
+from src.automation.attachments import attachment_cache
+from src.automation.rate_limit import SendThrottle, parse_domain_rates
+from src.automation.suppression import suppression_list, normalize_email
 
 logger = logging.getLogger(__name__)
 
-class EmailService:
-    """
-    Email automation service for sending automated emails
-    """
-    
-    def __init__(self, smtp_server: str = None, smtp_port: int = 587, 
-                 username: str = None, password: str = None):
-        self.smtp_server = smtp_server or "smtp.gmail.com"
-        self.smtp_port = smtp_port
-        self.username = username
-        self.password = password
-        self.templates = {}
-        self._load_default_templates()
-        
-    def _load_default_templates(self):
-        """Load default email templates"""
-        self.templates = {
-            'welcome_lead': {
-                'subject': 'Welcome to {company_name} - Let\'s Find Your Dream Home!',
-                'body': '''
+# Built-in templates, compiled once into the template registry at import
+DEFAULT_TEMPLATES = {
+    'welcome_lead': {
+        'subject': 'Welcome to {company_name} - Let\'s Find Your Dream Home!',
+        'body': '''
 Dear {first_name},
 
 Thank you for your interest in working with {company_name}! I'm {agent_name}, and I'm excited to help you with your real estate needs.
@@ -56,12 +49,12 @@ Best regards,
 {company_name}
 {agent_phone}
 {agent_email}
-                '''.strip()
-            },
-            
-            'lead_follow_up': {
-                'subject': 'Following up on your real estate inquiry - {first_name}',
-                'body': '''
+        '''.strip()
+    },
+    
+    'lead_follow_up': {
+        'subject': 'Following up on your real estate inquiry - {first_name}',
+        'body': '''
 Hi {first_name},
 
 I wanted to follow up on your recent inquiry about {property_interest} in {preferred_areas}. 
@@ -86,12 +79,12 @@ Best regards,
 {agent_name}
 {company_name}
 {agent_phone}
-                '''.strip()
-            },
-            
-            'hot_lead_alert': {
-                'subject': 'High-Priority Lead Alert: {first_name} {last_name}',
-                'body': '''
+        '''.strip()
+    },
+    
+    'hot_lead_alert': {
+        'subject': 'High-Priority Lead Alert: {first_name} {last_name}',
+        'body': '''
 URGENT: High-Priority Lead Identified
 
 Lead Details:
@@ -110,12 +103,12 @@ Recommended action: Contact within 1 hour for best conversion rates.
 Lead Notes: {notes}
 
 Take action now in the CRM system.
-                '''.strip()
-            },
-            
-            'transaction_milestone_reminder': {
-                'subject': 'Transaction Milestone Due: {milestone_name}',
-                'body': '''
+        '''.strip()
+    },
+    
+    'transaction_milestone_reminder': {
+        'subject': 'Transaction Milestone Due: {milestone_name}',
+        'body': '''
 Dear {agent_name},
 
 This is a reminder that the following transaction milestone is due:
@@ -135,12 +128,12 @@ Login to the CRM to update the milestone status.
 
 Best regards,
 Real Estate CRM System
-                '''.strip()
-            },
-            
-            'daily_report': {
-                'subject': 'Daily Real Estate Activity Report - {date}',
-                'body': '''
+        '''.strip()
+    },
+    
+    'daily_report': {
+        'subject': 'Daily Real Estate Activity Report - {date}',
+        'body': '''
 Daily Activity Report for {date}
 
 LEADS:
@@ -167,86 +160,299 @@ Login to your CRM for detailed analytics and next actions.
 
 Have a productive day!
 Real Estate CRM System
-                '''.strip()
-            }
-        }
+        '''.strip()
+    }
+}
+
+for _name, _template in DEFAULT_TEMPLATES.items():
+    template_registry.register(_name, _template['subject'], _template['body'])
+
+class EmailService:
+    """
+    Email automation service for sending automated emails
+    """
+    
+    def __init__(self, smtp_server: str = None, smtp_port: int = None, 
+                 username: str = None, password: str = None,
+                 use_tls: bool = None, pool_size: int = None):
+        # Unset arguments fall back to SMTP_* environment variables. Without an
+        # SMTP server, emails are logged instead of sent.
+        self.smtp_server = smtp_server or os.environ.get('SMTP_SERVER')
+        self.smtp_port = smtp_port or int(os.environ.get('SMTP_PORT', 587))
+        self.username = username or os.environ.get('SMTP_USERNAME')
+        self.password = password or os.environ.get('SMTP_PASSWORD')
+        self.use_tls = use_tls if use_tls is not None else os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
+        self.pool_size = pool_size or int(os.environ.get('SMTP_POOL_SIZE', 4))
+        self.message_id_domain = os.environ.get('SMTP_MESSAGE_ID_DOMAIN') or (
+            self.username.split('@')[-1] if self.username and '@' in self.username else 'nexusos.local'
+        )
+        self.pool = None
+        self.templates = template_registry
+        self.suppressions = suppression_list
         
-    def send_email(self, to_email: str, subject: str, body: str, 
-                   from_email: str = None, attachments: List[str] = None) -> bool:
-        """Send an email"""
-        try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = from_email or self.username
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add body
+        # Per-domain and global send budgets (messages per second; 0 disables)
+        self.throttle = SendThrottle(
+            global_rate=float(os.environ.get('EMAIL_SEND_RATE', 50)),
+            domain_rate=float(os.environ.get('EMAIL_DOMAIN_RATE', 10)),
+            domain_rates=parse_domain_rates(os.environ.get('EMAIL_DOMAIN_RATES'))
+        )
+        
+        if self.smtp_server:
+            self.pool = SMTPConnectionPool(
+                self.smtp_server,
+                self.smtp_port,
+                username=self.username,
+                password=self.password,
+                use_tls=self.use_tls,
+                use_ssl=self.smtp_port == 465,
+                pool_size=self.pool_size,
+                throttle=self.throttle
+            )
+        
+    def build_message(self, to_email: str, subject: str, body: str, from_email: str = None,
+                      attachments: List[str] = None, message_id: str = None,
+                      html_body: str = None) -> MIMEMultipart:
+        """Build the MIME message for an email, with an HTML alternative to the text if given"""
+        msg = MIMEMultipart()
+        msg['From'] = from_email or self.username
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        if message_id:
+            msg['Message-ID'] = message_id
+        
+        # Add body
+        if html_body:
+            alternative = MIMEMultipart('alternative')
+            alternative.attach(MIMEText(body, 'plain'))
+            alternative.attach(MIMEText(html_body, 'html'))
+            msg.attach(alternative)
+        else:
             msg.attach(MIMEText(body, 'plain'))
-            
-            # Add attachments if any
-            if attachments:
-                for file_path in attachments:
-                    try:
-                        with open(file_path, "rb") as attachment:
-                            part = MIMEBase('application', 'octet-stream')
-                            part.set_payload(attachment.read())
-                            
-                        encoders.encode_base64(part)
-                        part.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename= {file_path.split("/")[-1]}'
-                        )
-                        msg.attach(part)
-                    except Exception as e:
-                        logger.error(f"Error attaching file {file_path}: {e}")
-            
-            # Send email (in production, use real SMTP)
-            # For demo purposes, we'll just log the email
+        
+        # Add attachments if any
+        if attachments:
+            for file_path in attachments:
+                try:
+                    # Encoded once per file content and reused across messages
+                    msg.attach(attachment_cache.mime_part(file_path))
+                except Exception as e:
+                    logger.error(f"Error attaching file {file_path}: {e}")
+                    
+        return msg
+        
+    def deliver_email(self, to_email: str, subject: str, body: str, from_email: str = None,
+                      attachments: List[str] = None, message_id: str = None, html_body: str = None):
+        """Hand an email to the SMTP server right away. Raises if delivery fails."""
+        msg = self.build_message(to_email, subject, body, from_email, attachments, message_id, html_body)
+        
+        if self.pool:
+            self.pool.send(msg)
+            logger.info(f"EMAIL SENT TO: {to_email}")
+        else:
+            # No SMTP server configured; log the email instead
             logger.info(f"EMAIL SENT TO: {to_email}")
             logger.info(f"SUBJECT: {subject}")
             logger.info(f"BODY: {body[:200]}...")
             
+    def deliver_fanout(self, recipients: List[Tuple[str, str]], subject: str, body: str,
+                       from_email: str = None, attachments: List[str] = None) -> Dict[str, Exception]:
+        """
+        Deliver one message to many (to_email, message_id) recipients. The MIME
+        message is built once and sent over a single pooled session with only the
+        To and Message-ID headers changed per copy. Returns errors by address.
+        """
+        if not recipients:
+            return {}
+            
+        first_email, first_id = recipients[0]
+        msg = self.build_message(first_email, subject, body, from_email, attachments, first_id)
+        
+        if self.pool:
+            errors = self.pool.send_copies(msg, recipients)
+            logger.info(f"EMAIL SENT TO: {len(recipients) - len(errors)} of {len(recipients)} recipients")
+            return errors
+            
+        # No SMTP server configured; log the email instead
+        logger.info(f"EMAIL SENT TO: {', '.join(to_email for to_email, _ in recipients)}")
+        logger.info(f"SUBJECT: {subject}")
+        logger.info(f"BODY: {body[:200]}...")
+        return {}
+        
+    @staticmethod
+    def content_key(from_email: Optional[str], subject: str, body: str, attachments: Optional[str]) -> str:
+        """Hash identifying the shared content of an email, so the outbox can send copies together"""
+        digest = hashlib.sha256()
+        for value in (from_email, subject, body, attachments):
+            digest.update((value or '').encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+        
+    def send_email(self, to_email: str, subject: str, body: str, 
+                   from_email: str = None, attachments: List[str] = None,
+                   communication: Communication = None) -> bool:
+        """
+        Queue an email in the outbox as part of the current transaction.
+        The outbox sender delivers it once the transaction commits and records
+        the outcome on `communication`, if given. Suppressed addresses are skipped.
+        """
+        if self.suppressions.is_suppressed(to_email):
+            logger.info(f"Not emailing suppressed address {to_email}")
+            return False
+            
+        try:
+            from_email = from_email or self.username
+            attachments = json.dumps(attachments) if attachments else None
+            entry = EmailOutbox(
+                to_email=to_email,
+                from_email=from_email,
+                subject=subject,
+                body=body,
+                attachments=attachments,
+                message_id=make_msgid(domain=self.message_id_domain),
+                content_key=self.content_key(from_email, subject, body, attachments),
+                status='Pending',
+                attempts=0,
+                next_attempt=datetime.utcnow(),
+                communication=communication
+            )
+            db.session.add(entry)
+            
             return True
             
         except Exception as e:
-            logger.error(f"Error sending email to {to_email}: {e}")
+            logger.error(f"Error queueing email to {to_email}: {e}")
             return False
             
     def send_template_email(self, template_name: str, to_email: str, 
-                           variables: Dict[str, Any], from_email: str = None) -> bool:
-        """Send an email using a template"""
-        if template_name not in self.templates:
+                           variables: Dict[str, Any], from_email: str = None,
+                           communication: Communication = None) -> bool:
+        """
+        Queue an email rendered from a template. A communication passed in is
+        removed from the session again if the email cannot be queued.
+        """
+        # Skip suppressed addresses before doing any rendering
+        if self.suppressions.is_suppressed(to_email):
+            logger.info(f"Not emailing suppressed address {to_email}")
+            self._discard(communication)
+            return False
+            
+        template = self.templates.get(template_name)
+        if not template:
             logger.error(f"Template not found: {template_name}")
+            self._discard(communication)
             return False
             
-        template = self.templates[template_name]
+        try:
+            subject, body = template.render(variables)
+            
+            if self.send_email(to_email, subject, body, from_email, communication=communication):
+                return True
+                
+        except TemplateError as e:
+            logger.error(str(e))
+        except Exception as e:
+            logger.error(f"Error sending template email: {e}")
+            
+        self._discard(communication)
+        return False
         
+    def send_template_fanout(self, template_name: str,
+                             recipients: List[Union[str, Tuple[str, Dict[str, Any]]]],
+                             variables: Dict[str, Any], from_email: str = None) -> int:
+        """
+        Queue one template email to many recipients in the current transaction.
+        Shared content is rendered once. A recipient may be an address or an
+        (address, overrides) pair; only the overridden fields are rendered per
+        recipient. Copies with identical content are delivered together by the
+        outbox sender. Suppressed addresses are skipped. Returns the number of emails queued.
+        """
+        template = self.templates.get(template_name)
+        if not template:
+            logger.error(f"Template not found: {template_name}")
+            return 0
+            
+        recipients = [(r, None) if isinstance(r, str) else r for r in recipients]
+        
+        # Drop suppressed addresses before rendering anything
+        suppressed = self.suppressions.suppressed(to_email for to_email, _ in recipients)
+        if suppressed:
+            recipients = [(to_email, overrides) for to_email, overrides in recipients
+                          if normalize_email(to_email) not in suppressed]
+                          
+        personalised = set()
+        for _, overrides in recipients:
+            if overrides:
+                personalised.update(overrides)
+                
         try:
-            # Format subject and body with variables
-            subject = template['subject'].format(**variables)
-            body = template['body'].format(**variables)
+            # Render everything recipients share once; keep only the overridden fields open
+            shared = template.bind(variables, keep=personalised)
             
-            return self.send_email(to_email, subject, body, from_email)
+            from_email = from_email or self.username
+            now = datetime.utcnow()
+            rendered = {}
+            rows = []
             
-        except KeyError as e:
-            logger.error(f"Missing template variable: {e}")
-            return False
+            for to_email, overrides in recipients:
+                render_variables = {**variables, **overrides} if overrides else variables
+                cache_key = tuple(sorted(
+                    (name, repr(render_variables[name])) for name in personalised if name in render_variables
+                ))
+                if cache_key not in rendered:
+                    subject, body = shared.render(render_variables)
+                    rendered[cache_key] = (subject, body, self.content_key(from_email, subject, body, None))
+                subject, body, content_key = rendered[cache_key]
+                
+                rows.append({
+                    'to_email': to_email,
+                    'from_email': from_email,
+                    'subject': subject,
+                    'body': body,
+                    'message_id': make_msgid(domain=self.message_id_domain),
+                    'content_key': content_key,
+                    'status': 'Pending',
+                    'attempts': 0,
+                    'next_attempt': now
+                })
+                
+            if rows:
+                db.session.execute(db.insert(EmailOutbox), rows)
+                
+            logger.info(f"Queued {template_name} for {len(rows)} recipients ({len(rendered)} distinct renders)")
+            return len(rows)
+            
+        except TemplateError as e:
+            logger.error(str(e))
         except Exception as e:
-            logger.error(f"Error sending template email: {e}")
-            return False
+            logger.error(f"Error queueing template fan-out: {e}")
+            
+        return 0
+        
+    def _discard(self, communication: Optional[Communication]):
+        """Drop a pending communication whose email was never queued"""
+        if communication is not None and communication in db.session:
+            db.session.expunge(communication)
+            
+    def close(self):
+        """Close pooled SMTP connections"""
+        if self.pool:
+            self.pool.close()
             
     def log_communication(self, user_id: int, to_email: str, subject: str, 
                          body: str, lead_id: int = None, client_id: int = None,
-                         campaign_id: int = None, automation_trigger: str = None) -> bool:
-        """Log email communication to database"""
+                         campaign_id: int = None, automation_trigger: str = None,
+                         status: str = 'Sent') -> Optional[Communication]:
+        """
+        Log email communication to database. The row is added to the caller's
+        transaction, e.g. as 'Queued' alongside an outbox entry, and returned.
+        """
         try:
             communication = Communication(
                 communication_type='Email',
                 direction='Outbound',
                 subject=subject,
                 content=body,
-                status='Sent',
+                status=status,
                 user_id=user_id,
                 lead_id=lead_id,
                 client_id=client_id,
@@ -257,13 +463,16 @@ Real Estate CRM System
             )
             
             db.session.add(communication)
-            db.session.commit()
             
-            return True
+            return communication
             
         except Exception as e:
             logger.error(f"Error logging communication: {e}")
-            return False
+            return None
+
+# Global email service instance, shared so templates load once and
+# SMTP connections are reused across workflows
+email_service = EmailService()
 
 # Email automation workflows
 def send_welcome_email(context: Dict[str, Any]) -> bool:
@@ -277,7 +486,6 @@ def send_welcome_email(context: Dict[str, Any]) -> bool:
         return False
         
     agent = lead.assigned_agent
-    email_service = EmailService()
     
     variables = {
         'first_name': lead.first_name,
@@ -292,24 +500,24 @@ def send_welcome_email(context: Dict[str, Any]) -> bool:
         'budget_max': lead.budget_max or 0
     }
     
-    success = email_service.send_template_email(
+    # The communication is logged as Queued and updated by the outbox sender
+    communication = email_service.log_communication(
+        user_id=agent.id,
+        to_email=lead.email,
+        subject=f"Welcome to {variables['company_name']}",
+        body="Welcome email sent",
+        lead_id=lead.id,
+        automation_trigger='new_lead',
+        status='Queued'
+    )
+    
+    return email_service.send_template_email(
         'welcome_lead',
         lead.email,
         variables,
-        agent.email
+        agent.email,
+        communication=communication
     )
-    
-    if success:
-        email_service.log_communication(
-            user_id=agent.id,
-            to_email=lead.email,
-            subject=f"Welcome to {variables['company_name']}",
-            body="Welcome email sent",
-            lead_id=lead.id,
-            automation_trigger='new_lead'
-        )
-        
-    return success
 
 def send_follow_up_email(context: Dict[str, Any]) -> bool:
     """Send follow-up email to lead"""
@@ -322,7 +530,6 @@ def send_follow_up_email(context: Dict[str, Any]) -> bool:
         return False
         
     agent = lead.assigned_agent
-    email_service = EmailService()
     
     variables = {
         'first_name': lead.first_name,
@@ -333,24 +540,24 @@ def send_follow_up_email(context: Dict[str, Any]) -> bool:
         'agent_phone': agent.phone
     }
     
-    success = email_service.send_template_email(
+    # The communication is logged as Queued and updated by the outbox sender
+    communication = email_service.log_communication(
+        user_id=agent.id,
+        to_email=lead.email,
+        subject=f"Following up on your real estate inquiry",
+        body="Follow-up email sent",
+        lead_id=lead.id,
+        automation_trigger='follow_up_due',
+        status='Queued'
+    )
+    
+    return email_service.send_template_email(
         'lead_follow_up',
         lead.email,
         variables,
-        agent.email
+        agent.email,
+        communication=communication
     )
-    
-    if success:
-        email_service.log_communication(
-            user_id=agent.id,
-            to_email=lead.email,
-            subject=f"Following up on your real estate inquiry",
-            body="Follow-up email sent",
-            lead_id=lead.id,
-            automation_trigger='follow_up_due'
-        )
-        
-    return success
 
 def send_hot_lead_alert(context: Dict[str, Any]) -> bool:
     """Send hot lead alert to agent"""
@@ -363,7 +570,6 @@ def send_hot_lead_alert(context: Dict[str, Any]) -> bool:
         return False
         
     agent = lead.assigned_agent
-    email_service = EmailService()
     
     variables = {
         'first_name': lead.first_name,
@@ -379,24 +585,21 @@ def send_hot_lead_alert(context: Dict[str, Any]) -> bool:
         'notes': lead.notes or 'No additional notes'
     }
     
-    success = email_service.send_template_email(
+    # The communication is logged as Queued and updated by the outbox sender
+    communication = email_service.log_communication(
+        user_id=agent.id,
+        to_email=agent.email,
+        subject=f"High-Priority Lead Alert",
+        body="Hot lead alert sent",
+        lead_id=lead.id,
+        automation_trigger='hot_lead_identified',
+        status='Queued'
+    )
+    
+    return email_service.send_template_email(
         'hot_lead_alert',
         agent.email,
-        variables
+        variables,
+        communication=communication
     )
-    
-    if success:
-        email_service.log_communication(
-            user_id=agent.id,
-            to_email=agent.email,
-            subject=f"High-Priority Lead Alert",
-            body="Hot lead alert sent",
-            lead_id=lead.id,
-            automation_trigger='hot_lead_identified'
-        )
-        
-    return success
-
-# Global email service instance
-email_service = EmailService()
 
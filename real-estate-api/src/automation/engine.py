@@ -4,7 +4,10 @@ Replaces Make.com functionality with built-in automation workflows
 """
 import threading
 import time
+import socket
+import os
 import schedule
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Callable
 import logging
@@ -12,8 +15,19 @@ from src.models.user import db
 from src.models.lead import Lead
 from src.models.client import Client
 from src.models.transaction import Transaction, TransactionMilestone
-from src.models.communication import Communication
 from src.models.marketing_campaign import MarketingCampaign
+from src.automation.job_queue import JobQueue
+from src.automation.executor import WorkflowExecutor
+from src.automation.scoring import LeadScoringPass
+from src.automation.deadlines import deadline_index, LEAD_FOLLOW_UP, MILESTONE
+from src.automation.fire_ledger import FireLedger
+from src.automation.leader import LeaderElection
+from src.automation.run_recorder import RunRecorder
+from src.automation.email_service import email_service
+from src.automation.tracking import tracking_events
+from src.automation.outbox import OutboxSender
+from src.automation.attachments import attachment_cache
+from src.automation.metrics_cache import metrics_cache, WORKFLOW_METRICS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,19 +44,61 @@ class AutomationEngine:
         self.triggers = {}
         self.running = False
         self.scheduler_thread = None
+        self.job_queue = JobQueue()
+        self.lead_scorer = LeadScoringPass()
+        self.deadlines = deadline_index
+        self.fire_ledger = FireLedger()
+        self.deadline_poll_seconds = 5
+        self.deadline_retry_seconds = 60
+        self.id_batch_size = 500
+        self.executor = WorkflowExecutor()
+        self.workflow_limits = {}
+        self.poll_interval = 2
+        self.dispatcher_thread = None
+        self.dispatch_event = threading.Event()
+        self.running_jobs = {}
+        self.running_jobs_lock = threading.Lock()
+        self.job_heartbeat_thread = None
+        self.pass_executor = None
+        self.passes_running = set()
+        self.passes_lock = threading.Lock()
+        self.leader = LeaderElection()
+        self.is_leader = False
+        self.leader_thread = None
+        self.run_recorder = RunRecorder()
+        self.outbox = OutboxSender(email_service)
+        self.outbox_thread = None
+        self.outbox_event = threading.Event()
         
     def init_app(self, app):
         """Initialize with Flask app context"""
         self.app = app
+        self.run_recorder.app = app
+        tracking_events.app = app
+        self.executor.max_workers = app.config.get('AUTOMATION_MAX_WORKERS', self.executor.max_workers)
+        self.workflow_limits = app.config.get('AUTOMATION_WORKFLOW_LIMITS', {})
+        self.poll_interval = app.config.get('AUTOMATION_POLL_INTERVAL', self.poll_interval)
+        self.deadline_poll_seconds = app.config.get('AUTOMATION_DEADLINE_POLL', self.deadline_poll_seconds)
+        self.leader.lease_seconds = app.config.get('AUTOMATION_LEADER_LEASE', self.leader.lease_seconds)
         
-    def register_workflow(self, name: str, workflow_func: Callable, trigger_type: str = 'manual'):
-        """Register a new automation workflow"""
+    def register_workflow(self, name: str, workflow_func: Callable, trigger_type: str = 'manual',
+                          concurrency: int = None, queue_depth: int = None):
+        """
+        Register a new automation workflow.
+        `concurrency` caps how many jobs of this workflow run at once and `queue_depth`
+        how many more may wait in memory; AUTOMATION_WORKFLOW_LIMITS in the app config overrides both.
+        """
         self.workflows[name] = {
             'function': workflow_func,
-            'trigger_type': trigger_type,
-            'last_run': None,
-            'run_count': 0
+            'trigger_type': trigger_type
         }
+        
+        limits = self.workflow_limits.get(name, {})
+        self.executor.configure(
+            name,
+            concurrency=limits.get('concurrency', concurrency),
+            queue_depth=limits.get('queue_depth', queue_depth)
+        )
         logger.info(f"Registered workflow: {name}")
         
     def register_trigger(self, trigger_name: str, condition_func: Callable, workflow_name: str):
@@ -64,151 +120,513 @@ class AutomationEngine:
         self.running = True
         logger.info("Starting Automation Engine...")
         
-        # Schedule periodic tasks
-        schedule.every(5).minutes.do(self._check_lead_follow_ups)
-        schedule.every(10).minutes.do(self._check_transaction_milestones)
-        schedule.every(30).minutes.do(self._process_lead_scoring)
-        schedule.every(1).hours.do(self._check_marketing_campaigns)
-        schedule.every(1).days.do(self._daily_maintenance)
+        # Schedule periodic tasks. Each pass runs on its own pool thread so a slow
+        # pass never delays the others. Follow-ups and milestones are fired from the
+        # deadline index instead, which the scheduler keeps in sync by polling the
+        # deadline change table. Only the process holding the scheduler lease runs these.
+        schedule.every(10).minutes.do(self._submit_pass, self._process_lead_scoring)
+        schedule.every().day.at('02:00').do(self._submit_pass, self._reconcile_lead_scores)
+        schedule.every(1).hours.do(self._submit_pass, self._check_marketing_campaigns)
+        schedule.every(1).days.do(self._submit_pass, self._daily_maintenance)
+        
+        # Daily reconcile of the deadline index against the database. It runs on
+        # the scheduler thread itself, between change polls, so no change applied
+        # by a poll can be overwritten by an older snapshot.
+        schedule.every(1).days.do(self._reload_deadlines)
+        self.pass_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='automation-pass')
         
-        # Start scheduler thread
+        # Compete for the scheduler lease, then start the scheduler thread
+        self._heartbeat()
+        self.leader_thread = threading.Thread(target=self._run_leader_heartbeat, daemon=True)
+        self.leader_thread.start()
         self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.scheduler_thread.start()
         
+        # Start the job pool and the dispatcher that feeds it from the queue
+        self.executor.start(self._run_job, on_idle=self.dispatch_event.set)
+        self.dispatcher_thread = threading.Thread(
+            target=self._run_dispatcher,
+            args=(f"{socket.gethostname()}:{os.getpid()}",),
+            daemon=True
+        )
+        self.dispatcher_thread.start()
+        
+        # Keep the leases of running jobs alive however long they take
+        self.job_heartbeat_thread = threading.Thread(target=self._run_job_heartbeat, daemon=True)
+        self.job_heartbeat_thread.start()
+        
+        # Deliver queued emails in the background
+        self.outbox_thread = threading.Thread(
+            target=self._run_outbox_sender,
+            args=(f"{socket.gethostname()}:{os.getpid()}",),
+            daemon=True
+        )
+        self.outbox_thread.start()
+        
         logger.info("Automation Engine started successfully")
         
     def stop(self):
         """Stop the automation engine"""
         self.running = False
+        schedule.clear()
+        self.dispatch_event.set()
+        self.outbox_event.set()
+        self.deadlines.changed.set()
+        
+        if self.pass_executor:
+            self.pass_executor.shutdown(wait=False)
+            self.pass_executor = None
+            
+        # Give up the scheduler lease so another process takes over right away
+        if self.is_leader:
+            self.is_leader = False
+            self.deadlines.unload()
+            try:
+                with self.app.app_context():
+                    self.leader.release()
+            except Exception as e:
+                logger.error(f"Error releasing scheduler lease: {e}")
+            
+        # Hand jobs that were claimed but never started back to the queue
+        unstarted = self.executor.shutdown()
+        if unstarted:
+            with self.app.app_context():
+                self.job_queue.release([job['id'] for job in unstarted])
+                
+        # Write out buffered run records and tracking events
+        for writer in (self.run_recorder, tracking_events):
+            try:
+                writer.flush()
+            except Exception as e:
+                logger.error(f"Error flushing {writer.model.__tablename__}: {e}")
+            
+        email_service.close()
+                
         logger.info("Automation Engine stopped")
         
     def _run_scheduler(self):
         """Run the scheduler in a separate thread"""
         while self.running:
             try:
+                # Followers keep their schedule but leave the passes to the leader
+                if not self.is_leader:
+                    self.deadlines.changed.wait(self.leader.heartbeat_seconds)
+                    self.deadlines.changed.clear()
+                    continue
+                    
                 schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                self._apply_deadline_changes()
+                self._fire_due_deadlines()
+                
+                # Sleep until the next periodic task, deadline or change poll
+                timeout = self.deadline_poll_seconds
+                idle_seconds = schedule.idle_seconds()
+                if idle_seconds is not None:
+                    timeout = min(timeout, idle_seconds)
+                    
+                next_due = self.deadlines.next_due()
+                if next_due is not None:
+                    timeout = min(timeout, (next_due - datetime.now()).total_seconds())
+                    
+                self.deadlines.changed.wait(max(timeout, 0.1))
+                self.deadlines.changed.clear()
+                
             except Exception as e:
                 logger.error(f"Scheduler error: {e}")
                 time.sleep(60)
                 
+    def _run_job_heartbeat(self):
+        """Renew the leases of jobs running in this process until the engine stops"""
+        while self.running:
+            time.sleep(self.job_queue.heartbeat_seconds)
+            with self.running_jobs_lock:
+                leases = dict(self.running_jobs)
+            if not leases:
+                continue
+                
+            try:
+                with self.app.app_context():
+                    lost = self.job_queue.extend_leases(leases)
+            except Exception as e:
+                logger.error(f"Job lease heartbeat error: {e}")
+                continue
+                
+            for job_id in lost:
+                logger.warning(f"Lost lease on running job {job_id}; another worker may retry it")
+                
+    def _run_leader_heartbeat(self):
+        """Renew or contend for the scheduler lease until the engine stops"""
+        while self.running:
+            time.sleep(self.leader.heartbeat_seconds)
+            if self.running:
+                self._heartbeat()
+                
+    def _heartbeat(self):
+        """Run one lease round, reacting to gaining or losing leadership"""
+        try:
+            with self.app.app_context():
+                is_leader = self.leader.acquire()
+        except Exception as e:
+            # Without a confirmed renewal the lease may lapse; stop acting as leader
+            logger.error(f"Scheduler lease error: {e}")
+            is_leader = False
+            
+        if is_leader and not self.is_leader:
+            logger.info(f"Became automation scheduler leader ({self.leader.holder_id})")
+            self.is_leader = True
+            self._submit_pass(self._reload_deadlines)
+            self.deadlines.changed.set()
+        elif not is_leader and self.is_leader:
+            logger.warning(f"Lost automation scheduler lease ({self.leader.holder_id})")
+            self.is_leader = False
+            self.deadlines.unload()
+            
+    def _fire_due_deadlines(self):
+        """Fire workflows for follow-ups and milestones that have come due"""
+        due = self.deadlines.pop_due()
+        
+        for kind, check in ((LEAD_FOLLOW_UP, self._check_lead_follow_ups),
+                            (MILESTONE, self._check_transaction_milestones)):
+            entity_ids = due[kind]
+            for start in range(0, len(entity_ids), self.id_batch_size):
+                try:
+                    check(entity_ids[start:start + self.id_batch_size])
+                except Exception as e:
+                    # Nothing from the failed batch was committed: put it and the
+                    # batches after it back in the index and retry them later
+                    retry_at = datetime.now() + timedelta(seconds=self.deadline_retry_seconds)
+                    self.deadlines.requeue(kind, entity_ids[start:], retry_at)
+                    logger.error(f"Error firing {kind} deadlines, retrying {len(entity_ids) - start} at {retry_at}: {e}")
+                    break
+                    
+    def _reload_deadlines(self):
+        """Rebuild the deadline index from the database"""
+        with self.app.app_context():
+            self.deadlines.load()
+            
+    def _apply_deadline_changes(self):
+        """Apply deadline changes recorded by any process since the last poll"""
+        with self.app.app_context():
+            while self.deadlines.apply_changes(self.id_batch_size) == self.id_batch_size:
+                pass
+                
+    def _submit_pass(self, pass_func: Callable):
+        """Run a periodic pass on the pass pool, skipping it if the previous run is still going"""
+        name = pass_func.__name__
+        
+        if not self.is_leader:
+            return
+            
+        with self.passes_lock:
+            if name in self.passes_running or not self.pass_executor:
+                logger.info(f"Skipping {name}, previous run still in progress")
+                return
+            self.passes_running.add(name)
+            
+        def run():
+            try:
+                pass_func()
+            except Exception as e:
+                logger.error(f"Error in {name}: {e}")
+            finally:
+                with self.passes_lock:
+                    self.passes_running.discard(name)
+                    
+        self.pass_executor.submit(run)
+        
+    def _run_dispatcher(self, worker_id: str):
+        """Claim jobs from the queue for every workflow lane with free capacity"""
+        while self.running:
+            claimed = 0
+            
+            try:
+                with self.app.app_context():
+                    for workflow_name, slots in self.executor.free_slots().items():
+                        if slots <= 0 or not self.running:
+                            continue
+                            
+                        jobs = self.job_queue.claim(worker_id, limit=slots, workflow_names=[workflow_name])
+                        for job in jobs:
+                            self.executor.submit(job)
+                        claimed += len(jobs)
+                        
+            except Exception as e:
+                logger.error(f"Dispatcher error: {e}")
+                
+            # Sleep until a job finishes, a trigger fires locally, or the poll interval passes
+            if not claimed:
+                self.dispatch_event.wait(self.poll_interval)
+                self.dispatch_event.clear()
+                
+    def _run_outbox_sender(self, worker_id: str):
+        """Deliver outbox emails in batches until the engine stops"""
+        while self.running:
+            sent = 0
+            
+            try:
+                with self.app.app_context():
+                    sent = self.outbox.send_batch(worker_id)
+            except Exception as e:
+                logger.error(f"Outbox sender error: {e}")
+                
+            # Sleep until a workflow commits new emails or the poll interval passes
+            if not sent:
+                self.outbox_event.wait(self.poll_interval)
+                self.outbox_event.clear()
+                
+    def _run_job(self, job: Dict[str, Any]):
+        """Run a claimed job in its own app context and session, recording the outcome on the queue"""
+        error = None
+        
+        with self.app.app_context():
+            # The job may have waited in its lane; renew the lease before starting
+            if not self.job_queue.extend_lease(job['id'], job['lock_token']):
+                logger.warning(f"Lost lease on job {job['id']}, skipping")
+                return
+                
+            with self.running_jobs_lock:
+                self.running_jobs[job['id']] = job['lock_token']
+            try:
+                result = self._run_workflow(job['workflow_name'], job['context'], job_id=job['id'])
+            except Exception as e:
+                db.session.rollback()
+                result = False
+                error = str(e)
+            finally:
+                with self.running_jobs_lock:
+                    self.running_jobs.pop(job['id'], None)
+                
+            if result is False:
+                self.job_queue.fail(job['id'], error or 'Workflow returned False', job['lock_token'])
+            else:
+                self.job_queue.complete(job['id'], job['lock_token'])
+                
+    def _run_workflow(self, workflow_name: str, context: Dict[str, Any], job_id: int = None):
+        """Run a workflow in the current app context, letting errors propagate"""
+        if workflow_name not in self.workflows:
+            raise KeyError(f"Workflow not found: {workflow_name}")
+            
+        workflow = self.workflows[workflow_name]
+        started = datetime.now()
+        started_clock = time.perf_counter()
+        result = False
+        error = None
+        
+        try:
+            result = workflow['function'](context or {})
+            
+            # The workflow's changes and the emails it queued commit together
+            if result is False:
+                db.session.rollback()
+            else:
+                db.session.commit()
+                self.outbox_event.set()
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            # Workflows may return a count of items handled instead of True
+            if isinstance(result, int) and not isinstance(result, bool):
+                items_processed = result
+            else:
+                items_processed = 0 if result is False else 1
+                
+            self.run_recorder.record(
+                workflow_name,
+                started,
+                (time.perf_counter() - started_clock) * 1000,
+                succeeded=error is None and result is not False,
+                error=error or ('Workflow returned False' if result is False else None),
+                items_processed=items_processed,
+                job_id=job_id
+            )
+        
+        logger.info(f"Executed workflow: {workflow_name}")
+        return result
+                
     def execute_workflow(self, workflow_name: str, context: Dict[str, Any] = None):
-        """Execute a specific workflow"""
+        """Execute a specific workflow synchronously"""
         if workflow_name not in self.workflows:
             logger.error(f"Workflow not found: {workflow_name}")
             return False
             
         try:
             with self.app.app_context():
-                workflow = self.workflows[workflow_name]
-                result = workflow['function'](context or {})
-                
-                # Update workflow stats
-                workflow['last_run'] = datetime.now()
-                workflow['run_count'] += 1
-                
-                logger.info(f"Executed workflow: {workflow_name}")
-                return result
+                return self._run_workflow(workflow_name, context)
                 
         except Exception as e:
             logger.error(f"Error executing workflow {workflow_name}: {e}")
             return False
             
-    def trigger_workflow(self, trigger_name: str, data: Dict[str, Any] = None):
-        """Trigger workflows based on events"""
+    def trigger_workflow(self, trigger_name: str, data: Dict[str, Any] = None, commit: bool = True) -> List[int]:
+        """
+        Trigger workflows based on events.
+        Matching workflows are enqueued as jobs and run by the queue workers.
+        Pass commit=False to batch many triggers into the caller's transaction.
+        """
         if trigger_name not in self.triggers:
-            return
+            return []
             
+        jobs = []
         for trigger in self.triggers[trigger_name]:
             try:
                 if trigger['condition'](data or {}):
-                    self.execute_workflow(trigger['workflow'], data)
+                    jobs.append(self.job_queue.enqueue(
+                        trigger['workflow'],
+                        data,
+                        trigger_name=trigger_name,
+                        commit=False
+                    ))
             except Exception as e:
                 logger.error(f"Error in trigger {trigger_name}: {e}")
                 
-    def _check_lead_follow_ups(self):
-        """Check for leads that need follow-up"""
+        if jobs and commit:
+            db.session.commit()
+            self.dispatch_event.set()
+            
+        return [job.id for job in jobs]
+        
+    def trigger_workflow_batch(self, trigger_name: str, items: List[Dict[str, Any]], commit: bool = True) -> int:
+        """
+        Trigger workflows for many events of the same kind, queueing each matching
+        workflow's jobs in one bulk insert. Returns the number of jobs queued.
+        """
+        if trigger_name not in self.triggers or not items:
+            return 0
+            
+        queued = 0
+        for trigger in self.triggers[trigger_name]:
+            try:
+                matching = [data for data in items if trigger['condition'](data)]
+                queued += self.job_queue.enqueue_many(
+                    trigger['workflow'],
+                    matching,
+                    trigger_name=trigger_name,
+                    commit=False
+                )
+            except Exception as e:
+                logger.error(f"Error in trigger {trigger_name}: {e}")
+                
+        if queued and commit:
+            db.session.commit()
+            self.dispatch_event.set()
+            
+        return queued
+                
+    def _check_lead_follow_ups(self, lead_ids: List[int] = None):
+        """Check for leads that need follow-up, optionally limited to the given leads"""
         logger.info("Checking lead follow-ups...")
         
         with self.app.app_context():
             # Get leads that need follow-up
-            overdue_leads = Lead.query.filter(
+            query = Lead.query.filter(
                 Lead.next_follow_up <= datetime.now().date(),
                 Lead.lead_status.in_(['New', 'Contacted', 'Qualified', 'Nurturing'])
-            ).all()
+            )
+            if lead_ids is not None:
+                query = query.filter(Lead.id.in_(lead_ids))
+            overdue_leads = query.with_entities(Lead.id, Lead.next_follow_up).all()
             
-            for lead in overdue_leads:
+            # Fire once per lead and follow-up date; the date acts as the lead's
+            # watermark, so only a new next_follow_up can fire again
+            follow_up_dates = {lead_id: next_follow_up for lead_id, next_follow_up in overdue_leads}
+            fresh = self.fire_ledger.claim('lead_follow_up_due', [
+                (lead_id, next_follow_up.isoformat()) for lead_id, next_follow_up in overdue_leads
+            ])
+            
+            for lead_id, _ in fresh:
                 self.trigger_workflow('lead_follow_up_due', {
-                    'lead_id': lead.id,
-                    'lead': lead,
-                    'days_overdue': (datetime.now().date() - lead.next_follow_up).days
-                })
+                    'lead_id': lead_id,
+                    'days_overdue': (datetime.now().date() - follow_up_dates[lead_id]).days
+                }, commit=False)
                 
-    def _check_transaction_milestones(self):
-        """Check for transaction milestones that are due or overdue"""
+            db.session.commit()
+                
+    def _check_transaction_milestones(self, milestone_ids: List[int] = None):
+        """Check for transaction milestones that are due or overdue, optionally limited to the given milestones"""
         logger.info("Checking transaction milestones...")
         
         with self.app.app_context():
             # Get overdue milestones
-            overdue_milestones = TransactionMilestone.query.filter(
+            # Milestones already reminded about are skipped in SQL, so repeat
+            # scans of the same overdue milestones are cheap no-ops
+            query = TransactionMilestone.query.filter(
                 TransactionMilestone.due_date <= datetime.now().date(),
-                TransactionMilestone.milestone_status.in_(['Pending', 'In Progress'])
+                TransactionMilestone.milestone_status.in_(['Pending', 'In Progress']),
+                db.or_(
+                    TransactionMilestone.auto_reminder_sent == False,
+                    TransactionMilestone.auto_reminder_sent.is_(None)
+                )
+            )
+            if milestone_ids is not None:
+                query = query.filter(TransactionMilestone.id.in_(milestone_ids))
+            overdue_milestones = query.with_entities(
+                TransactionMilestone.id,
+                TransactionMilestone.transaction_id,
+                TransactionMilestone.due_date
             ).all()
             
-            for milestone in overdue_milestones:
+            transaction_by_milestone = {milestone.id: milestone.transaction_id for milestone in overdue_milestones}
+            fresh = self.fire_ledger.claim('milestone_overdue', [
+                (milestone.id, milestone.due_date.isoformat()) for milestone in overdue_milestones
+            ])
+            
+            for milestone_id, _ in fresh:
                 self.trigger_workflow('milestone_overdue', {
-                    'milestone_id': milestone.id,
-                    'milestone': milestone,
-                    'transaction_id': milestone.transaction_id
-                })
+                    'milestone_id': milestone_id,
+                    'transaction_id': transaction_by_milestone[milestone_id]
+                }, commit=False)
+                
+            if overdue_milestones:
+                TransactionMilestone.query.filter(
+                    TransactionMilestone.id.in_(list(transaction_by_milestone))
+                ).update({'auto_reminder_sent': True}, synchronize_session=False)
+                
+            db.session.commit()
                 
-    def _process_lead_scoring(self):
+    def _process_lead_scoring(self, full: bool = False):
         """Recalculate lead scores and trigger actions for high-scoring leads"""
         logger.info("Processing lead scoring...")
         
         with self.app.app_context():
-            # Get all active leads
-            active_leads = Lead.query.filter(
-                Lead.lead_status.in_(['New', 'Contacted', 'Qualified', 'Nurturing'])
-            ).all()
+            # Score the dirty set (or every active lead) in one set-based pass,
+            # then fire hot lead triggers once the new scores are committed
+            hot_leads = self.lead_scorer.run(full=full)
             
-            for lead in active_leads:
-                # Recalculate score (simplified version)
-                old_score = lead.lead_score
-                new_score = self._calculate_lead_score(lead)
+            for lead_id, score in hot_leads:
+                self.trigger_workflow('hot_lead_identified', {
+                    'lead_id': lead_id,
+                    'score': score
+                }, commit=False)
                 
-                if new_score != old_score:
-                    lead.lead_score = new_score
-                    db.session.commit()
-                    
-                    # Trigger actions for high-scoring leads
-                    if new_score >= 80 and old_score < 80:
-                        self.trigger_workflow('hot_lead_identified', {
-                            'lead_id': lead.id,
-                            'lead': lead,
-                            'score': new_score
-                        })
-                        
+            db.session.commit()
+            
+    def _reconcile_lead_scores(self):
+        """Nightly full re-score catching anything the incremental passes missed"""
+        self._process_lead_scoring(full=True)
+        
     def _check_marketing_campaigns(self):
         """Check and update marketing campaign status"""
         logger.info("Checking marketing campaigns...")
         
         with self.app.app_context():
-            # Get active campaigns
-            active_campaigns = MarketingCampaign.query.filter(
-                MarketingCampaign.campaign_status == 'Active'
-            ).all()
+            # Complete every ended campaign in one statement, then enqueue the
+            # follow-on triggers in the same transaction
+            completed_ids = self._bulk_update(
+                MarketingCampaign,
+                [
+                    MarketingCampaign.campaign_status == 'Active',
+                    MarketingCampaign.end_date <= datetime.now().date()
+                ],
+                {'campaign_status': 'Completed'}
+            )
             
-            for campaign in active_campaigns:
-                # Check if campaign should end
-                if campaign.end_date and campaign.end_date <= datetime.now().date():
-                    campaign.campaign_status = 'Completed'
-                    db.session.commit()
-                    
-                    self.trigger_workflow('campaign_completed', {
-                        'campaign_id': campaign.id,
-                        'campaign': campaign
-                    })
+            for campaign_id in completed_ids:
+                self.trigger_workflow('campaign_completed', {
+                    'campaign_id': campaign_id
+                }, commit=False)
+                
+            db.session.commit()
                     
     def _daily_maintenance(self):
         """Perform daily maintenance tasks"""
@@ -218,104 +636,119 @@ class AutomationEngine:
             # Update lead statuses based on inactivity
             inactive_threshold = datetime.now() - timedelta(days=30)
             
-            inactive_leads = Lead.query.filter(
-                Lead.last_modified < inactive_threshold,
-                Lead.lead_status.in_(['New', 'Contacted', 'Nurturing'])
-            ).all()
+            unresponsive_ids = self._bulk_update(
+                Lead,
+                [
+                    Lead.last_modified < inactive_threshold,
+                    Lead.lead_status.in_(['New', 'Contacted', 'Nurturing'])
+                ],
+                {'lead_status': 'Unresponsive'}
+            )
+            db.session.commit()
             
-            for lead in inactive_leads:
-                lead.lead_status = 'Unresponsive'
+            # Unresponsive leads no longer get follow-ups
+            for lead_id in unresponsive_ids:
+                self.deadlines.schedule_lead(lead_id, None)
                 
-            db.session.commit()
+            logger.info(f"Marked {len(unresponsive_ids)} inactive leads unresponsive")
+            
+            # Clean up finished jobs, expired fire ledger entries, old run history and sent emails
+            self.job_queue.purge(datetime.utcnow() - timedelta(days=7))
+            self.fire_ledger.purge_expired()
+            self.run_recorder.purge(datetime.now() - timedelta(days=30))
+            self.outbox.purge(datetime.utcnow() - timedelta(days=7))
+            self.deadlines.purge(datetime.utcnow() - timedelta(days=7))
             
             # Generate daily reports
-            self.trigger_workflow('daily_report_generation', {
+            self.trigger_workflow('daily_report', {
                 'date': datetime.now().date()
             })
             
-    def _calculate_lead_score(self, lead: Lead) -> int:
-        """Calculate lead score based on various factors"""
-        score = 0
-        
-        # Source scoring
-        source_scores = {
-            'Referral': 30,
-            'Website Form': 25,
-            'Google Ads': 20,
-            'Social Media': 18,
-            'Open House': 15,
-            'Zillow': 12,
-            'Realtor.com': 10,
-            'Cold Call': 8,
-            'Other': 5
-        }
-        score += source_scores.get(lead.lead_source, 5)
-        
-        # Timeline scoring
-        timeline_scores = {
-            'ASAP': 25,
-            '1-3 months': 20,
-            '3-6 months': 15,
-            '6-12 months': 10,
-            '1+ years': 5,
-            'Just browsing': 3
-        }
-        score += timeline_scores.get(lead.timeline, 3)
-        
-        # Budget scoring
-        if lead.budget_max:
-            if lead.budget_max >= 1000000:
-                score += 20
-            elif lead.budget_max >= 500000:
-                score += 15
-            elif lead.budget_max >= 300000:
-                score += 10
-            elif lead.budget_max >= 200000:
-                score += 8
-            else:
-                score += 5
-                
-        # Property interest scoring
-        interest_scores = {
-            'Buying': 15,
-            'Both': 12,
-            'Selling': 10,
-            'Investing': 8,
-            'Renting': 3
-        }
-        score += interest_scores.get(lead.property_interest, 5)
-        
-        # Contact completeness
-        if lead.email:
-            score += 5
-        if lead.phone:
-            score += 5
-            
-        # Engagement scoring (based on communications)
-        recent_communications = Communication.query.filter(
-            Communication.lead_id == lead.id,
-            Communication.sent_date >= datetime.now() - timedelta(days=7)
-        ).count()
-        
-        score += min(recent_communications * 2, 10)  # Max 10 points for engagement
-        
-        return min(score, 100)  # Cap at 100
+    def _bulk_update(self, model, filters: List, values: Dict[str, Any]) -> List[int]:
+        """
+        Apply one set-based UPDATE and return the ids of the rows it changed.
+        Uses UPDATE ... RETURNING where the database supports it; otherwise selects
+        the matching ids first and updates exactly those rows. Caller commits.
+        """
+        if db.engine.dialect.update_returning:
+            result = db.session.execute(
+                db.update(model).where(*filters).values(values).returning(model.id)
+            )
+            return [row[0] for row in result]
+            
+        ids = [row[0] for row in db.session.query(model.id).filter(*filters).with_for_update()]
+        for start in range(0, len(ids), self.id_batch_size):
+            batch = ids[start:start + self.id_batch_size]
+            db.session.execute(
+                db.update(model).where(model.id.in_(batch), *filters).values(values)
+            )
+        return ids
         
     def get_status(self) -> Dict[str, Any]:
         """Get automation engine status"""
+        next_due = self.deadlines.next_due()
         return {
             'running': self.running,
             'workflows_registered': len(self.workflows),
             'triggers_registered': sum(len(triggers) for triggers in self.triggers.values()),
-            'workflows': {
-                name: {
-                    'last_run': workflow['last_run'].isoformat() if workflow['last_run'] else None,
-                    'run_count': workflow['run_count']
-                }
-                for name, workflow in self.workflows.items()
+            'max_workers': self.executor.max_workers,
+            'leader': {
+                'is_leader': self.is_leader,
+                'holder_id': self.leader.holder_id
+            },
+            'job_queue': self._get_queue_stats(),
+            'email_outbox': self._get_outbox_stats(),
+            'attachment_cache': attachment_cache.get_stats(),
+            'metrics_cache': metrics_cache.get_stats(),
+            'email_tracking': tracking_events.get_stats(),
+            'email_throttle': email_service.throttle.get_stats(),
+            'email_suppression': email_service.suppressions.get_stats(),
+            'lead_scoring': self.lead_scorer.get_stats(),
+            'deadlines': {
+                'tracked': len(self.deadlines),
+                'next_due': next_due.isoformat() if next_due else None
+            },
+            # Cached like /automation/metrics, so polling status stays off the run history
+            'workflows': self.get_workflow_stats(metrics_cache.get(WORKFLOW_METRICS, self.get_run_stats))
+        }
+
+    def get_workflow_stats(self, runs: Dict[str, Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """Run history and lane counters per workflow; pass `runs` to reuse (e.g. cached) run stats"""
+        runs = self.get_run_stats() if runs is None else runs
+        lanes = self.executor.get_stats()
+        return {
+            name: {
+                'last_run': runs.get(name, {}).get('last_run'),
+                'run_count': runs.get(name, {}).get('run_count', 0),
+                'windows': runs.get(name, {}).get('windows', {}),
+                **lanes.get(name, {})
             }
+            for name in self.workflows
         }
 
+    def _get_queue_stats(self) -> Dict[str, int]:
+        """Get job queue counts, tolerating calls outside an app context"""
+        if not self.app:
+            return {}
+            
+        with self.app.app_context():
+            return self.job_queue.get_stats()
+
+    def _get_outbox_stats(self) -> Dict[str, int]:
+        """Get email outbox counts, tolerating calls outside an app context"""
+        if not self.app:
+            return {}
+            
+        with self.app.app_context():
+            return self.outbox.get_stats()
+            
+    def get_run_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get workflow run history stats, tolerating calls outside an app context"""
+        if not self.app:
+            return {}
+            
+        return self.run_recorder.get_stats()
+
 # Global automation engine instance
 automation_engine = AutomationEngine()
 
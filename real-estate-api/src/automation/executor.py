@@ -0,0 +1,131 @@
+"""
+Workflow Executor
+Runs claimed workflow jobs on a bounded thread pool with per-workflow concurrency limits
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+class WorkflowLane:
+    """
+    Per-workflow admission state: how many jobs may run at once and how many may wait in memory
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_depth: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.waiting = deque()
+        self.running = 0
+
+    def free_slots(self) -> int:
+        """Number of additional jobs this lane can accept right now"""
+        return self.concurrency + self.queue_depth - self.running - len(self.waiting)
+
+class WorkflowExecutor:
+    """
+    Bounded thread pool shared by all workflows.
+    Each workflow gets its own lane so a burst of one workflow cannot starve the others.
+    """
+
+    def __init__(self, max_workers: int = 8, default_concurrency: int = 2, default_queue_depth: int = 20):
+        self.max_workers = max_workers
+        self.default_concurrency = default_concurrency
+        self.default_queue_depth = default_queue_depth
+        self.lanes = {}
+        self.pool = None
+        self.run_job = None
+        self.on_idle = None
+        self.lock = threading.Lock()
+
+    def configure(self, workflow_name: str, concurrency: int = None, queue_depth: int = None):
+        """Create or update the lane for a workflow"""
+        with self.lock:
+            lane = self.lanes.get(workflow_name)
+            if not lane:
+                lane = WorkflowLane(workflow_name, self.default_concurrency, self.default_queue_depth)
+                self.lanes[workflow_name] = lane
+
+            if concurrency is not None:
+                lane.concurrency = max(1, concurrency)
+            if queue_depth is not None:
+                lane.queue_depth = max(0, queue_depth)
+
+    def start(self, run_job: Callable[[Dict[str, Any]], None], on_idle: Callable[[], None] = None):
+        """Create the thread pool. `on_idle` is called whenever a job finishes and frees a slot."""
+        self.run_job = run_job
+        self.on_idle = on_idle
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='automation-job')
+
+    def shutdown(self) -> List[Dict[str, Any]]:
+        """Stop accepting work and return the jobs that were waiting and never started"""
+        with self.lock:
+            pending = []
+            for lane in self.lanes.values():
+                pending.extend(lane.waiting)
+                lane.waiting.clear()
+
+            if self.pool:
+                self.pool.shutdown(wait=False)
+                self.pool = None
+
+        return pending
+
+    def free_slots(self) -> Dict[str, int]:
+        """Free capacity per workflow lane"""
+        with self.lock:
+            return {name: lane.free_slots() for name, lane in self.lanes.items()}
+
+    def submit(self, job: Dict[str, Any]):
+        """Admit a claimed job to its workflow lane"""
+        with self.lock:
+            lane = self.lanes.get(job['workflow_name'])
+            if not lane:
+                lane = WorkflowLane(job['workflow_name'], self.default_concurrency, self.default_queue_depth)
+                self.lanes[job['workflow_name']] = lane
+
+            lane.waiting.append(job)
+            self._drain(lane)
+
+    def _drain(self, lane: WorkflowLane):
+        """Start waiting jobs while the lane is under its concurrency cap. Caller holds the lock."""
+        while self.pool and lane.waiting and lane.running < lane.concurrency:
+            job = lane.waiting.popleft()
+            lane.running += 1
+            self.pool.submit(self._run, lane, job)
+
+    def _run(self, lane: WorkflowLane, job: Dict[str, Any]):
+        """
+        Run a job on a pool thread, then release its lane slot and start the next
+        waiting job. The slot is released here rather than in a done callback,
+        which would run on the submitting thread (still holding the lock) if the
+        job had already finished.
+        """
+        try:
+            self.run_job(job)
+        except Exception as e:
+            logger.error(f"Unhandled error in {lane.name} job: {e}")
+        finally:
+            with self.lock:
+                lane.running -= 1
+                self._drain(lane)
+
+            if self.on_idle:
+                self.on_idle()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Running and waiting job counts per workflow"""
+        with self.lock:
+            return {
+                name: {
+                    'running': lane.running,
+                    'waiting': len(lane.waiting),
+                    'concurrency': lane.concurrency,
+                    'queue_depth': lane.queue_depth
+                }
+                for name, lane in self.lanes.items()
+            }
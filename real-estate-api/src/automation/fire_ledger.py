@@ -0,0 +1,93 @@
+"""
+Fire-Once Ledger
+Remembers which (trigger, entity, due date) combinations have already fired
+so repeated scans of the same overdue items do not re-run their workflows
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import List, Tuple
+from src.models.user import db
+from src.models.fire_ledger import FireLedgerEntry
+
+logger = logging.getLogger(__name__)
+
+class FireLedger:
+    """
+    Database-backed set of fired keys with TTL expiry.
+    Once an entry expires the same key may fire again.
+    """
+
+    def __init__(self, ttl: timedelta = timedelta(days=7)):
+        self.ttl = ttl
+
+    def claim(self, trigger_name: str, keys: List[Tuple[int, str]], ttl: timedelta = None) -> List[Tuple[int, str]]:
+        """
+        Record (entity_id, due_key) pairs as fired and return the ones that had
+        not fired yet. Entries are added to the session; the caller commits them
+        together with the jobs it enqueues.
+        """
+        if not keys:
+            return []
+
+        now = datetime.utcnow()
+        entity_ids = list({entity_id for entity_id, _ in keys})
+
+        entries = FireLedgerEntry.query.filter(
+            FireLedgerEntry.trigger_name == trigger_name,
+            FireLedgerEntry.entity_id.in_(entity_ids)
+        ).all()
+
+        wanted = set(keys)
+        fired = set()
+        expired = 0
+        for entry in entries:
+            if entry.expires_date > now:
+                fired.add((entry.entity_id, entry.due_key))
+            elif (entry.entity_id, entry.due_key) in wanted:
+                # Expired: make room for a fresh entry under the same key
+                db.session.delete(entry)
+                expired += 1
+
+        if expired:
+            # The unit of work runs inserts before deletes, so flush the deletes first
+            db.session.flush()
+
+        fresh = []
+        for key in dict.fromkeys(keys):
+            if key in fired:
+                continue
+
+            fresh.append(key)
+            db.session.add(FireLedgerEntry(
+                trigger_name=trigger_name,
+                entity_id=key[0],
+                due_key=key[1],
+                fired_date=now,
+                expires_date=now + (ttl or self.ttl)
+            ))
+
+        if len(fresh) < len(keys):
+            logger.info(f"Fire ledger suppressed {len(keys) - len(fresh)} repeat {trigger_name} triggers")
+
+        return fresh
+
+    def release(self, trigger_name: str, entity_ids: List[int]) -> int:
+        """
+        Forget that the given entities fired, so their current due keys may fire
+        again. Deletes are added to the session; the caller commits them.
+        """
+        if not entity_ids:
+            return 0
+
+        return FireLedgerEntry.query.filter(
+            FireLedgerEntry.trigger_name == trigger_name,
+            FireLedgerEntry.entity_id.in_(entity_ids)
+        ).delete(synchronize_session=False)
+
+    def purge_expired(self) -> int:
+        """Delete expired ledger entries"""
+        deleted = FireLedgerEntry.query.filter(
+            FireLedgerEntry.expires_date <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
@@ -0,0 +1,286 @@
+"""
+Durable Job Queue
+Persists triggered workflow runs in the database so worker loops can drain them
+"""
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+from src.models.user import db
+from src.models.automation_job import AutomationJob
+from src.automation.tagged_json import encode_value, decode_value
+
+logger = logging.getLogger(__name__)
+
+def encode_context(context: Optional[Dict[str, Any]]) -> str:
+    """Serialize a workflow context for storage on a job row"""
+    return json.dumps(context or {}, default=encode_value)
+
+def decode_context(payload: Optional[str]) -> Dict[str, Any]:
+    """Deserialize a workflow context stored on a job row"""
+    if not payload:
+        return {}
+    return json.loads(payload, object_hook=decode_value)
+
+class JobQueue:
+    """
+    Database-backed queue of workflow jobs with leases, retry backoff and dead-lettering
+    """
+
+    def __init__(self, lease_seconds: int = 300, max_attempts: int = 5,
+                 backoff_base: int = 30, backoff_max: int = 3600):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def enqueue(self, workflow_name: str, context: Dict[str, Any] = None,
+                trigger_name: str = None, run_after: datetime = None,
+                commit: bool = True) -> AutomationJob:
+        """Add a job to the queue. Pass commit=False to batch several enqueues in one transaction."""
+        job = AutomationJob(
+            workflow_name=workflow_name,
+            trigger_name=trigger_name,
+            payload=encode_context(context),
+            status='Pending',
+            attempts=0,
+            max_attempts=self.max_attempts,
+            run_after=run_after or datetime.utcnow()
+        )
+        db.session.add(job)
+
+        if commit:
+            db.session.commit()
+
+        return job
+
+    def enqueue_many(self, workflow_name: str, contexts: List[Dict[str, Any]],
+                     trigger_name: str = None, run_after: datetime = None,
+                     commit: bool = True) -> int:
+        """Add one job per context in a single bulk insert. Returns the number of jobs queued."""
+        if not contexts:
+            return 0
+
+        now = datetime.utcnow()
+        db.session.execute(db.insert(AutomationJob), [
+            {
+                'workflow_name': workflow_name,
+                'trigger_name': trigger_name,
+                'payload': encode_context(context),
+                'status': 'Pending',
+                'attempts': 0,
+                'max_attempts': self.max_attempts,
+                'run_after': run_after or now,
+                'created_date': now
+            }
+            for context in contexts
+        ])
+
+        if commit:
+            db.session.commit()
+
+        return len(contexts)
+
+    def claim(self, worker_id: str, limit: int = 10, workflow_names: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` runnable jobs for a worker.
+        Jobs whose lease expired (crashed worker) are picked up again.
+        """
+        now = datetime.utcnow()
+        runnable = db.or_(
+            db.and_(AutomationJob.status == 'Pending', AutomationJob.run_after <= now),
+            db.and_(
+                AutomationJob.status == 'Running',
+                AutomationJob.locked_until < now,
+                AutomationJob.attempts < AutomationJob.max_attempts
+            )
+        )
+
+        candidates = db.session.query(AutomationJob.id).filter(runnable)
+        if workflow_names is not None:
+            candidates = candidates.filter(AutomationJob.workflow_name.in_(workflow_names))
+        candidate_ids = [row.id for row in candidates.order_by(AutomationJob.run_after, AutomationJob.id).limit(limit)]
+
+        if not candidate_ids:
+            return []
+
+        # The runnable condition is re-checked by the UPDATE itself, so two workers racing
+        # for the same candidates cannot both take a job.
+        token = f"{worker_id}:{uuid.uuid4().hex}"
+        AutomationJob.query.filter(
+            AutomationJob.id.in_(candidate_ids),
+            runnable
+        ).update({
+            'status': 'Running',
+            'locked_by': token,
+            'locked_until': now + timedelta(seconds=self.lease_seconds),
+            'started_date': now,
+            'attempts': AutomationJob.attempts + 1
+        }, synchronize_session=False)
+        db.session.commit()
+
+        jobs = AutomationJob.query.filter(AutomationJob.locked_by == token).order_by(AutomationJob.id).all()
+        return [
+            {
+                'id': job.id,
+                'workflow_name': job.workflow_name,
+                'trigger_name': job.trigger_name,
+                'context': decode_context(job.payload),
+                'attempts': job.attempts,
+                'lock_token': token
+            }
+            for job in jobs
+        ]
+
+    def extend_lease(self, job_id: int, lock_token: str) -> bool:
+        """Renew a job's lease. Returns False if another worker has since taken the job over."""
+        updated = AutomationJob.query.filter(
+            AutomationJob.id == job_id,
+            AutomationJob.locked_by == lock_token
+        ).update({
+            'locked_until': datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        }, synchronize_session=False)
+        db.session.commit()
+        return updated > 0
+
+    @property
+    def heartbeat_seconds(self) -> float:
+        """Renew running jobs' leases well before they expire"""
+        return self.lease_seconds / 3
+
+    def extend_leases(self, leases: Dict[int, str]) -> List[int]:
+        """
+        Renew the leases of running jobs, given as job id -> lock token, in one
+        statement. Returns the ids of jobs another worker has since taken over.
+        """
+        if not leases:
+            return []
+
+        held = db.or_(*[
+            db.and_(AutomationJob.id == job_id, AutomationJob.locked_by == lock_token)
+            for job_id, lock_token in leases.items()
+        ])
+        values = {'locked_until': datetime.utcnow() + timedelta(seconds=self.lease_seconds)}
+
+        if db.engine.dialect.update_returning:
+            renewed = db.session.execute(
+                db.update(AutomationJob).where(held).values(values).returning(AutomationJob.id)
+            ).scalars().all()
+        else:
+            # Lock the rows still held, then renew exactly those
+            renewed = [row[0] for row in db.session.query(AutomationJob.id).filter(held).with_for_update()]
+            if renewed:
+                db.session.execute(
+                    db.update(AutomationJob).where(AutomationJob.id.in_(renewed), held).values(values)
+                )
+
+        db.session.commit()
+        return sorted(set(leases) - set(renewed))
+
+    def release(self, job_ids: List[int], lock_token: str = None):
+        """Hand claimed but unstarted jobs back to the queue without counting an attempt"""
+        if not job_ids:
+            return
+
+        query = AutomationJob.query.filter(
+            AutomationJob.id.in_(job_ids),
+            AutomationJob.status == 'Running'
+        )
+        if lock_token:
+            query = query.filter(AutomationJob.locked_by == lock_token)
+
+        query.update({
+            'status': 'Pending',
+            'locked_by': None,
+            'locked_until': None,
+            'attempts': AutomationJob.attempts - 1
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def complete(self, job_id: int, lock_token: str = None):
+        """Mark a claimed job as finished"""
+        query = AutomationJob.query.filter(AutomationJob.id == job_id)
+        if lock_token:
+            query = query.filter(AutomationJob.locked_by == lock_token)
+
+        query.update({
+            'status': 'Completed',
+            'locked_by': None,
+            'locked_until': None,
+            'last_error': None,
+            'completed_date': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def fail(self, job_id: int, error: str, lock_token: str = None):
+        """Record a failed attempt, scheduling a retry with exponential backoff or dead-lettering the job"""
+        query = AutomationJob.query.filter(AutomationJob.id == job_id)
+        if lock_token:
+            query = query.filter(AutomationJob.locked_by == lock_token)
+
+        job = query.first()
+        if not job:
+            return
+
+        job.last_error = error
+        job.locked_by = None
+        job.locked_until = None
+
+        if job.attempts >= job.max_attempts:
+            job.status = 'Dead'
+            logger.error(f"Job {job.id} ({job.workflow_name}) moved to dead-letter after {job.attempts} attempts: {error}")
+        else:
+            delay = min(self.backoff_base * (2 ** (job.attempts - 1)), self.backoff_max)
+            job.status = 'Pending'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Job {job.id} ({job.workflow_name}) failed, retrying in {delay}s: {error}")
+
+        db.session.commit()
+
+    def retry(self, job_id: int) -> bool:
+        """Put a dead-lettered job back on the queue with a fresh attempt budget"""
+        job = AutomationJob.query.get(job_id)
+        if not job or job.status != 'Dead':
+            return False
+
+        job.status = 'Pending'
+        job.attempts = 0
+        job.run_after = datetime.utcnow()
+        job.last_error = None
+        db.session.commit()
+        return True
+
+    def purge(self, completed_before: datetime) -> int:
+        """Delete old completed jobs and dead-letter jobs whose final lease expired"""
+        now = datetime.utcnow()
+
+        AutomationJob.query.filter(
+            AutomationJob.status == 'Running',
+            AutomationJob.locked_until < now,
+            AutomationJob.attempts >= AutomationJob.max_attempts
+        ).update({
+            'status': 'Dead',
+            'locked_by': None,
+            'locked_until': None,
+            'last_error': 'Lease expired on final attempt'
+        }, synchronize_session=False)
+
+        deleted = AutomationJob.query.filter(
+            AutomationJob.status == 'Completed',
+            AutomationJob.completed_date < completed_before
+        ).delete(synchronize_session=False)
+
+        db.session.commit()
+        return deleted
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get job counts by status"""
+        counts = db.session.query(
+            AutomationJob.status,
+            db.func.count(AutomationJob.id)
+        ).group_by(AutomationJob.status).all()
+
+        stats = {'Pending': 0, 'Running': 0, 'Completed': 0, 'Dead': 0}
+        stats.update({status: count for status, count in counts})
+        return stats
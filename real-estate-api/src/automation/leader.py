@@ -0,0 +1,92 @@
+"""
+Leader Election
+Database lease that lets exactly one process run the periodic automation passes
+"""
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.automation_lease import AutomationLease
+
+logger = logging.getLogger(__name__)
+
+class LeaderElection:
+    """
+    Lease-based leader election. The holder renews its lease with a heartbeat;
+    if it stops heartbeating, any other process takes over once the lease expires.
+    """
+
+    def __init__(self, name: str = 'scheduler', lease_seconds: int = 30):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @property
+    def heartbeat_seconds(self) -> float:
+        """Renew well before expiry so one slow heartbeat does not cost the lease"""
+        return self.lease_seconds / 3
+
+    def acquire(self) -> bool:
+        """Renew the lease if held, take it over if expired. Returns True while this process leads."""
+        now = datetime.utcnow()
+        lease_values = {
+            'heartbeat_date': now,
+            'expires_date': now + timedelta(seconds=self.lease_seconds)
+        }
+
+        # Heartbeat an existing lease
+        renewed = AutomationLease.query.filter(
+            AutomationLease.name == self.name,
+            AutomationLease.holder == self.holder_id
+        ).update(lease_values, synchronize_session=False)
+        if renewed:
+            db.session.commit()
+            return True
+
+        # Take over a lease that expired or was released. The expiry check is part
+        # of the UPDATE, so only one contender can win.
+        taken = AutomationLease.query.filter(
+            AutomationLease.name == self.name,
+            db.or_(AutomationLease.expires_date.is_(None), AutomationLease.expires_date < now)
+        ).update({
+            'holder': self.holder_id,
+            'acquired_date': now,
+            **lease_values
+        }, synchronize_session=False)
+        db.session.commit()
+        if taken:
+            logger.info(f"{self.holder_id} took over the {self.name} lease")
+            return True
+
+        if db.session.get(AutomationLease, self.name):
+            return False
+
+        # First process ever: create the lease row
+        try:
+            db.session.add(AutomationLease(name=self.name, holder=self.holder_id, acquired_date=now, **lease_values))
+            db.session.commit()
+            logger.info(f"{self.holder_id} acquired the {self.name} lease")
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    def release(self):
+        """Give up the lease so another process can take over immediately"""
+        AutomationLease.query.filter(
+            AutomationLease.name == self.name,
+            AutomationLease.holder == self.holder_id
+        ).update({'expires_date': None}, synchronize_session=False)
+        db.session.commit()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Current lease holder"""
+        lease = db.session.get(AutomationLease, self.name)
+        return {
+            'holder_id': self.holder_id,
+            'lease': lease.to_dict() if lease else None
+        }
@@ -0,0 +1,243 @@
+"""
+Metrics Cache
+TTL cache for the dashboard metrics endpoints. Write routes invalidate the
+metrics they change, concurrent misses for the same metrics share one
+computation, and entries live in process memory or, when several API
+processes should share them, in Redis.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Metrics cached for the dashboard, by cache name
+LEAD_METRICS = 'leads'
+TRANSACTION_METRICS = 'transactions'
+AUTOMATION_METRICS = 'automation'
+WORKFLOW_METRICS = 'workflows'
+
+class MemoryBackend:
+    """
+    Entries held in this process, dropped once their TTL passes. Cached values
+    are shared between requests and must not be modified by callers.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries = {k: entry for k, entry in self.entries.items() if entry[0] > now}
+                while len(self.entries) >= self.max_entries:
+                    self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = (now + ttl, value)
+
+    def generation(self, name: str) -> int:
+        return self.generations.get(name, 0)
+
+    def bump(self, name: str) -> int:
+        with self.lock:
+            self.generations[name] = self.generations.get(name, 0) + 1
+            return self.generations[name]
+
+    def lock_key(self, key: str, ttl: float) -> bool:
+        # Threads of this process already share one computation per key
+        return True
+
+    def unlock_key(self, key: str):
+        pass
+
+class RedisBackend:
+    """
+    Entries shared by every process using the same Redis, stored as JSON.
+    Needs the `redis` package, which is only required for this backend.
+    """
+
+    def __init__(self, url: str, prefix: str = 'metrics:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self.client.get(self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.client.set(self.prefix + key, json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def generation(self, name: str) -> int:
+        return int(self.client.get(f'{self.prefix}generation:{name}') or 0)
+
+    def bump(self, name: str) -> int:
+        return self.client.incr(f'{self.prefix}generation:{name}')
+
+    def lock_key(self, key: str, ttl: float) -> bool:
+        """Claim a computation across processes; False if another process holds it"""
+        return bool(self.client.set(f'{self.prefix}lock:{key}', '1', nx=True, px=max(1, int(ttl * 1000))))
+
+    def unlock_key(self, key: str):
+        self.client.delete(f'{self.prefix}lock:{key}')
+
+class _Flight:
+    """One computation in progress, awaited by every concurrent miss for its key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class MetricsCache:
+    """
+    Cached metrics by name. Entries are stored under the name's generation,
+    so `invalidate` just bumps the generation: later reads miss, and a
+    computation that started before the write can only fill the old
+    generation's entry. Concurrent misses in this process wait for one
+    computation; across processes, a backend lock makes the others poll for
+    the result rather than run the same queries. If the backend fails, values
+    are computed uncached.
+    """
+
+    def __init__(self, backend=None, ttl: float = 30, lock_timeout: float = 30, poll_interval: float = 0.05):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.flights: Dict[str, _Flight] = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0, 'errors': 0}
+
+    def _count(self, stat: str):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def get(self, name: str, compute: Callable[[], Any], ttl: float = None) -> Any:
+        """Cached value of `name`, computing it with `compute` on a miss"""
+        if self.ttl <= 0:
+            return compute()
+
+        try:
+            key = f'{name}:{self.backend.generation(name)}'
+            value = self.backend.get(key)
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Metrics cache unavailable, computing {name} uncached: {e}")
+            return compute()
+
+        if value is not None:
+            self._count('hits')
+            return value
+
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+
+        if not leader:
+            self._count('coalesced')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._compute(key, compute, ttl or self.ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+            flight.done.set()
+
+    def _lock(self, key: str) -> bool:
+        try:
+            return self.backend.lock_key(key, self.lock_timeout)
+        except Exception:
+            return False
+
+    def _compute(self, key: str, compute: Callable[[], Any], ttl: float) -> Any:
+        """Compute and store a value, unless another process is already doing so"""
+        deadline = time.monotonic() + self.lock_timeout
+        locked = self._lock(key)
+
+        # Wait for the holder's result; take over if it gives up without storing one
+        while not locked and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            try:
+                value = self.backend.get(key)
+            except Exception:
+                break
+            if value is not None:
+                self._count('coalesced')
+                return value
+            locked = self._lock(key)
+
+        try:
+            self._count('misses')
+            value = compute()
+            try:
+                self.backend.set(key, value, ttl)
+            except Exception as e:
+                self._count('errors')
+                logger.warning(f"Could not cache metrics {key}: {e}")
+            return value
+        finally:
+            if locked:
+                try:
+                    self.backend.unlock_key(key)
+                except Exception:
+                    pass
+
+    def invalidate(self, *names: str):
+        """Drop the cached values of the named metrics, in every process sharing the backend"""
+        for name in names:
+            try:
+                self.backend.bump(name)
+                self._count('invalidations')
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Could not invalidate metrics {name}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit, miss and coalescing counters"""
+        with self.lock:
+            return {
+                'backend': type(self.backend).__name__,
+                'ttl': self.ttl,
+                'in_flight': len(self.flights),
+                **self.stats
+            }
+
+def backend_from_url(url: Optional[str]):
+    """Backend for a METRICS_CACHE_URL: Redis for redis:// URLs, otherwise in-process"""
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            return RedisBackend(url)
+        except ImportError:
+            logger.error("METRICS_CACHE_URL points at Redis but the redis package is not installed; caching in process")
+    return MemoryBackend()
+
+# Global metrics cache instance
+metrics_cache = MetricsCache(
+    backend_from_url(os.environ.get('METRICS_CACHE_URL')),
+    ttl=float(os.environ.get('METRICS_CACHE_TTL', 30))
+)
@@ -0,0 +1,213 @@
+"""
+Email Outbox Sender
+Delivers emails queued in the outbox table in batches, with leases,
+retry backoff and delivery status written back to the linked communication
+"""
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+from src.models.user import db
+from src.models.email_outbox import EmailOutbox
+from src.models.communication import Communication
+from src.automation.suppression import normalize_email
+
+logger = logging.getLogger(__name__)
+
+class OutboxSender:
+    """
+    Drains the email outbox. Messages are leased before delivery, so a crashed
+    sender's batch is picked up again once its lease expires. Outcomes are
+    committed right after their SMTP sends: a single message on its own, copies
+    of the same content every `copies_per_commit` copies, so a crash re-sends
+    at most that many. A resent message keeps its Message-ID, so receiving
+    servers can drop the duplicate.
+    """
+
+    def __init__(self, email_service, batch_size: int = 50, lease_seconds: int = 300,
+                 backoff_base: int = 60, backoff_max: int = 3600, copies_per_commit: int = 10):
+        self.email_service = email_service
+        self.batch_size = batch_size
+        self.copies_per_commit = copies_per_commit
+        self.lease_seconds = lease_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def claim(self, worker_id: str, limit: int = None) -> str:
+        """Lease up to `limit` deliverable messages. Returns the lease token."""
+        now = datetime.utcnow()
+        deliverable = db.or_(
+            db.and_(EmailOutbox.status == 'Pending', EmailOutbox.next_attempt <= now),
+            db.and_(
+                EmailOutbox.status == 'Sending',
+                EmailOutbox.locked_until < now,
+                EmailOutbox.attempts < EmailOutbox.max_attempts
+            )
+        )
+
+        candidate_ids = [
+            row.id for row in db.session.query(EmailOutbox.id).filter(deliverable).order_by(
+                EmailOutbox.next_attempt, EmailOutbox.id
+            ).limit(limit or self.batch_size)
+        ]
+
+        token = f"{worker_id}:{uuid.uuid4().hex}"
+        if candidate_ids:
+            # Re-check deliverability in the UPDATE so racing senders cannot share a message
+            EmailOutbox.query.filter(
+                EmailOutbox.id.in_(candidate_ids),
+                deliverable
+            ).update({
+                'status': 'Sending',
+                'locked_by': token,
+                'locked_until': now + timedelta(seconds=self.lease_seconds),
+                'attempts': EmailOutbox.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+
+        return token
+
+    def send_batch(self, worker_id: str) -> int:
+        """
+        Claim and deliver one batch. Returns the number of messages attempted.
+        Copies of the same content are delivered together on one SMTP session.
+        """
+        token = self.claim(worker_id)
+        entries = EmailOutbox.query.filter(EmailOutbox.locked_by == token).order_by(EmailOutbox.id).all()
+
+        # Addresses suppressed since the message was queued are failed without sending
+        suppressed = self.email_service.suppressions.suppressed(entry.to_email for entry in entries)
+
+        groups = {}
+        for entry in entries:
+            if normalize_email(entry.to_email) in suppressed:
+                entry.attempts = entry.max_attempts
+                self._mark_failed(entry, 'Recipient is suppressed')
+                continue
+            groups.setdefault(entry.content_key or f'entry:{entry.id}', []).append(entry)
+
+        for group in groups.values():
+            if len(group) == 1:
+                self._send_one(group[0])
+                continue
+            for start in range(0, len(group), self.copies_per_commit):
+                self._send_copies(group[start:start + self.copies_per_commit])
+
+        return len(entries)
+
+    def _send_one(self, entry: EmailOutbox):
+        """Deliver a single message and record the outcome"""
+        try:
+            self.email_service.deliver_email(
+                entry.to_email,
+                entry.subject,
+                entry.body,
+                entry.from_email,
+                json.loads(entry.attachments) if entry.attachments else None,
+                entry.message_id
+            )
+        except Exception as e:
+            self._mark_failed(entry, str(e), bounced=self.email_service.suppressions.record_bounce(e, entry.to_email))
+        else:
+            self._mark_sent(entry)
+
+    def _send_copies(self, group: List[EmailOutbox]):
+        """Deliver copies of one message on one pooled session and record their outcomes in one commit"""
+        first = group[0]
+        try:
+            errors = self.email_service.deliver_fanout(
+                [(entry.to_email, entry.message_id) for entry in group],
+                first.subject,
+                first.body,
+                first.from_email,
+                json.loads(first.attachments) if first.attachments else None
+            )
+        except Exception as e:
+            errors = {entry.to_email: e for entry in group}
+
+        for entry in group:
+            if entry.to_email in errors:
+                error = errors[entry.to_email]
+                bounced = self.email_service.suppressions.record_bounce(error, entry.to_email)
+                self._mark_failed(entry, str(error), commit=False, bounced=bounced)
+            else:
+                self._mark_sent(entry, commit=False)
+
+        db.session.commit()
+
+    def _mark_sent(self, entry: EmailOutbox, commit: bool = True):
+        """Record a delivered message and its communication"""
+        now = datetime.utcnow()
+        entry.status = 'Sent'
+        entry.sent_date = now
+        entry.last_error = None
+        entry.locked_by = None
+        entry.locked_until = None
+
+        if entry.communication_id:
+            Communication.query.filter(Communication.id == entry.communication_id).update({
+                'status': 'Sent',
+                'external_id': entry.message_id
+            }, synchronize_session=False)
+
+        if commit:
+            db.session.commit()
+
+    def _mark_failed(self, entry: EmailOutbox, error: str, commit: bool = True, bounced: bool = False):
+        """
+        Schedule a retry with exponential backoff, or give up and fail the
+        communication. A permanent bounce is never retried.
+        """
+        entry.last_error = error
+        entry.locked_by = None
+        entry.locked_until = None
+
+        if bounced or entry.attempts >= entry.max_attempts:
+            entry.status = 'Failed'
+            logger.error(f"Email {entry.id} to {entry.to_email} failed after {entry.attempts} attempts: {error}")
+
+            if entry.communication_id:
+                Communication.query.filter(Communication.id == entry.communication_id).update({
+                    'status': 'Failed',
+                    'external_id': entry.message_id
+                }, synchronize_session=False)
+        else:
+            delay = min(self.backoff_base * (2 ** (entry.attempts - 1)), self.backoff_max)
+            entry.status = 'Pending'
+            entry.next_attempt = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Email {entry.id} to {entry.to_email} failed, retrying in {delay}s: {error}")
+
+        if commit:
+            db.session.commit()
+
+    def purge(self, sent_before: datetime) -> int:
+        """Delete delivered messages older than a cutoff, failing any whose final lease expired"""
+        now = datetime.utcnow()
+
+        expired = EmailOutbox.query.filter(
+            EmailOutbox.status == 'Sending',
+            EmailOutbox.locked_until < now,
+            EmailOutbox.attempts >= EmailOutbox.max_attempts
+        ).all()
+        for entry in expired:
+            self._mark_failed(entry, 'Lease expired on final attempt')
+
+        deleted = EmailOutbox.query.filter(
+            EmailOutbox.status == 'Sent',
+            EmailOutbox.sent_date < sent_before
+        ).delete(synchronize_session=False)
+
+        db.session.commit()
+        return deleted
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get outbox counts by status"""
+        counts = db.session.query(
+            EmailOutbox.status,
+            db.func.count(EmailOutbox.id)
+        ).group_by(EmailOutbox.status).all()
+
+        stats = {'Pending': 0, 'Sending': 0, 'Sent': 0, 'Failed': 0}
+        stats.update({status: count for status, count in counts})
+        return stats
@@ -0,0 +1,117 @@
+"""
+Send Rate Limiting
+Token buckets that pace outbound email to what the SMTP provider accepts
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, with bursts of up to
+    `capacity`; a rate of 0 disables the limit. Safe to share between threads; `acquire` blocks until a token is free.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last update. Caller holds the lock."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available. Returns 0 on success, else the seconds until they will be."""
+        if self.rate <= 0:
+            return 0.0  # Unlimited
+
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        """Block until tokens are available, then take them"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+class SendThrottle:
+    """
+    Paces sends per recipient domain and overall. Each domain gets its own
+    bucket (`domain_rate` per second, or its entry in `domain_rates`) so one
+    busy provider cannot trip its limits, while a global bucket caps total
+    throughput. Buckets of domains not seen for a while are dropped.
+    """
+
+    def __init__(self, global_rate: float = 50, domain_rate: float = 10, domain_burst: float = None,
+                 domain_rates: Dict[str, float] = None, max_domains: int = 10000):
+        self.domain_rate = domain_rate
+        self.domain_burst = domain_burst
+        self.domain_rates = {domain.lower(): rate for domain, rate in (domain_rates or {}).items()}
+        self.max_domains = max_domains
+        self.global_bucket = TokenBucket(global_rate)
+        self.domains = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'sends': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        """The domain's bucket, created on first use"""
+        with self.lock:
+            bucket = self.domains.get(domain)
+            if bucket is None:
+                rate = self.domain_rates.get(domain, self.domain_rate)
+                bucket = self.domains[domain] = TokenBucket(rate, self.domain_burst)
+                while len(self.domains) > self.max_domains:
+                    self.domains.popitem(last=False)
+            else:
+                self.domains.move_to_end(domain)
+            return bucket
+
+    def acquire(self, to_email: str):
+        """Block until a send to this address is allowed by its domain and the global budget"""
+        bucket = self._bucket(to_email.rsplit('@', 1)[-1].lower())
+        waited = 0.0
+
+        # Take the domain token first so waiting on a slow domain does not hold global budget
+        for limiter in (bucket, self.global_bucket):
+            while True:
+                wait = limiter.try_acquire()
+                if not wait:
+                    break
+                waited += wait
+                time.sleep(wait)
+
+        with self.lock:
+            self.stats['sends'] += 1
+            if waited:
+                self.stats['throttled'] += 1
+                self.stats['wait_seconds'] += waited
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Send and wait counters"""
+        with self.lock:
+            return {
+                'global_rate': self.global_bucket.rate,
+                'domain_rate': self.domain_rate,
+                'domains_tracked': len(self.domains),
+                **self.stats
+            }
+
+def parse_domain_rates(value: str) -> Dict[str, float]:
+    """Parse 'gmail.com=20,yahoo.com=5' into per-domain rates"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            domain, rate = item.split('=', 1)
+            rates[domain.strip().lower()] = float(rate)
+    return rates
@@ -0,0 +1,213 @@
+"""
+Report Metrics
+KPI builders shared by the daily report and the dashboard metrics endpoints.
+Each builder computes all of its table's KPIs in one conditional-aggregation query.
+"""
+import logging
+from datetime import datetime, date, timedelta
+from typing import Dict, Any
+from src.models.user import db
+from src.models.lead import Lead
+from src.models.transaction import Transaction, TransactionMilestone
+from src.models.communication import Communication
+from src.models.marketing_campaign import MarketingCampaign
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_LEAD_STATUSES = ['New', 'Contacted', 'Qualified', 'Nurturing']
+ACTIVE_TRANSACTION_STATUSES = ['Active', 'Under Contract', 'Pending']
+OPEN_MILESTONE_STATUSES = ['Pending', 'In Progress']
+HOT_LEAD_THRESHOLD = 80
+
+def _count_if(condition):
+    """Number of rows matching a condition, as an aggregate column"""
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+def _sum_if(condition, column):
+    """Sum of a column over rows matching a condition, as an aggregate column"""
+    return db.func.coalesce(db.func.sum(db.case((condition, column), else_=0)), 0)
+
+def _day_bounds(day: date):
+    """First and last instant of a calendar day"""
+    return datetime.combine(day, datetime.min.time()), datetime.combine(day, datetime.max.time())
+
+def _days_between(start_column, end_column):
+    """Whole days from one date column to another in the database's own date arithmetic"""
+    if db.engine.dialect.name == 'sqlite':
+        return db.func.julianday(end_column) - db.func.julianday(start_column)
+    return end_column - start_column
+
+def lead_metrics(as_of: date = None, since: datetime = None) -> Dict[str, Any]:
+    """
+    Lead KPIs for a day: leads created that day and since `since` (default: the last
+    7 days), hot leads, follow-ups due, conversions that day, and breakdowns by
+    source and status. One query grouped by (source, status).
+    """
+    as_of = as_of or datetime.now().date()
+    since = since or datetime.now() - timedelta(days=7)
+    day_start, day_end = _day_bounds(as_of)
+
+    rows = db.session.query(
+        Lead.lead_source,
+        Lead.lead_status,
+        db.func.count(Lead.id),
+        _count_if(Lead.created_date.between(day_start, day_end)),
+        _count_if(Lead.created_date >= since),
+        _count_if(Lead.lead_score >= HOT_LEAD_THRESHOLD),
+        _count_if(db.and_(Lead.next_follow_up <= as_of, Lead.lead_status.in_(ACTIVE_LEAD_STATUSES))),
+        _count_if(db.and_(Lead.lead_status == 'Converted', Lead.last_modified.between(day_start, day_end)))
+    ).group_by(Lead.lead_source, Lead.lead_status).all()
+
+    metrics = {
+        'total_leads': 0,
+        'new_leads_today': 0,
+        'new_leads_since': 0,
+        'hot_leads': 0,
+        'followups_due': 0,
+        'conversions_today': 0,
+        'converted_leads': 0,
+        'leads_by_source': {},
+        'leads_by_status': {}
+    }
+
+    for source, status, total, new_today, new_since, hot, followups_due, conversions in rows:
+        metrics['total_leads'] += total
+        metrics['new_leads_today'] += new_today
+        metrics['new_leads_since'] += new_since
+        metrics['hot_leads'] += hot
+        metrics['followups_due'] += followups_due
+        metrics['conversions_today'] += conversions
+        if status == 'Converted':
+            metrics['converted_leads'] += total
+
+        metrics['leads_by_source'][source] = metrics['leads_by_source'].get(source, 0) + total
+        metrics['leads_by_status'][status] = metrics['leads_by_status'].get(status, 0) + total
+
+    total = metrics['total_leads']
+    metrics['conversion_rate'] = (metrics['converted_leads'] / total * 100) if total > 0 else 0
+    return metrics
+
+def transaction_metrics(as_of: date = None) -> Dict[str, Any]:
+    """
+    Transaction KPIs: active pipeline count and value, projected commission,
+    closings in the next 7 days, at-risk deals, closed volume, average days to
+    close and success rate. One query.
+    """
+    as_of = as_of or datetime.now().date()
+    week_end = as_of + timedelta(days=7)
+    active = Transaction.transaction_status.in_(ACTIVE_TRANSACTION_STATUSES)
+    closed = Transaction.transaction_status == 'Closed'
+    closed_with_dates = db.and_(
+        closed,
+        Transaction.contract_date.isnot(None),
+        Transaction.actual_closing_date.isnot(None)
+    )
+
+    row = db.session.query(
+        db.func.count(Transaction.id),
+        _count_if(active),
+        _count_if(db.and_(Transaction.closing_date.between(as_of, week_end), Transaction.transaction_status != 'Closed')),
+        _count_if(Transaction.risk_level == 'High'),
+        _count_if(closed),
+        _sum_if(closed, Transaction.sale_price),
+        _sum_if(active, Transaction.sale_price),
+        _sum_if(active, Transaction.total_commission),
+        db.func.avg(db.case(
+            (closed_with_dates, _days_between(Transaction.contract_date, Transaction.actual_closing_date)),
+            else_=None
+        ))
+    ).one()
+
+    total, total_active, closing_this_week, at_risk, closed_count, total_volume, \
+        pipeline_value, projected_commission, avg_days_to_close = row
+
+    return {
+        'total_transactions': total,
+        'total_active': total_active,
+        'closing_this_week': closing_this_week,
+        'at_risk': at_risk,
+        'closed_transactions': closed_count,
+        'total_volume': total_volume,
+        'pipeline_value': pipeline_value,
+        'projected_commission': projected_commission,
+        'avg_days_to_close': float(avg_days_to_close or 0),
+        'success_rate': (closed_count / total * 100) if total > 0 else 0
+    }
+
+def milestone_metrics(as_of: date = None) -> Dict[str, Any]:
+    """Open milestones past their due date. One query."""
+    as_of = as_of or datetime.now().date()
+
+    overdue = db.session.query(
+        _count_if(db.and_(
+            TransactionMilestone.due_date < as_of,
+            TransactionMilestone.milestone_status.in_(OPEN_MILESTONE_STATUSES)
+        ))
+    ).scalar()
+
+    return {'overdue_milestones': overdue}
+
+def marketing_metrics(as_of: date = None) -> Dict[str, Any]:
+    """Active campaigns, and email opens for messages sent that day. One query per table."""
+    as_of = as_of or datetime.now().date()
+    day_start, day_end = _day_bounds(as_of)
+
+    active_campaigns = db.session.query(
+        _count_if(MarketingCampaign.campaign_status == 'Active')
+    ).scalar()
+
+    email_opens = db.session.query(
+        _count_if(db.and_(
+            Communication.communication_type == 'Email',
+            Communication.opened == True
+        ))
+    ).filter(
+        Communication.sent_date.between(day_start, day_end)
+    ).scalar()
+
+    return {
+        'active_campaigns': active_campaigns,
+        'email_opens': email_opens
+    }
+
+def automation_metrics(since: datetime = None) -> Dict[str, Any]:
+    """Communications since `since` (default: the last 7 days) and how many were automated emails. One query."""
+    since = since or datetime.now() - timedelta(days=7)
+
+    total, automated_emails = db.session.query(
+        db.func.count(Communication.id),
+        _count_if(db.and_(
+            Communication.is_automated == True,
+            Communication.communication_type == 'Email'
+        ))
+    ).filter(
+        Communication.sent_date >= since
+    ).one()
+
+    return {
+        'total_communications': total,
+        'automated_emails': automated_emails,
+        'automation_rate': (automated_emails / total * 100) if total > 0 else 0
+    }
+
+def daily_report_metrics(report_date: date) -> Dict[str, Any]:
+    """Every KPI in the daily report, in five queries regardless of table sizes"""
+    leads = lead_metrics(report_date)
+    transactions = transaction_metrics(report_date)
+    milestones = milestone_metrics(report_date)
+    marketing = marketing_metrics(report_date)
+
+    return {
+        'new_leads': leads['new_leads_today'],
+        'hot_leads': leads['hot_leads'],
+        'followups_due': leads['followups_due'],
+        'conversions': leads['conversions_today'],
+        'active_transactions': transactions['total_active'],
+        'closing_this_week': transactions['closing_this_week'],
+        'overdue_milestones': milestones['overdue_milestones'],
+        'active_campaigns': marketing['active_campaigns'],
+        'email_opens': marketing['email_opens'],
+        'new_inquiries': leads['new_leads_today'],
+        'pipeline_value': transactions['pipeline_value'],
+        'projected_commission': transactions['projected_commission']
+    }
@@ -0,0 +1,133 @@
+"""
+Workflow Run Recorder
+Buffers workflow run records and writes them in batches, and reports
+latency percentiles, throughput and failure rates from the stored history
+"""
+import logging
+import os
+import socket
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, Any
+from src.models.user import db
+from src.models.workflow_run import WorkflowRun
+from src.automation.buffered_writer import BufferedInsertWriter
+
+logger = logging.getLogger(__name__)
+
+# Rolling windows reported by get_stats, in seconds
+DEFAULT_WINDOWS = {
+    '1h': 3600,
+    '24h': 86400
+}
+
+PERCENTILES = (50, 95, 99)
+
+class RunRecorder(BufferedInsertWriter):
+    """
+    Writes workflow run records through a buffered batch insert, so recording
+    a run never adds a database round trip to the workflow itself, and
+    summarizes the stored history per workflow.
+    """
+
+    def __init__(self, app=None, batch_size: int = 100, flush_interval: float = 5.0):
+        super().__init__(WorkflowRun, app, batch_size, flush_interval)
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    def record(self, workflow_name: str, started: datetime, duration_ms: float, succeeded: bool,
+               error: str = None, items_processed: int = 0, job_id: int = None):
+        """Queue one run record for the next batch insert"""
+        self.add({
+            'workflow_name': workflow_name,
+            'job_id': job_id,
+            'worker': self.worker,
+            'started_date': started,
+            'duration_ms': duration_ms,
+            'status': 'Succeeded' if succeeded else 'Failed',
+            'error': error,
+            'items_processed': items_processed
+        })
+
+    def purge(self, before: datetime) -> int:
+        """Delete run records older than a cutoff"""
+        deleted = WorkflowRun.query.filter(
+            WorkflowRun.started_date < before
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def get_stats(self, windows: Dict[str, int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-workflow totals plus, for each rolling window, run and failure counts,
+        throughput and p50/p95/p99 latency. Buffered records are flushed first.
+        """
+        windows = windows or DEFAULT_WINDOWS
+        self.flush()
+        now = datetime.now()
+
+        with self.app.app_context():
+            # Served from the (workflow_name, started_date) index alone
+            totals = db.session.query(
+                WorkflowRun.workflow_name,
+                db.func.count(WorkflowRun.id),
+                db.func.max(WorkflowRun.started_date)
+            ).group_by(WorkflowRun.workflow_name).all()
+
+            # The largest window is read once; smaller windows are subsets of it
+            rows = db.session.query(
+                WorkflowRun.workflow_name,
+                WorkflowRun.started_date,
+                WorkflowRun.duration_ms,
+                WorkflowRun.status
+            ).filter(
+                WorkflowRun.started_date >= now - timedelta(seconds=max(windows.values()))
+            ).all()
+
+        stats = {
+            name: {
+                'run_count': run_count,
+                'last_run': last_run.isoformat() if last_run else None,
+                'windows': {}
+            }
+            for name, run_count, last_run in totals
+        }
+        if not rows:
+            return stats
+
+        names, started, durations, statuses = zip(*rows)
+        names = np.array(names)
+        ages = (np.datetime64(now) - np.array(started, dtype='datetime64[us]')) / np.timedelta64(1, 's')
+        durations = np.array(durations, dtype=np.float64)
+        failed = np.array(statuses) == 'Failed'
+
+        for label, seconds in windows.items():
+            in_window = ages <= seconds
+            window_stats = self._window_stats(names[in_window], durations[in_window], failed[in_window], seconds)
+            # A run may land between the totals query and the window query
+            for name, summary in window_stats.items():
+                entry = stats.setdefault(name, {'run_count': 0, 'last_run': None, 'windows': {}})
+                entry['windows'][label] = summary
+
+        return stats
+
+    def _window_stats(self, names: np.ndarray, durations: np.ndarray, failed: np.ndarray,
+                      seconds: int) -> Dict[str, Dict[str, Any]]:
+        """Summarize one window's runs, given as parallel name/duration/failed arrays, per workflow"""
+        summary = {}
+        for name in np.unique(names):
+            mask = names == name
+            runs = int(mask.sum())
+            failures = int(failed[mask].sum())
+            p50, p95, p99 = np.percentile(durations[mask], PERCENTILES)
+
+            summary[str(name)] = {
+                'runs': runs,
+                'failures': failures,
+                'failure_rate': round(failures / runs * 100, 1),
+                'throughput_per_min': round(runs / (seconds / 60), 3),
+                'p50_ms': round(float(p50), 1),
+                'p95_ms': round(float(p95), 1),
+                'p99_ms': round(float(p99), 1)
+            }
+
+        return summary
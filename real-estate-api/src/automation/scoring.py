@@ -0,0 +1,321 @@
+"""
+Lead Scoring
+Shared lead scoring tables with scalar and NumPy batch entry points,
+plus the set-based scoring pass used by the automation engine
+"""
+import logging
+import threading
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple, Any, Optional, Sequence
+from src.models.user import db
+from src.models.lead import Lead
+from src.models.communication import Communication
+
+logger = logging.getLogger(__name__)
+
+# Scoring lookup tables, built once at import
+SOURCE_SCORES = {
+    'Referral': 30,
+    'Website Form': 25,
+    'Google Ads': 20,
+    'Social Media': 18,
+    'Open House': 15,
+    'Zillow': 12,
+    'Realtor.com': 10,
+    'Cold Call': 8,
+    'Other': 5
+}
+
+TIMELINE_SCORES = {
+    'ASAP': 25,
+    '1-3 months': 20,
+    '3-6 months': 15,
+    '6-12 months': 10,
+    '1+ years': 5,
+    'Just browsing': 3
+}
+
+INTEREST_SCORES = {
+    'Buying': 15,
+    'Both': 12,
+    'Selling': 10,
+    'Investing': 8,
+    'Renting': 3
+}
+
+DEFAULT_SOURCE_SCORE = 5
+DEFAULT_TIMELINE_SCORE = 3
+DEFAULT_INTEREST_SCORE = 5
+
+# Budget bands: a positive budget_max scores BUDGET_POINTS[i] where i is the
+# number of thresholds it meets
+BUDGET_THRESHOLDS = np.array([200000, 300000, 500000, 1000000], dtype=np.float64)
+BUDGET_POINTS = np.array([5, 8, 10, 15, 20], dtype=np.int16)
+
+CONTACT_POINTS = 5
+ENGAGEMENT_POINTS_PER_COMMUNICATION = 2
+MAX_ENGAGEMENT_POINTS = 10
+MAX_SCORE = 100
+
+ACTIVE_LEAD_STATUSES = ['New', 'Contacted', 'Qualified', 'Nurturing']
+HOT_LEAD_THRESHOLD = 80
+ENGAGEMENT_WINDOW_DAYS = 7
+
+def budget_score(budget_max: float) -> int:
+    """Points for a single budget_max value"""
+    if not budget_max:
+        return 0
+    return int(BUDGET_POINTS[np.searchsorted(BUDGET_THRESHOLDS, budget_max, side='right')])
+
+def score_lead_fields(lead_source: str, timeline: str, budget_max: float, property_interest: str,
+                      has_email: bool, has_phone: bool, recent_communications: int = 0) -> int:
+    """Score a single lead from its raw field values"""
+    score = SOURCE_SCORES.get(lead_source, DEFAULT_SOURCE_SCORE)
+    score += TIMELINE_SCORES.get(timeline, DEFAULT_TIMELINE_SCORE)
+    score += budget_score(budget_max)
+    score += INTEREST_SCORES.get(property_interest, DEFAULT_INTEREST_SCORE)
+
+    # Contact completeness
+    if has_email:
+        score += CONTACT_POINTS
+    if has_phone:
+        score += CONTACT_POINTS
+
+    # Engagement - max 10 points
+    score += min(recent_communications * ENGAGEMENT_POINTS_PER_COMMUNICATION, MAX_ENGAGEMENT_POINTS)
+
+    return min(score, MAX_SCORE)
+
+def score_lead_data(data: Dict[str, Any], existing_lead=None) -> int:
+    """
+    Score a lead from an API payload, falling back to the stored lead's values
+    for fields the payload leaves out. Used by POST /leads and PUT /leads/<id>.
+    """
+    def value(field, default):
+        if data.get(field):
+            return data.get(field)
+        return getattr(existing_lead, field) if existing_lead else default
+
+    return score_lead_fields(
+        value('lead_source', 'Other'),
+        value('timeline', 'Just browsing'),
+        value('budget_max', 0),
+        value('property_interest', 'Buying'),
+        bool(data.get('email') or (existing_lead and existing_lead.email)),
+        bool(data.get('phone') or (existing_lead and existing_lead.phone))
+    )
+
+def _lookup_points(values: Sequence[str], table: Dict[str, int], default: int) -> np.ndarray:
+    """Map a column of category labels to points through a lookup table"""
+    get = table.get
+    return np.fromiter((get(value, default) for value in values), dtype=np.int16, count=len(values))
+
+def score_arrays(lead_source: Sequence[str], timeline: Sequence[str], budget_max: Sequence[float],
+                 property_interest: Sequence[str], has_email: Sequence[bool], has_phone: Sequence[bool],
+                 recent_communications: Sequence[int] = None) -> np.ndarray:
+    """
+    Score many leads in one call from column arrays of equal length.
+    Returns an int array matching score_lead_fields element for element.
+    """
+    scores = _lookup_points(lead_source, SOURCE_SCORES, DEFAULT_SOURCE_SCORE).astype(np.int32)
+    scores += _lookup_points(timeline, TIMELINE_SCORES, DEFAULT_TIMELINE_SCORE)
+    scores += _lookup_points(property_interest, INTEREST_SCORES, DEFAULT_INTEREST_SCORE)
+
+    budgets = np.nan_to_num(np.asarray(budget_max, dtype=np.float64), nan=0.0)
+    budget_points = BUDGET_POINTS[np.searchsorted(BUDGET_THRESHOLDS, budgets, side='right')]
+    scores += np.where(budgets != 0, budget_points, 0)
+
+    scores += np.asarray(has_email, dtype=bool) * CONTACT_POINTS
+    scores += np.asarray(has_phone, dtype=bool) * CONTACT_POINTS
+
+    if recent_communications is not None:
+        engagement = np.asarray(recent_communications, dtype=np.int32) * ENGAGEMENT_POINTS_PER_COMMUNICATION
+        scores += np.minimum(engagement, MAX_ENGAGEMENT_POINTS)
+
+    return np.minimum(scores, MAX_SCORE)
+
+def engagement_counts(since: datetime, lead_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """Count communications per lead since a point in time with a single grouped query"""
+    query = db.session.query(
+        Communication.lead_id,
+        db.func.count(Communication.id)
+    ).filter(
+        Communication.lead_id.isnot(None),
+        Communication.sent_date >= since
+    )
+
+    if lead_ids is not None:
+        query = query.filter(Communication.lead_id.in_(lead_ids))
+
+    return {lead_id: count for lead_id, count in query.group_by(Communication.lead_id).all()}
+
+class LeadScoringPass:
+    """
+    Re-scores leads in bulk: one grouped engagement query, in-memory scoring
+    over chunks of lead columns, and one bulk UPDATE of changed scores.
+
+    After the first full pass it runs incrementally, re-scoring only the dirty set:
+    leads edited since the Lead.last_modified watermark, leads with communications
+    newer than the Communication.sent_date watermark, and leads with a communication
+    that aged out of the engagement window since the previous pass.
+    """
+
+    def __init__(self, chunk_size: int = 5000, id_batch_size: int = 500):
+        self.chunk_size = chunk_size
+        self.id_batch_size = id_batch_size
+        self.lead_watermark = None
+        self.communication_watermark = None
+        self.window_start = None
+        self.last_pass = {}
+        self.lock = threading.Lock()
+
+    def run(self, full: bool = False) -> List[Tuple[int, int]]:
+        """
+        Score leads and write back the ones that changed. Falls back to a full pass
+        when no watermarks exist yet. Returns (lead_id, score) for leads that crossed
+        the hot lead threshold.
+        """
+        with self.lock:
+            started = time.perf_counter()
+            since = datetime.now() - timedelta(days=ENGAGEMENT_WINDOW_DAYS)
+            full = full or self.lead_watermark is None or self.window_start is None
+
+            # Read the new watermarks before collecting work so nothing written
+            # in between can slip past both this pass and the next
+            lead_watermark = db.session.query(db.func.max(Lead.last_modified)).scalar()
+            communication_watermark = db.session.query(db.func.max(Communication.sent_date)).scalar()
+
+            if full:
+                changes, hot_leads, scored = self._score_all(since)
+            else:
+                dirty_ids = self._dirty_lead_ids(since)
+                changes, hot_leads, scored = self._score_ids(dirty_ids, since)
+
+            for start in range(0, len(changes), self.chunk_size):
+                db.session.execute(db.update(Lead), changes[start:start + self.chunk_size])
+            db.session.commit()
+
+            self.lead_watermark = lead_watermark or self.lead_watermark or datetime.min
+            self.communication_watermark = communication_watermark or self.communication_watermark or datetime.min
+            self.window_start = since
+
+            self.last_pass = {
+                'mode': 'full' if full else 'incremental',
+                'dirty_leads': scored,
+                'updated_leads': len(changes),
+                'hot_leads': len(hot_leads),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                'finished_at': datetime.now().isoformat()
+            }
+
+        logger.info(f"Lead scoring ({self.last_pass['mode']}) scored {scored} leads, "
+                    f"updated {len(changes)}, {len(hot_leads)} newly hot")
+        return hot_leads
+
+    def _dirty_lead_ids(self, since: datetime) -> List[int]:
+        """Collect ids of leads whose score inputs may have changed since the last pass"""
+        edited = db.session.query(Lead.id).filter(
+            Lead.last_modified > self.lead_watermark
+        )
+        new_communications = db.session.query(Communication.lead_id).filter(
+            Communication.lead_id.isnot(None),
+            Communication.sent_date > self.communication_watermark
+        )
+        aged_out = db.session.query(Communication.lead_id).filter(
+            Communication.lead_id.isnot(None),
+            Communication.sent_date >= self.window_start,
+            Communication.sent_date < since
+        )
+
+        dirty = edited.union(new_communications, aged_out).all()
+        return sorted(row[0] for row in dirty)
+
+    def _score_all(self, since: datetime):
+        """Score every active lead in keyset-paginated chunks"""
+        counts = engagement_counts(since)
+        changes = []
+        hot_leads = []
+        scored = 0
+        last_id = 0
+
+        while True:
+            rows = self._lead_rows().filter(
+                Lead.id > last_id
+            ).order_by(Lead.id).limit(self.chunk_size).all()
+
+            if not rows:
+                break
+
+            self._score_rows(rows, counts, changes, hot_leads)
+            scored += len(rows)
+            last_id = rows[-1].id
+
+        return changes, hot_leads, scored
+
+    def _score_ids(self, lead_ids: List[int], since: datetime):
+        """Score the given leads, skipping any that are no longer active"""
+        changes = []
+        hot_leads = []
+        scored = 0
+
+        for start in range(0, len(lead_ids), self.id_batch_size):
+            batch = lead_ids[start:start + self.id_batch_size]
+            counts = engagement_counts(since, batch)
+            rows = self._lead_rows().filter(Lead.id.in_(batch)).all()
+
+            self._score_rows(rows, counts, changes, hot_leads)
+            scored += len(rows)
+
+        return changes, hot_leads, scored
+
+    def _lead_rows(self):
+        """Query for the columns scoring needs from active leads"""
+        return db.session.query(
+            Lead.id,
+            Lead.lead_source,
+            Lead.timeline,
+            Lead.budget_max,
+            Lead.property_interest,
+            Lead.email,
+            Lead.phone,
+            Lead.lead_score,
+            Lead.last_modified
+        ).filter(Lead.lead_status.in_(ACTIVE_LEAD_STATUSES))
+
+    def _score_rows(self, rows, counts: Dict[int, int], changes: List[Dict], hot_leads: List[Tuple[int, int]]):
+        """Score a chunk of rows in one vectorized call, collecting changed scores and newly hot leads"""
+        if not rows:
+            return
+
+        ids, sources, timelines, budgets, interests, emails, phones, old_scores, last_modified = zip(*rows)
+
+        new_scores = score_arrays(
+            sources,
+            timelines,
+            [budget if budget is not None else 0 for budget in budgets],
+            interests,
+            [bool(email) for email in emails],
+            [bool(phone) for phone in phones],
+            [counts.get(lead_id, 0) for lead_id in ids]
+        )
+        previous = np.array([score if score is not None else -1 for score in old_scores], dtype=np.int32)
+
+        for index in np.flatnonzero(new_scores != previous):
+            new_score = int(new_scores[index])
+
+            # Keep last_modified as is: a rescore is not an edit, and bumping
+            # it would put the lead straight back in the next dirty set
+            changes.append({'id': ids[index], 'lead_score': new_score, 'last_modified': last_modified[index]})
+
+            if new_score >= HOT_LEAD_THRESHOLD and max(previous[index], 0) < HOT_LEAD_THRESHOLD:
+                hot_leads.append((ids[index], new_score))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Details of the most recent scoring pass"""
+        return {
+            'lead_watermark': self.lead_watermark.isoformat() if self.lead_watermark else None,
+            'communication_watermark': self.communication_watermark.isoformat() if self.communication_watermark else None,
+            'last_pass': self.last_pass
+        }
@@ -0,0 +1,230 @@
+"""
+SMTP Connection Pool
+Keeps authenticated SMTP sessions open and reuses them across sends,
+so bursts of email do not pay a connect, TLS and AUTH handshake per message
+"""
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.message import Message
+from typing import Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a connection is discarded rather than returned to the pool
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+class PooledConnection:
+    """An open SMTP session plus the bookkeeping the pool needs to recycle it"""
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.messages_sent = 0
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of SMTP connections.
+    At most `pool_size` sessions are open at once; callers beyond that wait for
+    a free one. Idle sessions are checked with NOOP before reuse once they have
+    been idle for `keepalive_seconds`, and recycled after `max_messages` sends
+    or `max_age_seconds`. With a `throttle`, every message waits for its
+    recipient domain's and the global send budget first.
+    """
+
+    def __init__(self, host: str, port: int = 587, username: str = None, password: str = None,
+                 use_tls: bool = True, use_ssl: bool = False, pool_size: int = 4,
+                 timeout: float = 30, keepalive_seconds: float = 30,
+                 max_messages: int = 100, max_age_seconds: float = 600, throttle=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.keepalive_seconds = keepalive_seconds
+        self.max_messages = max_messages
+        self.max_age_seconds = max_age_seconds
+        self.throttle = throttle  # Optional SendThrottle consulted before every message
+        self.idle = deque()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self.stats = {'connections_opened': 0, 'connections_closed': 0, 'messages_sent': 0, 'reconnects': 0}
+
+    def _connect(self) -> PooledConnection:
+        """Open, secure and authenticate a new session"""
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+
+        if self.username:
+            smtp.login(self.username, self.password)
+
+        with self.lock:
+            self.stats['connections_opened'] += 1
+        return PooledConnection(smtp)
+
+    def _close(self, connection: PooledConnection):
+        """Close a session, ignoring errors from one that is already dead"""
+        try:
+            connection.smtp.quit()
+        except Exception:
+            try:
+                connection.smtp.close()
+            except Exception:
+                pass
+
+        with self.lock:
+            self.stats['connections_closed'] += 1
+
+    def _is_usable(self, connection: PooledConnection) -> bool:
+        """Whether an idle session can be reused as is"""
+        now = time.monotonic()
+        if connection.messages_sent >= self.max_messages or now - connection.created >= self.max_age_seconds:
+            return False
+
+        if now - connection.last_used < self.keepalive_seconds:
+            return True
+
+        # Idle for a while: make sure the server has not dropped us
+        try:
+            return connection.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> PooledConnection:
+        """Take a healthy idle session or open a new one. Caller holds a slot."""
+        while True:
+            with self.lock:
+                connection = self.idle.pop() if self.idle else None
+
+            if connection is None:
+                return self._connect()
+            if self._is_usable(connection):
+                return connection
+            self._close(connection)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a session for one or more sends. It goes back to the pool afterwards
+        unless a connection error occurred, in which case it is discarded.
+        """
+        self.slots.acquire()
+        connection = None
+        try:
+            connection = self._acquire()
+            yield connection
+        except CONNECTION_ERRORS:
+            if connection:
+                self._close(connection)
+                connection = None
+            raise
+        finally:
+            if connection:
+                connection.last_used = time.monotonic()
+                with self.lock:
+                    self.idle.append(connection)
+            self.slots.release()
+
+    def send(self, message: Message, retries: int = 1):
+        """Send a message on a pooled session, reconnecting and retrying if the session dropped"""
+        if self.throttle:
+            self.throttle.acquire(message['To'])
+
+        attempt = 0
+        while True:
+            try:
+                with self.connection() as connection:
+                    connection.smtp.send_message(message)
+                    connection.messages_sent += 1
+
+                with self.lock:
+                    self.stats['messages_sent'] += 1
+                return
+
+            except CONNECTION_ERRORS as e:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                with self.lock:
+                    self.stats['reconnects'] += 1
+                logger.warning(f"SMTP connection to {self.host} failed ({e}), reconnecting")
+
+    def send_copies(self, message: Message, recipients: List[Tuple[str, str]]) -> Dict[str, Exception]:
+        """
+        Send one built message to many recipients over a single session, swapping
+        only the To and Message-ID headers per copy. `recipients` holds
+        (to_email, message_id) pairs. If the session drops, the remaining copies
+        continue on a fresh one. Returns the errors of copies that failed, by address.
+        """
+        errors = {}
+        remaining = list(recipients)
+        stalled = 0
+
+        while remaining:
+            before = len(remaining)
+            try:
+                with self.connection() as connection:
+                    while remaining:
+                        to_email, message_id = remaining[0]
+                        if self.throttle:
+                            self.throttle.acquire(to_email)
+                        message.replace_header('To', to_email)
+                        if message_id:
+                            del message['Message-ID']
+                            message['Message-ID'] = message_id
+
+                        try:
+                            connection.smtp.send_message(message)
+                            connection.messages_sent += 1
+                            with self.lock:
+                                self.stats['messages_sent'] += 1
+                        except CONNECTION_ERRORS:
+                            raise
+                        except smtplib.SMTPException as e:
+                            # Refused recipient or data error: fail this copy only
+                            errors[to_email] = e
+                        remaining.pop(0)
+
+            except CONNECTION_ERRORS as e:
+                # Give up after two failed sessions in a row that sent nothing
+                stalled = stalled + 1 if len(remaining) == before else 0
+                if stalled >= 2:
+                    for to_email, _ in remaining:
+                        errors[to_email] = e
+                    break
+
+                with self.lock:
+                    self.stats['reconnects'] += 1
+                logger.warning(f"SMTP connection to {self.host} failed ({e}), reconnecting")
+
+        return errors
+
+    def close(self):
+        """Close every idle session"""
+        with self.lock:
+            connections = list(self.idle)
+            self.idle.clear()
+
+        for connection in connections:
+            self._close(connection)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Connection and message counters"""
+        with self.lock:
+            return {
+                'pool_size': self.pool_size,
+                'idle': len(self.idle),
+                **self.stats
+            }
@@ -0,0 +1,206 @@
+"""
+Email Suppression List
+Addresses that must not be emailed (bounced, unsubscribed), kept in a
+database table and mirrored in an in-memory Bloom filter so the common
+"not suppressed" answer costs no query
+"""
+import hashlib
+import logging
+import math
+import smtplib
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Set
+from flask import has_app_context
+from src.models.user import db
+from src.models.email_suppression import EmailSuppression
+
+logger = logging.getLogger(__name__)
+
+SUPPRESSION_REASONS = ('Bounced', 'Unsubscribed', 'Complaint', 'Manual')
+
+# Keep IN lists under common bound-parameter limits
+LOOKUP_BATCH_SIZE = 500
+
+def normalize_email(email: str) -> str:
+    return (email or '').strip().lower()
+
+def permanent_bounce(error: Exception, to_email: str) -> bool:
+    """Whether a delivery error means the address itself was rejected for good (5xx at RCPT)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        refused = error.recipients.get(to_email) or next(iter(error.recipients.values()), None)
+        return bool(refused) and refused[0] >= 500
+    return False
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, about `error_rate` false positives"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        """Bit positions by double hashing one 128-bit digest"""
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class SuppressionList:
+    """
+    Suppressed addresses. Lookups check the Bloom filter first and confirm its
+    rare positives against the table, so removing an address from the table takes
+    effect at once. New rows written by other processes are picked up
+    incrementally (by id) at most every `refresh_interval` seconds, and the filter
+    is rebuilt larger once it outgrows its capacity.
+    """
+
+    def __init__(self, refresh_interval: float = 60, initial_capacity: int = 100000):
+        self.refresh_interval = refresh_interval
+        self.initial_capacity = initial_capacity
+        self.bloom = BloomFilter(initial_capacity)
+        self.last_id = 0
+        self.last_refresh = None
+        self.lock = threading.Lock()
+        self.stats = {'checked': 0, 'suppressed': 0, 'filter_positives': 0}
+        # Separate from `lock`, which is held while the filter loads from the table
+        self.stats_lock = threading.Lock()
+
+    def _refresh_if_due(self):
+        """Load rows added since the last refresh. Requires an app context."""
+        now = time.monotonic()
+        if not has_app_context():
+            return
+        if self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+            return
+
+        with self.lock:
+            if self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+                return
+            self.last_refresh = now
+
+            try:
+                self._load()
+            except Exception as e:
+                logger.error(f"Error loading email suppressions: {e}")
+
+    def _load(self):
+        """Add new table rows to the filter, rebuilding it when full. Caller holds the lock."""
+        new_count = db.session.query(db.func.count(EmailSuppression.id)).filter(
+            EmailSuppression.id > self.last_id
+        ).scalar()
+        if not new_count:
+            return
+
+        if self.bloom.count + new_count > self.bloom.capacity:
+            total = db.session.query(db.func.count(EmailSuppression.id)).scalar()
+            self.bloom = BloomFilter(max(self.initial_capacity, total * 2))
+            self.last_id = 0
+
+        while True:
+            rows = db.session.query(EmailSuppression.id, EmailSuppression.email).filter(
+                EmailSuppression.id > self.last_id
+            ).order_by(EmailSuppression.id).limit(10000).all()
+            if not rows:
+                break
+            for row in rows:
+                self.bloom.add(row.email)
+            self.last_id = rows[-1].id
+
+    def suppressed(self, emails: Iterable[str]) -> Set[str]:
+        """The subset of addresses (normalized) that are suppressed. At most one query per 500 filter positives."""
+        self._refresh_if_due()
+
+        normalized = {normalize_email(email) for email in emails if email}
+        candidates = [email for email in normalized if email in self.bloom]
+        self._count(checked=len(normalized), filter_positives=len(candidates))
+
+        found = set()
+        for start in range(0, len(candidates), LOOKUP_BATCH_SIZE):
+            found.update(email for (email,) in db.session.query(EmailSuppression.email).filter(
+                EmailSuppression.email.in_(candidates[start:start + LOOKUP_BATCH_SIZE])
+            ))
+
+        self._count(suppressed=len(found))
+        return found
+
+    def _count(self, **counts: int):
+        with self.stats_lock:
+            for stat, count in counts.items():
+                self.stats[stat] += count
+
+    def is_suppressed(self, email: str) -> bool:
+        return bool(self.suppressed([email]))
+
+    def filter(self, emails: List[str]) -> List[str]:
+        """Addresses from the list that may be emailed, in order"""
+        suppressed = self.suppressed(emails)
+        return [email for email in emails if normalize_email(email) not in suppressed]
+
+    def add(self, email: str, reason: str, detail: str = None) -> bool:
+        """Suppress an address in the current transaction. Returns False if it already was."""
+        return bool(self.add_many([email], reason, detail))
+
+    def add_many(self, emails: Iterable[str], reason: str, detail: str = None) -> int:
+        """Suppress addresses in the current transaction, skipping ones already suppressed. Returns the number added."""
+        if reason not in SUPPRESSION_REASONS:
+            raise ValueError(f"Unknown suppression reason: {reason}")
+
+        emails = sorted({normalize_email(email) for email in emails if email})
+        existing = set()
+        for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+            existing.update(email for (email,) in db.session.query(EmailSuppression.email).filter(
+                EmailSuppression.email.in_(emails[start:start + LOOKUP_BATCH_SIZE])
+            ))
+
+        new = [email for email in emails if email not in existing]
+        if new:
+            db.session.execute(db.insert(EmailSuppression), [
+                {'email': email, 'reason': reason, 'detail': detail} for email in new
+            ])
+            # The filter may hold addresses that are later rolled back; lookups confirm against the table
+            with self.lock:
+                for email in new:
+                    self.bloom.add(email)
+
+        return len(new)
+
+    def remove(self, email: str) -> bool:
+        """Lift a suppression in the current transaction. Returns False if there was none."""
+        return bool(EmailSuppression.query.filter(
+            EmailSuppression.email == normalize_email(email)
+        ).delete(synchronize_session=False))
+
+    def record_bounce(self, error: Exception, to_email: str) -> bool:
+        """Suppress the address if the error is a permanent bounce. Returns whether it was one."""
+        if not permanent_bounce(error, to_email):
+            return False
+        self.add(to_email, 'Bounced', str(error)[:1000])
+        logger.info(f"Suppressed {to_email} after a permanent bounce")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Filter size and lookup counters"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        return {
+            'filter_entries': self.bloom.count,
+            'filter_capacity': self.bloom.capacity,
+            'filter_bytes': len(self.bloom.bits),
+            **stats
+        }
+
+# Global suppression list instance
+suppression_list = SuppressionList()
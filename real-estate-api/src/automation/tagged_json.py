@@ -0,0 +1,23 @@
+"""
+Tagged JSON
+JSON hooks that tag dates and datetimes, so values stored as JSON (job
+contexts, pagination cursors) decode back to the same types
+"""
+from datetime import datetime, date
+
+def encode_value(value):
+    """JSON `default` hook that tags dates so they decode back to the same type"""
+    if isinstance(value, datetime):
+        return {'__type__': 'datetime', 'value': value.isoformat()}
+    if isinstance(value, date):
+        return {'__type__': 'date', 'value': value.isoformat()}
+    raise TypeError(f"Value of type {type(value).__name__} is not serializable")
+
+def decode_value(obj):
+    """JSON `object_hook` reversing encode_value"""
+    value_type = obj.get('__type__')
+    if value_type == 'datetime':
+        return datetime.fromisoformat(obj['value'])
+    if value_type == 'date':
+        return date.fromisoformat(obj['value'])
+    return obj
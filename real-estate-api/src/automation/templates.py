@@ -0,0 +1,239 @@
+"""
+Email Template Registry
+Process-wide cache of compiled email templates: built-in defaults plus
+templates stored in the database, recompiled only when their version changes
+"""
+import json
+import logging
+import threading
+import time
+from string import Formatter
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+from flask import has_app_context
+from src.models.user import db
+from src.models.email_template import EmailTemplate
+
+logger = logging.getLogger(__name__)
+
+class TemplateError(ValueError):
+    """A template that does not compile, or a render missing required variables"""
+
+_formatter = Formatter()
+
+class CompiledFormat:
+    """
+    A str.format pattern parsed once into literal text and field lookups.
+    `render(variables)` joins the literals with the formatted values without re-parsing;
+    the caller checks for missing variables first.
+    """
+
+    def __init__(self, pattern: str, parts: List = None):
+        self.pattern = pattern
+        self.parts = parts if parts is not None else self._parse(pattern)
+        self.variables = {part[1] for part in self.parts if part.__class__ is not str}
+        self.render = self._compile()
+
+    @staticmethod
+    def _parse(pattern: str) -> List:
+        """Split a pattern into literal strings and (field_name, root, format_spec, conversion) tuples"""
+        parts = []
+
+        try:
+            parsed = list(_formatter.parse(pattern))
+        except ValueError as e:
+            raise TemplateError(f"Invalid template syntax: {e}")
+
+        for literal, field_name, format_spec, conversion in parsed:
+            if literal:
+                parts.append(literal)
+            if field_name is None:
+                continue
+            if not field_name or field_name.isdigit():
+                raise TemplateError(f"Template fields must be named: {pattern[:50]!r}")
+            if format_spec and '{' in format_spec:
+                raise TemplateError(f"Nested fields are not supported: {field_name}")
+
+            root = field_name.split('.', 1)[0].split('[', 1)[0]
+            parts.append((field_name, root, format_spec or '', conversion))
+
+        return parts
+
+    def bind(self, variables: Dict[str, Any], keep: Iterable[str] = ()) -> 'CompiledFormat':
+        """
+        Pre-render every field except those rooted in `keep`, returning a pattern
+        that only formats the kept fields. Used to render shared content once.
+        """
+        keep = set(keep)
+        parts = []
+
+        for part in self.parts:
+            if part.__class__ is not str and part[1] not in keep:
+                part = CompiledFormat(self.pattern, [part]).render(variables)
+            if part.__class__ is str and parts and parts[-1].__class__ is str:
+                parts[-1] += part
+            elif part != '':
+                parts.append(part)
+
+        return CompiledFormat(self.pattern, parts)
+
+    def _compile(self):
+        """
+        Generate one function that joins the literals and formatted values, so
+        rendering is a single ''.join call. Literals and names are passed in as
+        constants, never spliced into the generated source.
+        """
+        constants = {'_format': format, '_get_field': _formatter.get_field, '_convert': _formatter.convert_field}
+        pieces = []
+
+        for index, part in enumerate(self.parts):
+            if part.__class__ is str:
+                constants[f'_c{index}'] = part
+                pieces.append(f'_c{index}')
+                continue
+
+            field_name, root, format_spec, conversion = part
+            constants[f'_n{index}'] = field_name
+            constants[f'_s{index}'] = format_spec
+
+            # Plain names are looked up directly; dotted or indexed names go through the formatter
+            if root == field_name:
+                value = f'variables[_n{index}]'
+            else:
+                value = f'_get_field(_n{index}, (), variables)[0]'
+            if conversion:
+                constants[f'_v{index}'] = conversion
+                value = f'_convert({value}, _v{index})'
+            pieces.append(f'_format({value}, _s{index})')
+
+        source = f"def render(variables):\n    return ''.join(({', '.join(pieces)}{',' if pieces else ''}))\n"
+        exec(compile(source, f'<template {self.pattern[:30]!r}>', 'exec'), constants)
+        return constants['render']
+
+class CompiledTemplate:
+    """Subject and body compiled together, with the variables they require"""
+
+    def __init__(self, name: str, subject, body, version: int = 0,
+                 allowed_variables: Optional[Iterable[str]] = None):
+        self.name = name
+        self.version = version
+        self.subject = subject if isinstance(subject, CompiledFormat) else CompiledFormat(subject)
+        self.body = body if isinstance(body, CompiledFormat) else CompiledFormat(body)
+        self.required_variables = frozenset(self.subject.variables | self.body.variables)
+
+        # A template may only use the variables its callers declare they provide
+        if allowed_variables is not None:
+            unknown = self.required_variables - set(allowed_variables)
+            if unknown:
+                raise TemplateError(f"Template {name} uses undeclared variables: {', '.join(sorted(unknown))}")
+
+    def missing_variables(self, variables: Dict[str, Any]) -> List[str]:
+        """Required variables absent from a render context"""
+        return sorted(self.required_variables.difference(variables))
+
+    def render(self, variables: Dict[str, Any]) -> Tuple[str, str]:
+        """Render (subject, body), raising TemplateError if required variables are missing"""
+        if not self.required_variables.issubset(variables):
+            missing = ', '.join(self.missing_variables(variables))
+            raise TemplateError(f"Template {self.name} is missing variables: {missing}")
+
+        return self.subject.render(variables), self.body.render(variables)
+
+    def bind(self, variables: Dict[str, Any], keep: Iterable[str] = ()) -> 'CompiledTemplate':
+        """Render everything but the `keep` variables now; the result only needs those at render time"""
+        keep = set(keep)
+        missing = sorted((self.required_variables - keep).difference(variables))
+        if missing:
+            raise TemplateError(f"Template {self.name} is missing variables: {', '.join(missing)}")
+
+        return CompiledTemplate(
+            self.name,
+            self.subject.bind(variables, keep),
+            self.body.bind(variables, keep),
+            self.version
+        )
+
+class TemplateRegistry:
+    """
+    Compiled templates by name. Database templates override the built-in
+    defaults of the same name. The registry checks stored versions at most
+    every `refresh_interval` seconds and recompiles only what changed.
+    """
+
+    def __init__(self, refresh_interval: float = 30):
+        self.refresh_interval = refresh_interval
+        self.defaults = {}
+        self.stored = {}
+        self.last_refresh = None
+        self.lock = threading.Lock()
+
+    def register(self, name: str, subject: str, body: str) -> CompiledTemplate:
+        """Compile and register a built-in template. Raises TemplateError if it does not compile."""
+        template = CompiledTemplate(name, subject, body)
+        with self.lock:
+            self.defaults[name] = template
+        return template
+
+    def get(self, name: str) -> Optional[CompiledTemplate]:
+        """Compiled template by name, or None if there is none"""
+        self._refresh_if_due()
+        return self.stored.get(name) or self.defaults.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def invalidate(self):
+        """Force the next lookup to re-check stored template versions"""
+        self.last_refresh = None
+
+    def _refresh_if_due(self):
+        """Re-check stored templates when the refresh interval has passed. Requires an app context."""
+        now = time.monotonic()
+        if not has_app_context():
+            return
+        if self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+            return
+
+        with self.lock:
+            if self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+                return
+            self.last_refresh = now
+
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing email templates: {e}")
+
+    def _refresh(self):
+        """Recompile stored templates whose version changed and drop deactivated ones. Caller holds the lock."""
+        versions = dict(db.session.query(EmailTemplate.name, EmailTemplate.version).filter(
+            EmailTemplate.is_active == True
+        ).all())
+
+        stale = [name for name, version in versions.items()
+                 if name not in self.stored or self.stored[name].version != version]
+
+        stored = {name: template for name, template in self.stored.items() if name in versions}
+        if stale:
+            for row in EmailTemplate.query.filter(EmailTemplate.name.in_(stale)).all():
+                try:
+                    stored[row.name] = compile_stored_template(row)
+                except TemplateError as e:
+                    # Keep serving the last good version (or the default) rather than failing sends
+                    logger.error(f"Rejected email template {row.name} v{row.version}: {e}")
+
+        self.stored = stored
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Registered template names and versions"""
+        return {
+            'defaults': sorted(self.defaults),
+            'stored': {name: template.version for name, template in self.stored.items()}
+        }
+
+def compile_stored_template(row: EmailTemplate) -> CompiledTemplate:
+    """Compile a database template, checking it against its declared variables"""
+    allowed = json.loads(row.variables) if row.variables else None
+    return CompiledTemplate(row.name, row.subject or '', row.body or '', row.version, allowed)
+
+# Global template registry instance
+template_registry = TemplateRegistry()
@@ -0,0 +1,156 @@
+"""
+Email Tracking
+Signed open-pixel and click-redirect links, and a buffer that applies
+tracking hits to communications and campaign counters in batches
+"""
+import html
+import logging
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+from flask import current_app
+from itsdangerous import URLSafeSerializer, BadSignature
+from src.models.user import db
+from src.models.communication import Communication
+from src.models.marketing_campaign import MarketingCampaign
+from src.automation.buffered_writer import BufferedInsertWriter
+
+logger = logging.getLogger(__name__)
+
+# A transparent 1x1 GIF
+PIXEL_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+# Links in plain text, without trailing sentence punctuation
+LINK_PATTERN = re.compile(r'https?://[^\s<>"\')\]]*[^\s<>"\')\].,;:!?]')
+
+# Most databases cap the number of bound parameters in one IN list
+UPDATE_BATCH_SIZE = 500
+
+_serializers = {}
+
+def _serializer(secret_key: str = None) -> URLSafeSerializer:
+    """Token serializer for the app's secret key, built once per key"""
+    secret_key = secret_key or current_app.config['SECRET_KEY']
+    serializer = _serializers.get(secret_key)
+    if serializer is None:
+        serializer = _serializers[secret_key] = URLSafeSerializer(secret_key, salt='email-tracking')
+    return serializer
+
+def open_token(message_id: str) -> str:
+    """Signed token identifying an email for its open pixel"""
+    return _serializer().dumps([message_id])
+
+def click_token(message_id: str, url: str) -> str:
+    """Signed token identifying an email and the link clicked in it"""
+    return _serializer().dumps([message_id, url])
+
+def read_token(token: str) -> Optional[Tuple[str, Optional[str]]]:
+    """(message_id, url or None) from a token, or None if it is forged or malformed"""
+    try:
+        payload = _serializer().loads(token)
+    except BadSignature:
+        return None
+
+    if not isinstance(payload, list) or not 1 <= len(payload) <= 2 or not all(isinstance(v, str) for v in payload):
+        return None
+    return payload[0], payload[1] if len(payload) == 2 else None
+
+def tracking_base_url() -> Optional[str]:
+    """Public base URL of the tracking endpoints, e.g. https://crm.example.com/api. Tracking is off without it."""
+    base_url = os.environ.get('TRACKING_BASE_URL')
+    return base_url.rstrip('/') if base_url else None
+
+def add_tracking(body: str, message_id: str, base_url: str) -> Tuple[str, str]:
+    """
+    Rewrite the links in a plain-text body to tracked redirects and build an
+    HTML alternative carrying the open pixel. Returns (text_body, html_body).
+    """
+    links = {}
+
+    def track(match):
+        url = match.group(0)
+        tracked = f"{base_url}/t/c/{click_token(message_id, url)}"
+        links[tracked] = url
+        return tracked
+
+    text_body = LINK_PATTERN.sub(track, body)
+
+    html_body = html.escape(text_body).replace('\n', '<br>\n')
+    for tracked, url in links.items():
+        tracked = html.escape(tracked)
+        html_body = html_body.replace(tracked, f'<a href="{tracked}">{html.escape(url)}</a>')
+    html_body += f'\n<img src="{base_url}/t/o/{open_token(message_id)}.gif" width="1" height="1" alt="">'
+
+    return text_body, html_body
+
+class TrackingEventBuffer(BufferedInsertWriter):
+    """
+    Buffers open and click hits in memory so the tracking endpoints never
+    touch the database. Each flush marks the hit communications opened or
+    clicked with one set-based UPDATE per batch, and adds the first-time opens
+    and clicks to their campaigns' counters with one UPDATE per campaign.
+    A click counts as an open too, since images are often blocked.
+    """
+
+    def __init__(self, app=None, batch_size: int = 5000, flush_interval: float = 2.0):
+        super().__init__(Communication, app, batch_size, flush_interval)
+        self.stats = {'opens': 0, 'clicks': 0}
+
+    def record(self, message_id: str, event: str):
+        """Queue an 'open' or 'click' hit"""
+        self.add({'message_id': message_id, 'event': event})
+
+    def _insert(self, events: List[Dict[str, Any]]):
+        """Apply a batch of hits in one transaction"""
+        opened = {event['message_id'] for event in events}
+        clicked = {event['message_id'] for event in events if event['event'] == 'click'}
+
+        new_opens = self._mark(Communication.opened, opened)
+        new_clicks = self._mark(Communication.clicked, clicked)
+
+        for campaign_id in set(new_opens) | set(new_clicks):
+            MarketingCampaign.query.filter(MarketingCampaign.id == campaign_id).update({
+                'emails_opened': db.func.coalesce(MarketingCampaign.emails_opened, 0) + new_opens[campaign_id],
+                'emails_clicked': db.func.coalesce(MarketingCampaign.emails_clicked, 0) + new_clicks[campaign_id]
+            }, synchronize_session=False)
+
+        db.session.commit()
+        self.stats['opens'] += sum(new_opens.values())
+        self.stats['clicks'] += sum(new_clicks.values())
+
+    def _mark(self, column, message_ids: set) -> Counter:
+        """
+        Set a flag on the communications with these message ids that do not have
+        it yet. Returns how many were newly flagged per campaign.
+        """
+        flagged = Counter()
+        message_ids = sorted(message_ids)
+
+        for start in range(0, len(message_ids), UPDATE_BATCH_SIZE):
+            filters = (
+                Communication.external_id.in_(message_ids[start:start + UPDATE_BATCH_SIZE]),
+                db.or_(column == False, column.is_(None))
+            )
+
+            if db.engine.dialect.update_returning:
+                campaign_ids = db.session.execute(
+                    db.update(Communication).where(*filters).values({column.key: True}).returning(Communication.campaign_id)
+                ).scalars().all()
+            else:
+                campaign_ids = [row.campaign_id for row in db.session.query(Communication.campaign_id).filter(*filters).with_for_update()]
+                db.session.execute(db.update(Communication).where(*filters).values({column.key: True}))
+
+            flagged.update(campaign_id for campaign_id in campaign_ids if campaign_id)
+
+        return flagged
+
+    def get_stats(self) -> Dict[str, int]:
+        """First-time opens and clicks applied, and hits waiting to be"""
+        return {'pending': self.pending(), **self.stats}
+
+# Global tracking buffer, shared by the tracking endpoints
+tracking_events = TrackingEventBuffer()
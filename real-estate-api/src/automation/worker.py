@@ -0,0 +1,32 @@
+"""
+Standalone Automation Worker
+Runs the automation engine without serving HTTP, so automation capacity can be
+scaled separately from web workers:
+
+    python -m src.automation.worker
+"""
+import logging
+import signal
+import threading
+from src.main import app
+from src.automation.engine import automation_engine
+
+logger = logging.getLogger(__name__)
+
+def main():
+    stop_requested = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down automation worker")
+        stop_requested.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    automation_engine.start()
+    while not stop_requested.wait(1):
+        pass
+    automation_engine.stop()
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,11 @@ from src.models.client import Client
 from src.models.transaction import Transaction, TransactionMilestone
 from src.models.communication import Communication
 from src.models.marketing_campaign import MarketingCampaign
-from src.automation.email_service import send_welcome_email, send_follow_up_email, send_hot_lead_alert
+from src.automation.email_service import email_service, send_welcome_email, send_follow_up_email, send_hot_lead_alert
+from src.automation.suppression import normalize_email
+from src.automation.deadlines import deadline_index
+from src.automation.report_metrics import daily_report_metrics
+from src.automation.campaigns import campaign_executor
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +42,7 @@ def new_lead_workflow(context: Dict[str, Any]) -> bool:
             # Follow up in 1 day for hot leads, 3 days for others
             days_to_follow_up = 1 if lead.lead_score >= 80 else 3
             lead.next_follow_up = (datetime.now() + timedelta(days=days_to_follow_up)).date()
-            db.session.commit()
+            deadline_index.lead_changed(lead.id)
             
         # 3. Assign to agent if not already assigned
         if not lead.assigned_agent_id:
@@ -58,7 +62,6 @@ def new_lead_workflow(context: Dict[str, Any]) -> bool:
                     
                 best_agent_id = min(agent_lead_counts, key=agent_lead_counts.get)
                 lead.assigned_agent_id = best_agent_id
-                db.session.commit()
                 
         logger.info(f"New lead workflow completed for lead {lead_id}")
         return True
@@ -97,7 +100,7 @@ def lead_follow_up_workflow(context: Dict[str, Any]) -> bool:
             next_follow_up = datetime.now() + timedelta(days=7)
             
         lead.next_follow_up = next_follow_up.date()
-        db.session.commit()
+        deadline_index.lead_changed(lead.id)
         
         logger.info(f"Follow-up workflow completed for lead {lead_id}")
         return True
@@ -131,7 +134,7 @@ def hot_lead_workflow(context: Dict[str, Any]) -> bool:
         # Set urgent follow-up (within 1 hour)
         lead.next_follow_up = datetime.now().date()
         
-        db.session.commit()
+        deadline_index.lead_changed(lead.id)
         
         logger.info(f"Hot lead workflow completed for lead {lead_id}")
         return True
@@ -161,9 +164,6 @@ def transaction_milestone_workflow(context: Dict[str, Any]) -> bool:
             
         # Send reminder to listing agent
         if transaction.listing_agent:
-            from src.automation.email_service import EmailService
-            email_service = EmailService()
-            
             variables = {
                 'agent_name': f"{transaction.listing_agent.first_name} {transaction.listing_agent.last_name}",
                 'milestone_name': milestone.milestone_name,
@@ -196,8 +196,6 @@ def transaction_milestone_workflow(context: Dict[str, Any]) -> bool:
             else:
                 transaction.risk_level = 'Low'
                 
-        db.session.commit()
-        
         logger.info(f"Milestone workflow completed for milestone {milestone_id}")
         return True
         
@@ -214,106 +212,40 @@ def daily_report_workflow(context: Dict[str, Any]) -> bool:
     logger.info(f"Generating daily report for {report_date}")
     
     try:
-        # Calculate metrics
-        today_start = datetime.combine(report_date, datetime.min.time())
-        today_end = datetime.combine(report_date, datetime.max.time())
-        
-        # Lead metrics
-        new_leads = Lead.query.filter(
-            Lead.created_date >= today_start,
-            Lead.created_date <= today_end
-        ).count()
-        
-        hot_leads = Lead.query.filter(Lead.lead_score >= 80).count()
-        
-        followups_due = Lead.query.filter(
-            Lead.next_follow_up <= report_date,
-            Lead.lead_status.in_(['New', 'Contacted', 'Qualified', 'Nurturing'])
-        ).count()
-        
-        conversions = Lead.query.filter(
-            Lead.lead_status == 'Converted',
-            Lead.last_modified >= today_start,
-            Lead.last_modified <= today_end
-        ).count()
-        
-        # Transaction metrics
-        active_transactions = Transaction.query.filter(
-            Transaction.transaction_status.in_(['Active', 'Under Contract', 'Pending'])
-        ).count()
-        
-        week_end = report_date + timedelta(days=7)
-        closing_this_week = Transaction.query.filter(
-            Transaction.closing_date.between(report_date, week_end),
-            Transaction.transaction_status != 'Closed'
-        ).count()
-        
-        overdue_milestones = TransactionMilestone.query.filter(
-            TransactionMilestone.due_date < report_date,
-            TransactionMilestone.milestone_status.in_(['Pending', 'In Progress'])
-        ).count()
-        
-        # Marketing metrics
-        active_campaigns = MarketingCampaign.query.filter(
-            MarketingCampaign.campaign_status == 'Active'
-        ).count()
-        
-        email_opens = Communication.query.filter(
-            Communication.communication_type == 'Email',
-            Communication.sent_date >= today_start,
-            Communication.sent_date <= today_end,
-            Communication.opened == True
-        ).count()
-        
-        new_inquiries = Lead.query.filter(
-            Lead.created_date >= today_start,
-            Lead.created_date <= today_end
-        ).count()
-        
-        # Performance metrics
-        pipeline_value = db.session.query(db.func.sum(Transaction.sale_price)).filter(
-            Transaction.transaction_status.in_(['Active', 'Under Contract', 'Pending'])
-        ).scalar() or 0
-        
-        projected_commission = db.session.query(db.func.sum(Transaction.total_commission)).filter(
-            Transaction.transaction_status.in_(['Active', 'Under Contract', 'Pending'])
-        ).scalar() or 0
+        # All report KPIs in one aggregate query per table
+        metrics = daily_report_metrics(report_date)
         
         # Send report to all active agents
         from src.models.user import User
-        from src.automation.email_service import EmailService
         
         agents = User.query.filter(
             User.role == 'Agent',
             User.status == 'Active'
         ).all()
         
-        email_service = EmailService()
-        
         variables = {
             'date': report_date.strftime('%Y-%m-%d'),
-            'new_leads': new_leads,
-            'hot_leads': hot_leads,
-            'followups_due': followups_due,
-            'conversions': conversions,
-            'active_transactions': active_transactions,
-            'closing_this_week': closing_this_week,
-            'overdue_milestones': overdue_milestones,
-            'active_campaigns': active_campaigns,
-            'email_opens': email_opens,
-            'new_inquiries': new_inquiries,
-            'pipeline_value': pipeline_value,
-            'projected_commission': projected_commission
+            **metrics
         }
         
-        for agent in agents:
-            email_service.send_template_email(
-                'daily_report',
-                agent.email,
-                variables
-            )
+        # Suppressed agents are skipped, not a failure of the report
+        recipients = [agent.email for agent in agents]
+        suppressed = email_service.suppressions.suppressed(recipients)
+        if suppressed:
+            recipients = [email for email in recipients if normalize_email(email) not in suppressed]
+            logger.info(f"Daily report skipped {len(suppressed)} suppressed agents: {', '.join(sorted(suppressed))}")
+            
+        # Every agent gets the same report: render it once and fan out the copies
+        queued = email_service.send_template_fanout(
+            'daily_report',
+            recipients,
+            variables
+        )
+        if recipients and not queued:
+            # Rendering or queueing failed; the email service logged why
+            return False
             
-        logger.info(f"Daily report sent to {len(agents)} agents")
+        logger.info(f"Daily report sent to {queued} agents")
         return True
         
     except Exception as e:
@@ -345,13 +277,8 @@ def campaign_completed_workflow(context: Dict[str, Any]) -> bool:
         if campaign.leads_generated > 0:
             campaign.cost_per_lead = campaign.budget / campaign.leads_generated
             
-        db.session.commit()
-        
         # Send completion report to campaign creator
         if campaign.created_by:
-            from src.automation.email_service import EmailService
-            email_service = EmailService()
-            
             subject = f"Campaign Completed: {campaign.campaign_name}"
             body = f"""
 Campaign "{campaign.campaign_name}" has been completed.
@@ -380,6 +307,28 @@ Login to the CRM for detailed analytics.
         logger.error(f"Error in campaign completion workflow: {e}")
         return False
 
+def campaign_send_workflow(context: Dict[str, Any]):
+    """
+    Send a marketing campaign's email to its audience, resuming an interrupted send
+    """
+    campaign_id = context.get('campaign_id')
+    if not campaign_id:
+        return False
+        
+    logger.info(f"Processing campaign send workflow for campaign {campaign_id}")
+    
+    try:
+        run = campaign_executor.run(campaign_id, resend=context.get('resend', False))
+        if run is None:
+            # Another worker holds the campaign's send lease
+            return True
+            
+        return run.recipients_sent
+        
+    except Exception as e:
+        logger.error(f"Error in campaign send workflow: {e}")
+        return False
+
 # Workflow registry - maps workflow names to functions
 WORKFLOWS = {
     'new_lead': new_lead_workflow,
@@ -387,7 +336,20 @@ WORKFLOWS = {
     'hot_lead_identified': hot_lead_workflow,
     'milestone_overdue': transaction_milestone_workflow,
     'daily_report_generation': daily_report_workflow,
-    'campaign_completed': campaign_completed_workflow
+    'campaign_completed': campaign_completed_workflow,
+    'campaign_send': campaign_send_workflow
+}
+
+# Concurrency limits - how many jobs of each workflow may run at once,
+# and how many more may be claimed from the queue and wait in memory
+WORKFLOW_LIMITS = {
+    'new_lead': {'concurrency': 4, 'queue_depth': 50},
+    'lead_follow_up': {'concurrency': 4, 'queue_depth': 100},
+    'hot_lead_identified': {'concurrency': 2, 'queue_depth': 20},
+    'milestone_overdue': {'concurrency': 2, 'queue_depth': 50},
+    'daily_report_generation': {'concurrency': 1, 'queue_depth': 0},
+    'campaign_completed': {'concurrency': 1, 'queue_depth': 10},
+    'campaign_send': {'concurrency': 1, 'queue_depth': 10}
 }
 
 # Trigger conditions
@@ -415,6 +377,10 @@ def campaign_completed_trigger(data: Dict[str, Any]) -> bool:
     """Trigger condition for completed campaigns"""
     return data.get('campaign_id') is not None
 
+def campaign_send_trigger(data: Dict[str, Any]) -> bool:
+    """Trigger condition for campaign sends"""
+    return data.get('campaign_id') is not None
+
 # Trigger registry
 TRIGGERS = {
     'new_lead': new_lead_trigger,
@@ -422,6 +388,7 @@ TRIGGERS = {
     'hot_lead_identified': hot_lead_trigger,
     'milestone_overdue': milestone_overdue_trigger,
     'daily_report': daily_report_trigger,
-    'campaign_completed': campaign_completed_trigger
+    'campaign_completed': campaign_completed_trigger,
+    'campaign_send': campaign_send_trigger
 }
 
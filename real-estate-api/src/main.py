@@ -12,16 +12,31 @@ from src.models.property import Property
 from src.models.transaction import Transaction, TransactionMilestone, TransactionDocument
 from src.models.communication import Communication
 from src.models.marketing_campaign import MarketingCampaign
+from src.models.automation_job import AutomationJob
+from src.models.fire_ledger import FireLedgerEntry
+from src.models.automation_lease import AutomationLease
+from src.models.workflow_run import WorkflowRun
+from src.models.email_outbox import EmailOutbox
+from src.models.email_template import EmailTemplate
+from src.models.campaign_run import CampaignRun
+from src.models.email_suppression import EmailSuppression
+from src.models.deadline_change import DeadlineChange
+from src.models.indexes import ensure_indexes
 from src.routes.user import user_bp
 from src.routes.transaction import transaction_bp
 from src.routes.lead import lead_bp
 from src.routes.automation import automation_bp
+from src.routes.tracking import tracking_bp
+from src.routes.json_provider import FastJSONProvider
 from src.automation.engine import automation_engine
-from src.automation.workflows import WORKFLOWS, TRIGGERS
+from src.automation.workflows import WORKFLOWS, WORKFLOW_LIMITS, TRIGGERS
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
+# Encode JSON responses with orjson; dates are written as ISO 8601
+app.json = FastJSONProvider(app)
+
 # Enable CORS for all routes
 CORS(app)
 
@@ -30,12 +45,16 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(transaction_bp, url_prefix='/api')
 app.register_blueprint(lead_bp, url_prefix='/api')
 app.register_blueprint(automation_bp, url_prefix='/api')
+app.register_blueprint(tracking_bp, url_prefix='/api')
 
 # Database configuration
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
+# Automation worker pool size
+app.config['AUTOMATION_MAX_WORKERS'] = int(os.environ.get('AUTOMATION_MAX_WORKERS', 8))
+
 # Initialize automation engine
 automation_engine.init_app(app)
 
@@ -43,9 +62,12 @@ automation_engine.init_app(app)
 with app.app_context():
     db.create_all()
     
+    # create_all skips existing tables; add indexes declared on them since
+    ensure_indexes()
+    
     # Register automation workflows
     for workflow_name, workflow_func in WORKFLOWS.items():
-        automation_engine.register_workflow(workflow_name, workflow_func)
+        automation_engine.register_workflow(workflow_name, workflow_func, **WORKFLOW_LIMITS.get(workflow_name, {}))
     
     # Register automation triggers
     automation_engine.register_trigger('new_lead', TRIGGERS['new_lead'], 'new_lead')
@@ -54,9 +76,7 @@ with app.app_context():
     automation_engine.register_trigger('milestone_overdue', TRIGGERS['milestone_overdue'], 'milestone_overdue')
     automation_engine.register_trigger('daily_report', TRIGGERS['daily_report'], 'daily_report_generation')
     automation_engine.register_trigger('campaign_completed', TRIGGERS['campaign_completed'], 'campaign_completed')
-    
-    # Start automation engine
-    automation_engine.start()
+    automation_engine.register_trigger('campaign_send', TRIGGERS['campaign_send'], 'campaign_send')
 
 @app.route('/')
 def health_check():
@@ -84,4 +104,10 @@ def serve(path):
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
+    
+    # Run automation in the web process unless it is deployed as a separate
+    # worker (python -m src.automation.worker). Importing app never starts it.
+    if os.environ.get('AUTOMATION_EMBEDDED', 'true').lower() == 'true':
+        automation_engine.start()
+        
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,53 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class AutomationJob(db.Model):
+    __tablename__ = 'automation_jobs'
+    __table_args__ = (
+        db.Index('ix_automation_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # What to run
+    workflow_name = db.Column(db.String(100), nullable=False)
+    trigger_name = db.Column(db.String(100))  # Trigger that enqueued the job, if any
+    payload = db.Column(db.Text)  # JSON encoded workflow context
+
+    # Queue state
+    status = db.Column(db.String(20), default='Pending')  # Pending, Running, Completed, Dead
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=5)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+
+    # Lease held by the worker currently running the job
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+
+    # Timestamps
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    started_date = db.Column(db.DateTime)
+    completed_date = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'workflow_name': self.workflow_name,
+            'trigger_name': self.trigger_name,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'last_error': self.last_error,
+            'locked_by': self.locked_by,
+            'locked_until': self.locked_until.isoformat() if self.locked_until else None,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'started_date': self.started_date.isoformat() if self.started_date else None,
+            'completed_date': self.completed_date.isoformat() if self.completed_date else None
+        }
+
+    def __repr__(self):
+        return f'<AutomationJob {self.id} {self.workflow_name} - {self.status}>'
@@ -0,0 +1,27 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class AutomationLease(db.Model):
+    __tablename__ = 'automation_leases'
+
+    # One row per leadership role, e.g. 'scheduler'
+    name = db.Column(db.String(100), primary_key=True)
+
+    # Process currently holding the lease
+    holder = db.Column(db.String(255))
+    acquired_date = db.Column(db.DateTime)
+    heartbeat_date = db.Column(db.DateTime)
+    expires_date = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'holder': self.holder,
+            'acquired_date': self.acquired_date.isoformat() if self.acquired_date else None,
+            'heartbeat_date': self.heartbeat_date.isoformat() if self.heartbeat_date else None,
+            'expires_date': self.expires_date.isoformat() if self.expires_date else None
+        }
+
+    def __repr__(self):
+        return f'<AutomationLease {self.name} - {self.holder}>'
@@ -0,0 +1,47 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class CampaignRun(db.Model):
+    __tablename__ = 'campaign_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('marketing_campaigns.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), default='Running')  # Running, Paused, Completed, Failed
+
+    # Keyset checkpoint: every recipient up to these ids has been sent
+    last_lead_id = db.Column(db.Integer, default=0)
+    last_client_id = db.Column(db.Integer, default=0)
+
+    # Progress
+    recipients_sent = db.Column(db.Integer, default=0)
+    recipients_delivered = db.Column(db.Integer, default=0)
+    recipients_failed = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+
+    # Timestamps
+    started_date = db.Column(db.DateTime, default=datetime.utcnow)
+    checkpoint_date = db.Column(db.DateTime)
+    finished_date = db.Column(db.DateTime)
+
+    # Relationships
+    campaign = db.relationship('MarketingCampaign', backref='runs')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'campaign_id': self.campaign_id,
+            'status': self.status,
+            'last_lead_id': self.last_lead_id,
+            'last_client_id': self.last_client_id,
+            'recipients_sent': self.recipients_sent,
+            'recipients_delivered': self.recipients_delivered,
+            'recipients_failed': self.recipients_failed,
+            'last_error': self.last_error,
+            'started_date': self.started_date.isoformat() if self.started_date else None,
+            'checkpoint_date': self.checkpoint_date.isoformat() if self.checkpoint_date else None,
+            'finished_date': self.finished_date.isoformat() if self.finished_date else None
+        }
+
+    def __repr__(self):
+        return f'<CampaignRun {self.id} campaign {self.campaign_id} - {self.status}>'
@@ -4,6 +4,9 @@ from src.models.user import db
 
 class Communication(db.Model):
     __tablename__ = 'communications'
+    __table_args__ = (
+        db.Index('ix_communications_lead_sent_date_id', 'lead_id', 'sent_date', 'id'),  # A lead's history, newest first
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -35,7 +38,7 @@ class Communication(db.Model):
     replied = db.Column(db.Boolean, default=False)
     
     # Additional metadata
-    external_id = db.Column(db.String(100))  # ID from email/SMS provider
+    external_id = db.Column(db.String(100), index=True)  # ID from email/SMS provider; Message-ID for emails
     cost = db.Column(db.Float)  # Cost of SMS or other paid communication
     notes = db.Column(db.Text)
     
@@ -0,0 +1,26 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class DeadlineChange(db.Model):
+    __tablename__ = 'automation_deadline_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # A lead or milestone whose deadline may have changed; the scheduler
+    # re-reads its current state, so only the identity is recorded
+    kind = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+
+    created_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'entity_id': self.entity_id,
+            'created_date': self.created_date.isoformat() if self.created_date else None
+        }
+
+    def __repr__(self):
+        return f'<DeadlineChange {self.kind} {self.entity_id}>'
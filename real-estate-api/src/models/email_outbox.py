@@ -0,0 +1,61 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Message
+    to_email = db.Column(db.String(255), nullable=False)
+    from_email = db.Column(db.String(255))
+    subject = db.Column(db.String(255))
+    body = db.Column(db.Text)
+    attachments = db.Column(db.Text)  # JSON list of file paths
+    message_id = db.Column(db.String(100), unique=True, nullable=False)  # Message-ID header, stable across retries
+    content_key = db.Column(db.String(64))  # Hash of sender, subject, body and attachments; equal keys are copies of one message
+
+    # Delivery state
+    status = db.Column(db.String(20), default='Pending')  # Pending, Sending, Sent, Failed
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=5)
+    next_attempt = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+
+    # Lease held by the sender currently delivering the message
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+
+    # Communication row updated with the delivery outcome
+    communication_id = db.Column(db.Integer, db.ForeignKey('communications.id'))
+
+    # Timestamps
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_date = db.Column(db.DateTime)
+
+    # Relationships
+    communication = db.relationship('Communication')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'to_email': self.to_email,
+            'from_email': self.from_email,
+            'subject': self.subject,
+            'message_id': self.message_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'next_attempt': self.next_attempt.isoformat() if self.next_attempt else None,
+            'last_error': self.last_error,
+            'communication_id': self.communication_id,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'sent_date': self.sent_date.isoformat() if self.sent_date else None
+        }
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.to_email} - {self.status}>'
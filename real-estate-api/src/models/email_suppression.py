@@ -0,0 +1,24 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class EmailSuppression(db.Model):
+    __tablename__ = 'email_suppressions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(255), unique=True, nullable=False)  # Stored lowercased
+    reason = db.Column(db.String(50), nullable=False)  # Bounced, Unsubscribed, Complaint, Manual
+    detail = db.Column(db.Text)  # e.g. the SMTP error of a bounce
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'email': self.email,
+            'reason': self.reason,
+            'detail': self.detail,
+            'created_date': self.created_date.isoformat() if self.created_date else None
+        }
+
+    def __repr__(self):
+        return f'<EmailSuppression {self.email} - {self.reason}>'
@@ -0,0 +1,38 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class EmailTemplate(db.Model):
+    __tablename__ = 'email_templates'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Template content, in str.format syntax
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    variables = db.Column(db.Text)  # JSON list of variables callers provide; templates may only use these
+
+    # Bumped on every edit so cached compiled copies are replaced
+    version = db.Column(db.Integer, default=1, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+
+    # Timestamps
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    last_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'subject': self.subject,
+            'body': self.body,
+            'variables': self.variables,
+            'version': self.version,
+            'is_active': self.is_active,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'last_modified': self.last_modified.isoformat() if self.last_modified else None
+        }
+
+    def __repr__(self):
+        return f'<EmailTemplate {self.name} v{self.version}>'
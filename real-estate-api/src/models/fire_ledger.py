@@ -0,0 +1,33 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class FireLedgerEntry(db.Model):
+    __tablename__ = 'automation_fire_ledger'
+    __table_args__ = (
+        db.UniqueConstraint('trigger_name', 'entity_id', 'due_key', name='uq_fire_ledger_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # What was fired: trigger, the lead/milestone/etc. it fired for, and the
+    # deadline it fired for (e.g. the follow-up date)
+    trigger_name = db.Column(db.String(100), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    due_key = db.Column(db.String(50), nullable=False)
+
+    fired_date = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_date = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'trigger_name': self.trigger_name,
+            'entity_id': self.entity_id,
+            'due_key': self.due_key,
+            'fired_date': self.fired_date.isoformat() if self.fired_date else None,
+            'expires_date': self.expires_date.isoformat() if self.expires_date else None
+        }
+
+    def __repr__(self):
+        return f'<FireLedgerEntry {self.trigger_name} {self.entity_id} {self.due_key}>'
@@ -0,0 +1,31 @@
+"""
+Index Management
+Creates indexes declared on the models that an existing database is missing.
+db.create_all() skips tables that already exist, so indexes added to
+existing tables would otherwise never be built.
+"""
+import logging
+from typing import List
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+def ensure_indexes(engine=None) -> List[str]:
+    """Create every declared index that does not exist yet. Returns the names created."""
+    engine = engine or db.engine
+    inspector = db.inspect(engine)
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+            logger.info(f"Created index {index.name} on {table.name}")
+
+    return created
@@ -4,6 +4,9 @@ from src.models.user import db
 
 class Lead(db.Model):
     __tablename__ = 'leads'
+    __table_args__ = (
+        db.Index('ix_leads_created_date_id', 'created_date', 'id'),  # Cursor pagination order
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
@@ -4,6 +4,9 @@ from src.models.user import db
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_created_date_id', 'created_date', 'id'),  # Cursor pagination order
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -52,6 +55,7 @@ class Transaction(db.Model):
     buyer_agent_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     # Relationships
+    client = db.relationship('Client', backref='transactions')
     listing_agent = db.relationship('User', foreign_keys=[listing_agent_id], backref='listing_transactions')
     buyer_agent = db.relationship('User', foreign_keys=[buyer_agent_id], backref='buyer_transactions')
     milestones = db.relationship('TransactionMilestone', backref='transaction', cascade='all, delete-orphan')
@@ -0,0 +1,39 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class WorkflowRun(db.Model):
+    __tablename__ = 'workflow_runs'
+    __table_args__ = (
+        db.Index('ix_workflow_runs_workflow_started', 'workflow_name', 'started_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # What ran
+    workflow_name = db.Column(db.String(100), nullable=False)
+    job_id = db.Column(db.Integer)  # Queue job, if run from the job queue
+    worker = db.Column(db.String(100))  # host:pid of the process that ran it
+
+    # Outcome
+    started_date = db.Column(db.DateTime, nullable=False, index=True)
+    duration_ms = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # Succeeded, Failed
+    error = db.Column(db.Text)
+    items_processed = db.Column(db.Integer, default=0)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'workflow_name': self.workflow_name,
+            'job_id': self.job_id,
+            'worker': self.worker,
+            'started_date': self.started_date.isoformat() if self.started_date else None,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'error': self.error,
+            'items_processed': self.items_processed
+        }
+
+    def __repr__(self):
+        return f'<WorkflowRun {self.id} {self.workflow_name} - {self.status}>'
@@ -111,11 +111,12 @@ def trigger_workflow(trigger_name):
                 'error': f'Trigger not found: {trigger_name}'
             }), 404
             
-        automation_engine.trigger_workflow(trigger_name, data)
+        job_ids = automation_engine.trigger_workflow(trigger_name, data)
         
         return jsonify({
             'success': True,
             'trigger': trigger_name,
+            'job_ids': job_ids,
             'message': f'Trigger {trigger_name} processed'
         })
         
@@ -125,6 +126,294 @@ def trigger_workflow(trigger_name):
             'error': str(e)
         }), 500
 
+@automation_bp.route('/automation/jobs', methods=['GET'])
+def list_jobs():
+    """List queued workflow jobs, optionally filtered by status"""
+    try:
+        from src.models.automation_job import AutomationJob
+        
+        status = request.args.get('status')
+        workflow = request.args.get('workflow')
+        limit = request.args.get('limit', 50, type=int)
+        
+        query = AutomationJob.query
+        
+        if status:
+            query = query.filter(AutomationJob.status == status)
+        if workflow:
+            query = query.filter(AutomationJob.workflow_name == workflow)
+            
+        jobs = query.order_by(AutomationJob.id.desc()).limit(limit).all()
+        
+        return jsonify({
+            'success': True,
+            'jobs': [job.to_dict() for job in jobs],
+            'count': len(jobs)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/jobs/<int:job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    """Requeue a dead-lettered job"""
+    try:
+        if not automation_engine.job_queue.retry(job_id):
+            return jsonify({
+                'success': False,
+                'error': f'Job {job_id} is not in the dead-letter queue'
+            }), 404
+            
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'message': f'Job {job_id} requeued'
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/campaigns/<int:campaign_id>/send', methods=['POST'])
+def send_campaign(campaign_id):
+    """Queue a marketing campaign for sending, or resume an interrupted send"""
+    try:
+        from src.models.user import db
+        from src.models.marketing_campaign import MarketingCampaign
+        from src.automation.campaigns import campaign_executor
+        from src.automation.templates import TemplateError
+        
+        data = request.get_json() or {}
+        
+        campaign = db.session.get(MarketingCampaign, campaign_id)
+        if not campaign:
+            return jsonify({
+                'success': False,
+                'error': f'Campaign not found: {campaign_id}'
+            }), 404
+            
+        if campaign.campaign_type != 'Email' or not campaign.email_template:
+            return jsonify({
+                'success': False,
+                'error': 'Only email campaigns with an email template can be sent'
+            }), 400
+            
+        if campaign.campaign_status != 'Active':
+            return jsonify({
+                'success': False,
+                'error': f'Campaign is {campaign.campaign_status}, not Active'
+            }), 400
+            
+        # Reject a broken template now rather than in the background job
+        try:
+            campaign_executor.compile_template(campaign)
+        except TemplateError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+            
+        job_ids = automation_engine.trigger_workflow('campaign_send', {
+            'campaign_id': campaign_id,
+            'resend': bool(data.get('resend', False))
+        })
+        
+        return jsonify({
+            'success': True,
+            'campaign_id': campaign_id,
+            'job_ids': job_ids,
+            'message': f'Campaign {campaign.campaign_name} queued for sending'
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/campaigns/<int:campaign_id>/runs', methods=['GET'])
+def list_campaign_runs(campaign_id):
+    """Progress of a campaign's sends"""
+    try:
+        from src.automation.campaigns import campaign_executor
+        
+        return jsonify({
+            'success': True,
+            **campaign_executor.get_stats(campaign_id)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/suppressions', methods=['GET'])
+def list_suppressions():
+    """List suppressed email addresses, newest first"""
+    try:
+        from src.models.email_suppression import EmailSuppression
+        
+        reason = request.args.get('reason')
+        limit = request.args.get('limit', 100, type=int)
+        
+        query = EmailSuppression.query
+        if reason:
+            query = query.filter(EmailSuppression.reason == reason)
+            
+        suppressions = query.order_by(EmailSuppression.id.desc()).limit(limit).all()
+        
+        return jsonify({
+            'success': True,
+            'suppressions': [suppression.to_dict() for suppression in suppressions],
+            'count': len(suppressions)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/suppressions', methods=['POST'])
+def add_suppression():
+    """Stop emailing an address, e.g. after an unsubscribe request"""
+    try:
+        from src.models.user import db
+        from src.automation.suppression import suppression_list, SUPPRESSION_REASONS
+        
+        data = request.get_json() or {}
+        email = (data.get('email') or '').strip()
+        reason = data.get('reason', 'Unsubscribed')
+        
+        if not email or '@' not in email:
+            return jsonify({
+                'success': False,
+                'error': 'A valid email is required'
+            }), 400
+            
+        if reason not in SUPPRESSION_REASONS:
+            return jsonify({
+                'success': False,
+                'error': f"Reason must be one of: {', '.join(SUPPRESSION_REASONS)}"
+            }), 400
+            
+        added = suppression_list.add(email, reason, data.get('detail'))
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'email': email.lower(),
+            'added': added,
+            'message': f'{email} suppressed' if added else f'{email} was already suppressed'
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/suppressions/<path:email>', methods=['DELETE'])
+def remove_suppression(email):
+    """Allow emailing a suppressed address again"""
+    try:
+        from src.models.user import db
+        from src.automation.suppression import suppression_list
+        
+        if not suppression_list.remove(email):
+            return jsonify({
+                'success': False,
+                'error': f'{email} is not suppressed'
+            }), 404
+            
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'email': email.lower(),
+            'message': f'{email} removed from the suppression list'
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/templates', methods=['GET'])
+def list_templates():
+    """List stored email templates and the built-in defaults"""
+    try:
+        from src.models.email_template import EmailTemplate
+        from src.automation.templates import template_registry
+        
+        templates = EmailTemplate.query.order_by(EmailTemplate.name).all()
+        
+        return jsonify({
+            'success': True,
+            'templates': [template.to_dict() for template in templates],
+            'registry': template_registry.get_stats()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/automation/templates/<template_name>', methods=['PUT'])
+def save_template(template_name):
+    """Create or update a stored email template, bumping its version"""
+    try:
+        from src.models.user import db
+        from src.models.email_template import EmailTemplate
+        from src.automation.templates import template_registry, compile_stored_template, TemplateError
+        import json
+        
+        data = request.get_json() or {}
+        
+        template = EmailTemplate.query.filter_by(name=template_name).first()
+        if not template:
+            template = EmailTemplate(name=template_name, version=0)
+            db.session.add(template)
+            
+        for field in ['subject', 'body', 'is_active']:
+            if field in data:
+                setattr(template, field, data[field])
+        if 'variables' in data:
+            template.variables = json.dumps(data['variables']) if data['variables'] is not None else None
+        template.version = (template.version or 0) + 1
+        
+        # Reject templates that do not compile or use undeclared variables
+        try:
+            compile_stored_template(template)
+        except TemplateError as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+            
+        db.session.commit()
+        template_registry.invalidate()
+        
+        return jsonify({
+            'success': True,
+            'template': template.to_dict()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @automation_bp.route('/automation/test/new-lead', methods=['POST'])
 def test_new_lead_automation():
     """Test the new lead automation workflow"""
@@ -239,35 +528,22 @@ def test_daily_report_automation():
 def get_automation_metrics():
     """Get automation performance metrics"""
     try:
-        from src.models.communication import Communication
-        from datetime import datetime, timedelta
+        from src.automation.metrics_cache import metrics_cache, AUTOMATION_METRICS, WORKFLOW_METRICS
+        from src.automation.report_metrics import automation_metrics
         
-        # Get automation statistics
-        week_ago = datetime.now() - timedelta(days=7)
-        
-        automated_emails = Communication.query.filter(
-            Communication.is_automated == True,
-            Communication.communication_type == 'Email',
-            Communication.sent_date >= week_ago
-        ).count()
-        
-        total_communications = Communication.query.filter(
-            Communication.sent_date >= week_ago
-        ).count()
-        
-        automation_rate = (automated_emails / total_communications * 100) if total_communications > 0 else 0
-        
-        # Get workflow execution stats
-        status = automation_engine.get_status()
+        # Communication counts and workflow run history are cached; new sends
+        # and runs show up once the TTL lapses
+        communications = metrics_cache.get(AUTOMATION_METRICS, automation_metrics)
+        runs = metrics_cache.get(WORKFLOW_METRICS, automation_engine.get_run_stats)
         
         metrics = {
-            'automation_rate': round(automation_rate, 1),
-            'automated_emails_week': automated_emails,
-            'total_communications_week': total_communications,
-            'workflows_registered': status['workflows_registered'],
-            'triggers_registered': status['triggers_registered'],
-            'engine_running': status['running'],
-            'workflow_stats': status['workflows']
+            'automation_rate': round(communications['automation_rate'], 1),
+            'automated_emails_week': communications['automated_emails'],
+            'total_communications_week': communications['total_communications'],
+            'workflows_registered': len(automation_engine.workflows),
+            'triggers_registered': sum(len(triggers) for triggers in automation_engine.triggers.values()),
+            'engine_running': automation_engine.running,
+            'workflow_stats': automation_engine.get_workflow_stats(runs)
         }
         
         return jsonify({
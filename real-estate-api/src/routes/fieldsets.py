@@ -0,0 +1,192 @@
+"""
+Sparse Fieldsets
+Turns the fields= and include= query parameters into loader options, so an
+endpoint selects only the requested columns and loads only the requested
+relations, and serializes rows to match.
+
+    fields=id,sale_price               columns of the listed resource
+    fields[property]=address,city      columns of an included relation
+    include=property,milestones        relations to embed (default: the endpoint's usual set)
+
+`id` is always returned. Without `fields`, rows serialize through to_dict as before.
+"""
+from datetime import date, time
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Callable, Sequence, Tuple
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from src.models.user import db
+
+class FieldsetError(ValueError):
+    """A fields or include parameter naming something the endpoint does not expose"""
+
+@lru_cache(maxsize=None)
+def serializable_fields(model) -> Tuple[str, ...]:
+    """Columns a model's to_dict exposes, in to_dict order"""
+    columns = set(db.inspect(model).column_attrs.keys())
+    return tuple(name for name in model().to_dict() if name in columns)
+
+def _json_value(value):
+    """Format a column value the way to_dict does"""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+def pick(obj, fields: Sequence[str]) -> Dict[str, Any]:
+    """Serialize only the given columns of a row"""
+    return {name: _json_value(getattr(obj, name)) for name in fields}
+
+def agent_summary(user) -> Dict[str, Any]:
+    """Compact agent reference used by the list endpoints"""
+    return {
+        'id': user.id,
+        'name': f"{user.first_name} {user.last_name}"
+    }
+
+class Relation:
+    """
+    A relation an endpoint can include. `many` marks a collection. `summary`
+    renders the relation when no fields are requested for it, loading only
+    `summary_fields`. A relation with a `model` is not a mapped relationship:
+    the endpoint loads it itself and uses the fieldset for its columns.
+    """
+
+    def __init__(self, many: bool = False, summary: Callable = None,
+                 summary_fields: Sequence[str] = None, model=None):
+        self.many = many
+        self.summary = summary
+        self.summary_fields = tuple(summary_fields) if summary_fields else None
+        self.model = model
+
+AGENT = Relation(summary=agent_summary, summary_fields=('id', 'first_name', 'last_name'))
+
+def _parse_fields(value: Optional[str], model, label: str) -> Optional[List[str]]:
+    """Requested columns of a model, always including id, or None for all"""
+    if value is None:
+        return None
+
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    available = serializable_fields(model)
+    unknown = requested.difference(available)
+    if unknown:
+        raise FieldsetError(f"Unknown fields for {label}: {', '.join(sorted(unknown))}")
+
+    return [name for name in available if name == 'id' or name in requested]
+
+class Fieldset:
+    """
+    What one request asked for: the resource's columns (None for all), the
+    relations to include, and the columns of each included relation.
+    """
+
+    def __init__(self, model, relations: Dict[str, Relation] = None, fields: List[str] = None,
+                 include: Sequence[str] = None, relation_fields: Dict[str, List[str]] = None):
+        self.model = model
+        self.relations = relations or {}
+        self.fields = fields
+        self.include = list(self.relations if include is None else include)
+        self.relation_fields = relation_fields or {}
+
+    @classmethod
+    def from_args(cls, args, model, relations: Dict[str, Relation] = None,
+                  default_include: Sequence[str] = None) -> 'Fieldset':
+        """Parse request args. Raises FieldsetError for unknown fields or relations."""
+        relations = relations or {}
+        fields = _parse_fields(args.get('fields'), model, model.__tablename__)
+
+        if 'include' in args:
+            include = [name.strip() for name in args['include'].split(',') if name.strip()]
+            unknown = [name for name in include if name not in relations]
+            if unknown:
+                raise FieldsetError(f"Unknown relations: {', '.join(unknown)}")
+        else:
+            include = list(relations if default_include is None else default_include)
+
+        relation_fields = {}
+        for key in args:
+            if not (key.startswith('fields[') and key.endswith(']')):
+                continue
+            name = key[7:-1]
+            if name not in relations:
+                raise FieldsetError(f"Unknown relation: {name}")
+            relation_fields[name] = _parse_fields(args[key], cls._target(model, relations[name], name), name)
+
+        return cls(model, relations, fields, include, relation_fields)
+
+    @staticmethod
+    def _target(model, relation: Relation, name: str):
+        """Model a relation's rows belong to"""
+        return relation.model or getattr(model, name).property.mapper.class_
+
+    def includes(self, name: str) -> bool:
+        return name in self.include
+
+    def _relation_columns(self, name: str) -> Optional[List[str]]:
+        """Columns to load for an included relation, or None for all"""
+        fields = self.relation_fields.get(name)
+        if fields is None and self.relations[name].summary:
+            fields = self.relations[name].summary_fields
+        return fields
+
+    def load_options(self, *required) -> List[Any]:
+        """
+        Loader options for the listed resource: load_only for its requested
+        columns plus any `required` ones (e.g. the sort key), joined loads for
+        included to-one relations and one batched query per included collection.
+        """
+        options = []
+        if self.fields is not None:
+            columns = [getattr(self.model, name) for name in self.fields]
+            columns += [column for column in required if column.key not in self.fields]
+            options.append(load_only(*columns))
+
+        for name in self.include:
+            relation = self.relations[name]
+            if relation.model is not None:
+                continue
+
+            attribute = getattr(self.model, name)
+            loader = selectinload(attribute) if relation.many else joinedload(attribute)
+            columns = self._relation_columns(name)
+            if columns is not None:
+                target = self._target(self.model, relation, name)
+                loader = loader.load_only(*[getattr(target, column) for column in columns])
+            options.append(loader)
+
+        return options
+
+    def relation_options(self, name: str, *required) -> List[Any]:
+        """load_only for a relation the endpoint queries itself, plus `required` columns"""
+        fields = self.relation_fields.get(name)
+        if fields is None:
+            return []
+
+        target = self._target(self.model, self.relations[name], name)
+        columns = [getattr(target, column) for column in fields]
+        columns += [column for column in required if column.key not in fields]
+        return [load_only(*columns)]
+
+    def render(self, name: str, obj) -> Dict[str, Any]:
+        """Serialize one row of an included relation"""
+        fields = self.relation_fields.get(name)
+        if fields is not None:
+            return pick(obj, fields)
+        if self.relations[name].summary:
+            return self.relations[name].summary(obj)
+        return obj.to_dict()
+
+    def serialize(self, obj) -> Dict[str, Any]:
+        """Serialize a row with its requested columns and included relations"""
+        data = obj.to_dict() if self.fields is None else pick(obj, self.fields)
+
+        for name in self.include:
+            relation = self.relations[name]
+            if relation.model is not None:
+                continue
+
+            value = getattr(obj, name)
+            if relation.many:
+                data[name] = [self.render(name, item) for item in value]
+            elif value is not None:
+                data[name] = self.render(name, value)
+
+        return data
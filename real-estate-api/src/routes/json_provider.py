@@ -0,0 +1,81 @@
+"""
+JSON Provider
+Flask JSON provider that encodes responses with orjson, which writes dates,
+datetimes and times natively as ISO 8601 and builds the response bytes in
+one pass. Falls back to the standard library encoder if orjson is missing.
+"""
+import json
+import uuid
+from datetime import date, time
+from decimal import Decimal
+from typing import Any
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+def _default(value: Any) -> Any:
+    """Values neither encoder handles on its own"""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Same output as Flask's default provider (sorted keys, pretty-printed in
+    debug), except that dates are ISO 8601 rather than HTTP dates.
+    Serializers check `native_dates` to skip their own isoformat calls.
+    """
+
+    native_dates = True
+    default = staticmethod(_default)
+
+    def _option(self, sort_keys: bool, indent: bool) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj: Any, sort_keys: bool = None, indent: bool = False) -> bytes:
+        """Encode straight to UTF-8 bytes"""
+        sort_keys = self.sort_keys if sort_keys is None else sort_keys
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=self._option(sort_keys, indent))
+            except TypeError:
+                # Integers beyond 64 bits and the like: let the standard encoder have a go
+                pass
+
+        return json.dumps(
+            obj, default=_default, sort_keys=sort_keys, ensure_ascii=self.ensure_ascii,
+            indent=2 if indent else None, separators=None if indent else (',', ':')
+        ).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or set(kwargs) - {'sort_keys', 'indent'}:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, kwargs.get('sort_keys'), bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response without the str round trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent), mimetype=self.mimetype)
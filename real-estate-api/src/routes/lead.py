@@ -2,11 +2,32 @@ from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.lead import Lead
 from src.models.communication import Communication
+from src.automation.scoring import score_lead_data, score_arrays
+from src.automation.deadlines import deadline_index
+from src.automation.engine import automation_engine
+from src.automation.report_metrics import lead_metrics
+from src.automation.metrics_cache import metrics_cache, LEAD_METRICS
+from src.routes.pagination import SortKey, CursorError, paginate, page_size
+from src.routes.fieldsets import Fieldset, FieldsetError, Relation, AGENT
+from src.routes.serializers import Projection
 from datetime import datetime
 import json
 
 lead_bp = Blueprint('lead', __name__)
 
+# Keyset orders for paging, each backed by a composite index
+LEAD_ORDER = SortKey(Lead.created_date, Lead.id, descending=True)
+COMMUNICATION_ORDER = SortKey(Communication.sent_date, Communication.id, descending=True)
+
+# Relations the lead endpoints embed by default; narrowed with include=
+LEAD_LIST_RELATIONS = {
+    'assigned_agent': AGENT
+}
+LEAD_DETAIL_RELATIONS = {
+    'assigned_agent': Relation(),
+    'communications': Relation(many=True, model=Communication)  # Paged by the endpoint
+}
+
 @lead_bp.route('/leads', methods=['GET'])
 def get_leads():
     """Get all leads with optional filtering"""
@@ -15,9 +36,13 @@ def get_leads():
         status = request.args.get('status')
         source = request.args.get('source')
         agent_id = request.args.get('agent_id')
-        limit = request.args.get('limit', 50, type=int)
+        limit = page_size(request.args.get('limit', 50, type=int))
+        cursor = request.args.get('cursor')
         
-        # Build query
+        fieldset = Fieldset.from_args(request.args, Lead, LEAD_LIST_RELATIONS)
+        projection = Projection(fieldset, LEAD_ORDER.columns)
+        
+        # Build query; rows are read as plain column tuples with agents joined in
         query = Lead.query
         
         if status:
@@ -27,25 +52,21 @@ def get_leads():
         if agent_id:
             query = query.filter(Lead.assigned_agent_id == agent_id)
         
-        leads = query.order_by(Lead.created_date.desc()).limit(limit).all()
-        
-        # Enrich with agent information
-        result = []
-        for lead in leads:
-            lead_data = lead.to_dict()
-            if lead.assigned_agent:
-                lead_data['assigned_agent'] = {
-                    'id': lead.assigned_agent.id,
-                    'name': f"{lead.assigned_agent.first_name} {lead.assigned_agent.last_name}"
-                }
-            result.append(lead_data)
+        rows, next_cursor = paginate(projection.apply(query), LEAD_ORDER, limit, cursor)
+        result = projection.serialize(rows)
         
         return jsonify({
             'success': True,
             'leads': result,
-            'count': len(result)
+            'count': len(result),
+            'next_cursor': next_cursor
         })
         
+    except (CursorError, FieldsetError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -56,36 +77,89 @@ def get_leads():
 def get_lead(lead_id):
     """Get a specific lead with communication history"""
     try:
-        lead = Lead.query.get_or_404(lead_id)
-        lead_data = lead.to_dict()
+        fieldset = Fieldset.from_args(request.args, Lead, LEAD_DETAIL_RELATIONS)
+        lead = Lead.query.options(*fieldset.load_options()).filter(Lead.id == lead_id).first_or_404()
+        lead_data = fieldset.serialize(lead)
+        
+        # Add the most recent communications; older ones via /leads/<id>/communications
+        if fieldset.includes('communications'):
+            communications, next_cursor = paginate(
+                Communication.query.options(
+                    *fieldset.relation_options('communications', *COMMUNICATION_ORDER.columns)
+                ).filter(Communication.lead_id == lead_id),
+                COMMUNICATION_ORDER,
+                page_size(request.args.get('communications_limit', 50, type=int))
+            )
+            lead_data['communications'] = [fieldset.render('communications', comm) for comm in communications]
+            lead_data['communications_next_cursor'] = next_cursor
+        
+        return jsonify({
+            'success': True,
+            'lead': lead_data
+        })
+        
+    except FieldsetError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@lead_bp.route('/leads/<int:lead_id>/communications', methods=['GET'])
+def get_lead_communications(lead_id):
+    """Page through a lead's communication history, newest first"""
+    try:
+        limit = page_size(request.args.get('limit', 50, type=int))
+        cursor = request.args.get('cursor')
         
-        # Add assigned agent info
-        if lead.assigned_agent:
-            lead_data['assigned_agent'] = lead.assigned_agent.to_dict()
+        projection = Projection(Fieldset.from_args(request.args, Communication), COMMUNICATION_ORDER.columns)
         
-        # Add communication history
-        communications = Communication.query.filter_by(lead_id=lead_id).order_by(Communication.sent_date.desc()).all()
-        lead_data['communications'] = [comm.to_dict() for comm in communications]
+        rows, next_cursor = paginate(
+            projection.apply(Communication.query.filter(Communication.lead_id == lead_id)),
+            COMMUNICATION_ORDER,
+            limit,
+            cursor
+        )
+        communications = projection.serialize(rows)
         
         return jsonify({
             'success': True,
-            'lead': lead_data
+            'communications': communications,
+            'count': len(communications),
+            'next_cursor': next_cursor
         })
         
+    except (CursorError, FieldsetError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def _run_automation() -> bool:
+    """
+    Whether a create request opted in to the new_lead workflow (welcome email,
+    follow-up date, agent assignment) with ?run_automation=true. Off by default,
+    so imports never email leads unless asked to.
+    """
+    return request.args.get('run_automation', 'false').lower() in ('true', '1', 'yes')
+
 @lead_bp.route('/leads', methods=['POST'])
 def create_lead():
-    """Create a new lead"""
+    """Create a new lead. Pass ?run_automation=true to start the new_lead workflow."""
     try:
         data = request.get_json()
         
         # Calculate initial lead score
-        lead_score = calculate_lead_score(data)
+        lead_score = score_lead_data(data)
         
         lead = Lead(
             first_name=data['first_name'],
@@ -105,7 +179,13 @@ def create_lead():
         )
         
         db.session.add(lead)
+        db.session.flush()
+        deadline_index.lead_changed(lead.id)
+        if _run_automation():
+            automation_engine.trigger_workflow('new_lead', {'event': 'lead_created', 'lead_id': lead.id}, commit=False)
         db.session.commit()
+        automation_engine.dispatch_event.set()
+        metrics_cache.invalidate(LEAD_METRICS)
         
         return jsonify({
             'success': True,
@@ -120,6 +200,88 @@ def create_lead():
             'error': str(e)
         }), 500
 
+@lead_bp.route('/leads/bulk', methods=['POST'])
+def bulk_create_leads():
+    """
+    Import many leads at once, scoring them in a single batch. Pass
+    ?run_automation=true to start the new_lead workflow for every imported lead.
+    """
+    try:
+        data = request.get_json()
+        rows = data.get('leads', []) if isinstance(data, dict) else data
+        
+        if not rows:
+            return jsonify({
+                'success': False,
+                'error': 'No leads provided'
+            }), 400
+        
+        # Score the whole import in one vectorized call
+        scores = score_arrays(
+            [row.get('lead_source') or 'Other' for row in rows],
+            [row.get('timeline') or 'Just browsing' for row in rows],
+            [row.get('budget_max') or 0 for row in rows],
+            [row.get('property_interest') or 'Buying' for row in rows],
+            [bool(row.get('email')) for row in rows],
+            [bool(row.get('phone')) for row in rows]
+        )
+        
+        now = datetime.utcnow()
+        leads = [
+            {
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'email': row['email'],
+                'phone': row['phone'],
+                'lead_source': row['lead_source'],
+                'lead_status': row.get('lead_status', 'New'),
+                'lead_score': int(score),
+                'property_interest': row.get('property_interest'),
+                'budget_min': row.get('budget_min'),
+                'budget_max': row.get('budget_max'),
+                'preferred_areas': json.dumps(row['preferred_areas']) if row.get('preferred_areas') else None,
+                'timeline': row.get('timeline'),
+                'notes': row.get('notes'),
+                'assigned_agent_id': row.get('assigned_agent_id'),
+                'created_date': now,
+                'last_modified': now
+            }
+            for row, score in zip(rows, scores)
+        ]
+        
+        lead_ids = db.session.execute(
+            db.insert(Lead).returning(Lead.id, sort_by_parameter_order=True), leads
+        ).scalars().all()
+        
+        # Opted-in welcome workflows and deadline changes commit with the import itself
+        if _run_automation():
+            automation_engine.trigger_workflow_batch('new_lead', [
+                {'event': 'lead_created', 'lead_id': lead_id} for lead_id in lead_ids
+            ], commit=False)
+        deadline_index.lead_changed(*lead_ids)
+        db.session.commit()
+        automation_engine.dispatch_event.set()
+        metrics_cache.invalidate(LEAD_METRICS)
+        
+        return jsonify({
+            'success': True,
+            'count': len(leads),
+            'message': f'{len(leads)} leads imported successfully'
+        }), 201
+        
+    except KeyError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Missing required field: {e}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @lead_bp.route('/leads/<int:lead_id>', methods=['PUT'])
 def update_lead(lead_id):
     """Update a lead"""
@@ -142,9 +304,11 @@ def update_lead(lead_id):
             lead.next_follow_up = datetime.strptime(data['next_follow_up'], '%Y-%m-%d').date()
         
         # Recalculate lead score
-        lead.lead_score = calculate_lead_score(data, existing_lead=lead)
+        lead.lead_score = score_lead_data(data, existing_lead=lead)
         
+        deadline_index.lead_changed(lead.id)
         db.session.commit()
+        metrics_cache.invalidate(LEAD_METRICS)
         
         return jsonify({
             'success': True,
@@ -191,7 +355,9 @@ def convert_lead(lead_id):
         lead.lead_status = 'Converted'
         lead.converted_client_id = client.id
         
+        deadline_index.lead_changed(lead.id)
         db.session.commit()
+        metrics_cache.invalidate(LEAD_METRICS)
         
         return jsonify({
             'success': True,
@@ -210,47 +376,17 @@ def convert_lead(lead_id):
 def get_lead_metrics():
     """Get lead metrics for dashboard"""
     try:
-        # Total leads
-        total_leads = Lead.query.count()
-        
-        # New leads (last 7 days)
-        from datetime import datetime, timedelta
-        week_ago = datetime.now() - timedelta(days=7)
-        new_leads = Lead.query.filter(Lead.created_date >= week_ago).count()
-        
-        # Hot leads (score >= 80)
-        hot_leads = Lead.query.filter(Lead.lead_score >= 80).count()
-        
-        # Conversion rate
-        converted_leads = Lead.query.filter(Lead.lead_status == 'Converted').count()
-        conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
-        
-        # Leads by source
-        from sqlalchemy import func
-        leads_by_source = db.session.query(
-            Lead.lead_source,
-            func.count(Lead.id).label('count')
-        ).group_by(Lead.lead_source).all()
-        
-        source_breakdown = {source: count for source, count in leads_by_source}
-        
-        # Leads by status
-        leads_by_status = db.session.query(
-            Lead.lead_status,
-            func.count(Lead.id).label('count')
-        ).group_by(Lead.lead_status).all()
-        
-        status_breakdown = {status: count for status, count in leads_by_status}
+        metrics = metrics_cache.get(LEAD_METRICS, lead_metrics)
         
         return jsonify({
             'success': True,
             'metrics': {
-                'total_leads': total_leads,
-                'new_leads': new_leads,
-                'hot_leads': hot_leads,
-                'conversion_rate': round(conversion_rate, 1),
-                'leads_by_source': source_breakdown,
-                'leads_by_status': status_breakdown
+                'total_leads': metrics['total_leads'],
+                'new_leads': metrics['new_leads_since'],
+                'hot_leads': metrics['hot_leads'],
+                'conversion_rate': round(metrics['conversion_rate'], 1),
+                'leads_by_source': metrics['leads_by_source'],
+                'leads_by_status': metrics['leads_by_status']
             }
         })
         
@@ -259,71 +395,3 @@ def get_lead_metrics():
             'success': False,
             'error': str(e)
         }), 500
-
-def calculate_lead_score(data, existing_lead=None):
-    """Calculate lead score based on various factors"""
-    score = 0
-    
-    # Source scoring (30 points max)
-    source_scores = {
-        'Referral': 30,
-        'Website Form': 25,
-        'Google Ads': 20,
-        'Social Media': 18,
-        'Open House': 15,
-        'Zillow': 12,
-        'Realtor.com': 10,
-        'Cold Call': 8,
-        'Other': 5
-    }
-    
-    source = data.get('lead_source') or (existing_lead.lead_source if existing_lead else 'Other')
-    score += source_scores.get(source, 5)
-    
-    # Timeline scoring (25 points max)
-    timeline_scores = {
-        'ASAP': 25,
-        '1-3 months': 20,
-        '3-6 months': 15,
-        '6-12 months': 10,
-        '1+ years': 5,
-        'Just browsing': 3
-    }
-    
-    timeline = data.get('timeline') or (existing_lead.timeline if existing_lead else 'Just browsing')
-    score += timeline_scores.get(timeline, 3)
-    
-    # Budget scoring (20 points max)
-    budget_max = data.get('budget_max') or (existing_lead.budget_max if existing_lead else 0)
-    if budget_max:
-        if budget_max >= 1000000:
-            score += 20
-        elif budget_max >= 500000:
-            score += 15
-        elif budget_max >= 300000:
-            score += 10
-        elif budget_max >= 200000:
-            score += 8
-        else:
-            score += 5
-    
-    # Property interest scoring (15 points max)
-    interest_scores = {
-        'Buying': 15,
-        'Both': 12,
-        'Selling': 10,
-        'Investing': 8,
-        'Renting': 3
-    }
-    
-    interest = data.get('property_interest') or (existing_lead.property_interest if existing_lead else 'Buying')
-    score += interest_scores.get(interest, 5)
-    
-    # Contact completeness (10 points max)
-    if data.get('email') or (existing_lead and existing_lead.email):
-        score += 5
-    if data.get('phone') or (existing_lead and existing_lead.phone):
-        score += 5
-    
-    return min(score, 100)  # Cap at 100
-
@@ -0,0 +1,98 @@
+"""
+Cursor Pagination
+Keyset pagination for list endpoints. Pages are read with a WHERE on the
+sort key instead of OFFSET, so a deep page costs the same as the first one.
+Cursors are opaque to clients.
+"""
+import base64
+import json
+from typing import List, Any, Optional, Sequence, Tuple
+from src.models.user import db
+from src.automation.tagged_json import encode_value, decode_value
+
+MAX_PAGE_SIZE = 200
+
+class CursorError(ValueError):
+    """A cursor that is malformed or belongs to a different sort order"""
+
+class SortKey:
+    """
+    A sort order over columns whose last column is unique (usually the id), so
+    every row has a distinct position. `descending` applies to all columns,
+    matching a plain composite index scanned backwards. NULLs sort lowest.
+    """
+
+    def __init__(self, *columns, descending: bool = False):
+        self.columns = columns
+        self.descending = descending
+        self.names = [column.key for column in columns]
+        self.table = columns[0].class_.__tablename__
+
+    def order_by(self) -> List:
+        """ORDER BY clauses, with NULLs lowest on databases that sort them highest by default"""
+        clauses = []
+        nulls_high = db.engine.dialect.name in ('postgresql', 'oracle')
+        for column in self.columns:
+            if self.descending:
+                clauses.append(column.desc().nulls_last() if nulls_high else column.desc())
+            else:
+                clauses.append(column.asc().nulls_first() if nulls_high else column.asc())
+        return clauses
+
+    def after(self, values: Sequence[Any]):
+        """WHERE clause selecting rows that sort after the given key values"""
+        return self._after(list(zip(self.columns, values)))
+
+    def _after(self, pairs: List[Tuple[Any, Any]]):
+        (column, value), rest = pairs[0], pairs[1:]
+
+        if value is None:
+            # NULLs are lowest: after them come all non-NULLs ascending, nothing descending
+            beyond = None if self.descending else column.isnot(None)
+            tie = column.is_(None)
+        else:
+            beyond = db.or_(column < value, column.is_(None)) if self.descending else column > value
+            tie = column == value
+
+        if not rest:
+            return beyond if beyond is not None else db.false()
+        if beyond is None:
+            return db.and_(tie, self._after(rest))
+        return db.or_(beyond, db.and_(tie, self._after(rest)))
+
+    def encode(self, row) -> str:
+        """Opaque cursor pointing just past a row"""
+        payload = {'t': self.table, 'k': self.names, 'v': [getattr(row, name) for name in self.names]}
+        data = json.dumps(payload, default=encode_value, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+    def decode(self, cursor: str) -> List[Any]:
+        """Key values from a cursor. Raises CursorError if it is not one of ours."""
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(data, object_hook=decode_value)
+        except (ValueError, TypeError):
+            raise CursorError('Invalid cursor')
+
+        if not isinstance(payload, dict) or payload.get('t') != self.table or payload.get('k') != self.names or len(payload.get('v') or []) != len(self.names):
+            raise CursorError('Cursor does not match this listing')
+        return payload['v']
+
+def page_size(value: Optional[int], default: int = 50) -> int:
+    """Requested page size, clamped to 1..MAX_PAGE_SIZE"""
+    return max(1, min(value or default, MAX_PAGE_SIZE))
+
+def paginate(query, sort_key: SortKey, limit: int, cursor: str = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of a query in sort-key order, starting after `cursor`.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        query = query.filter(sort_key.after(sort_key.decode(cursor)))
+
+    items = query.order_by(*sort_key.order_by()).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    return items, sort_key.encode(items[-1])
@@ -0,0 +1,150 @@
+"""
+Row Serializers
+Column-projected serialization for list endpoints. A Fieldset is compiled into
+one column select and a generated function that turns each result row tuple
+straight into its response dict, so a page is never loaded as ORM objects
+and never goes through to_dict.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List, Any, Sequence, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy.orm import aliased
+from src.models.user import db
+from src.routes.fieldsets import Fieldset, serializable_fields
+
+_DATE_TYPES = (db.Date, db.DateTime, db.Time)
+
+def native_dates() -> bool:
+    """Whether the app's JSON provider encodes dates itself, making isoformat calls unnecessary"""
+    return has_app_context() and getattr(current_app.json, 'native_dates', False)
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+def _is_date(model, name: str) -> bool:
+    return isinstance(getattr(model, name).type, _DATE_TYPES)
+
+@lru_cache(maxsize=256)
+def compile_converter(fields: Tuple[Tuple[str, int, bool], ...],
+                      relations: Tuple[Tuple[str, int, Any, Tuple], ...] = ()):
+    """
+    Generate a function from a result row to a dict. `fields` holds
+    (key, row index, isoformat) entries. `relations` holds to-one relations
+    joined into the same row as (key, primary key index, summary, fields):
+    the nested dict is built from `fields`, or `summary` is called on a named
+    tuple of them. A relation whose primary key is NULL is left out, as
+    to_dict callers do. Keys and callables are passed in as constants, never
+    spliced into the generated source.
+    """
+    constants = {'_iso': _iso}
+
+    def entries(prefix: str, items) -> str:
+        pieces = []
+        for position, (key, index, iso) in enumerate(items):
+            constants[f'{prefix}{position}'] = key
+            value = f'row[{index}]'
+            pieces.append(f'{prefix}{position}: {f"_iso({value})" if iso else value}')
+        return '{' + ', '.join(pieces) + '}'
+
+    lines = ['def convert(row):', f'    data = {entries("_k", fields)}']
+    for number, (key, pk_index, summary, items) in enumerate(relations):
+        constants[f'_r{number}'] = key
+        lines.append(f'    if row[{pk_index}] is not None:')
+        if summary is not None:
+            constants[f'_s{number}'] = summary
+            constants[f'_t{number}'] = namedtuple(f'{key}_row', [item[0] for item in items])
+            values = ', '.join(f'_iso(row[{index}])' if iso else f'row[{index}]' for _, index, iso in items)
+            lines.append(f'        data[_r{number}] = _s{number}(_t{number}({values}))')
+        else:
+            lines.append(f'        data[_r{number}] = {entries(f"_r{number}_", items)}')
+    lines.append('    return data')
+
+    exec(compile('\n'.join(lines) + '\n', f'<converter {fields[0][0] if fields else ""}>', 'exec'), constants)
+    return constants['convert']
+
+class Projection:
+    """
+    A Fieldset compiled for list endpoints. Included to-one relations are
+    outer-joined into the main select; each included collection is read with
+    one more select for the whole page. `required` columns (such as the sort
+    key) are selected under their own names but only returned if requested.
+    """
+
+    def __init__(self, fieldset: Fieldset, required: Sequence[Any] = ()):
+        self.fieldset = fieldset
+        self.model = fieldset.model
+        self.iso = not native_dates()
+        self.columns = []
+        self.joins = []
+        self.collections = []
+
+        fields = fieldset.fields if fieldset.fields is not None else serializable_fields(self.model)
+        entries = self._add_columns(self.model, fields)
+        self.id_index = fields.index('id')
+        for column in required:
+            if column.key not in fields:
+                self.columns.append(column)
+
+        joined = []
+        for name in fieldset.include:
+            relation = fieldset.relations[name]
+            if relation.model is not None:
+                continue
+
+            target = Fieldset._target(self.model, relation, name)
+            columns = fieldset._relation_columns(name) or serializable_fields(target)
+            if relation.many:
+                self.collections.append(self._collection(name, target, columns))
+                continue
+
+            alias = aliased(target)
+            self.joins.append((alias, getattr(self.model, name)))
+            start = len(self.columns)
+            self.columns += [getattr(alias, column).label(f'{name}__{column}') for column in columns]
+            items = tuple((column, start + offset, self.iso and _is_date(target, column))
+                          for offset, column in enumerate(columns))
+            summary = relation.summary if fieldset.relation_fields.get(name) is None else None
+            joined.append((name, start + columns.index('id'), summary, items))
+
+        self.convert = compile_converter(entries, tuple(joined))
+
+    def _add_columns(self, model, fields: Sequence[str]) -> Tuple:
+        """Select a model's columns, returning converter entries for them"""
+        start = len(self.columns)
+        self.columns += [getattr(model, name) for name in fields]
+        return tuple((name, start + offset, self.iso and _is_date(model, name))
+                     for offset, name in enumerate(fields))
+
+    def _collection(self, name: str, target, columns: Sequence[str]) -> Tuple:
+        """Select, converter and parent key column for an included collection"""
+        prop = getattr(self.model, name).property
+        foreign_key = next(iter(prop.remote_side))
+        entries = tuple((column, offset, self.iso and _is_date(target, column))
+                        for offset, column in enumerate(columns))
+        select = db.select(*[getattr(target, column) for column in columns], foreign_key).order_by(target.id)
+        return name, select, foreign_key, compile_converter(entries)
+
+    def apply(self, query):
+        """Turn an entity query (with its filters) into a select of the projected columns"""
+        query = query.with_entities(*self.columns)
+        for alias, attribute in self.joins:
+            query = query.outerjoin(alias, attribute.of_type(alias))
+        return query
+
+    def serialize(self, rows: Sequence[Any]) -> List[Dict[str, Any]]:
+        """Convert fetched rows, reading included collections for all of them at once"""
+        convert = self.convert
+        result = [convert(row) for row in rows]
+        if not result:
+            return result
+
+        ids = [row[self.id_index] for row in rows]
+        for name, select, foreign_key, convert_child in self.collections:
+            groups = {}
+            for child in db.session.execute(select.where(foreign_key.in_(ids))):
+                groups.setdefault(child[-1], []).append(convert_child(child))
+            for data, parent_id in zip(result, ids):
+                data[name] = groups.get(parent_id, [])
+
+        return result
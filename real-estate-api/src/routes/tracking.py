@@ -0,0 +1,42 @@
+"""
+Email Tracking Routes
+Open pixel and click redirect endpoints. Hits are buffered in memory and
+written in batches, so these never wait on the database.
+"""
+from flask import Blueprint, Response, redirect, abort
+from src.automation.tracking import tracking_events, read_token, PIXEL_GIF
+import logging
+
+logger = logging.getLogger(__name__)
+
+tracking_bp = Blueprint('tracking', __name__)
+
+NO_CACHE = {
+    'Cache-Control': 'no-cache, no-store, must-revalidate, private',
+    'Pragma': 'no-cache',
+    'Expires': '0'
+}
+
+@tracking_bp.route('/t/o/<token>.gif', methods=['GET'])
+def track_open(token):
+    """Record an email open and return a transparent pixel"""
+    payload = read_token(token)
+    if payload:
+        tracking_events.record(payload[0], 'open')
+
+    # Always answer with the pixel so a bad token shows nothing to the reader
+    return Response(PIXEL_GIF, mimetype='image/gif', headers=NO_CACHE)
+
+@tracking_bp.route('/t/c/<token>', methods=['GET'])
+def track_click(token):
+    """Record a link click and redirect to the link's target"""
+    payload = read_token(token)
+    if not payload or not payload[1]:
+        abort(404)
+
+    message_id, url = payload
+    tracking_events.record(message_id, 'click')
+
+    response = redirect(url, code=302)
+    response.headers.update(NO_CACHE)
+    return response
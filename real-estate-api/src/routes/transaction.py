@@ -3,11 +3,40 @@ from src.models.user import db
 from src.models.transaction import Transaction, TransactionMilestone, TransactionDocument
 from src.models.property import Property
 from src.models.client import Client
+from src.automation.deadlines import deadline_index
+from src.automation.engine import automation_engine
+from src.automation.report_metrics import transaction_metrics
+from src.automation.metrics_cache import metrics_cache, TRANSACTION_METRICS
+from src.routes.pagination import SortKey, CursorError, paginate, page_size
+from src.routes.fieldsets import Fieldset, FieldsetError, Relation, AGENT
+from src.routes.serializers import Projection
 from datetime import datetime, date
 import json
 
 transaction_bp = Blueprint('transaction', __name__)
 
+# Keyset order for paging, backed by ix_transactions_created_date_id
+TRANSACTION_ORDER = SortKey(Transaction.created_date, Transaction.id, descending=True)
+
+# Relations the transaction endpoints embed by default; narrowed with include=.
+# The list shows agents as id and name only, the detail view in full.
+TRANSACTION_LIST_RELATIONS = {
+    'property': Relation(),
+    'client': Relation(),
+    'listing_agent': AGENT,
+    'buyer_agent': AGENT,
+    'milestones': Relation(many=True),
+    'documents': Relation(many=True)
+}
+TRANSACTION_DETAIL_RELATIONS = {
+    'property': Relation(),
+    'client': Relation(),
+    'listing_agent': Relation(),
+    'buyer_agent': Relation(),
+    'milestones': Relation(many=True),
+    'documents': Relation(many=True)
+}
+
 @transaction_bp.route('/transactions', methods=['GET'])
 def get_transactions():
     """Get all transactions with optional filtering"""
@@ -15,9 +44,13 @@ def get_transactions():
         # Get query parameters
         status = request.args.get('status')
         agent_id = request.args.get('agent_id')
-        limit = request.args.get('limit', 50, type=int)
+        limit = page_size(request.args.get('limit', 50, type=int))
+        cursor = request.args.get('cursor')
+        
+        fieldset = Fieldset.from_args(request.args, Transaction, TRANSACTION_LIST_RELATIONS)
+        projection = Projection(fieldset, TRANSACTION_ORDER.columns)
         
-        # Build query
+        # Build query; rows are read as plain column tuples, with milestones and documents batched per page
         query = Transaction.query
         
         if status:
@@ -28,50 +61,21 @@ def get_transactions():
                 (Transaction.buyer_agent_id == agent_id)
             )
         
-        transactions = query.limit(limit).all()
-        
-        # Enrich with related data
-        result = []
-        for transaction in transactions:
-            transaction_data = transaction.to_dict()
-            
-            # Add property information
-            if transaction.property:
-                transaction_data['property'] = transaction.property.to_dict()
-            
-            # Add client information
-            if transaction.client:
-                transaction_data['client'] = transaction.client.to_dict()
-            
-            # Add agent information
-            if transaction.listing_agent:
-                transaction_data['listing_agent'] = {
-                    'id': transaction.listing_agent.id,
-                    'name': f"{transaction.listing_agent.first_name} {transaction.listing_agent.last_name}"
-                }
-            
-            if transaction.buyer_agent:
-                transaction_data['buyer_agent'] = {
-                    'id': transaction.buyer_agent.id,
-                    'name': f"{transaction.buyer_agent.first_name} {transaction.buyer_agent.last_name}"
-                }
-            
-            # Add milestones
-            milestones = TransactionMilestone.query.filter_by(transaction_id=transaction.id).all()
-            transaction_data['milestones'] = [milestone.to_dict() for milestone in milestones]
-            
-            # Add documents
-            documents = TransactionDocument.query.filter_by(transaction_id=transaction.id).all()
-            transaction_data['documents'] = [doc.to_dict() for doc in documents]
-            
-            result.append(transaction_data)
+        rows, next_cursor = paginate(projection.apply(query), TRANSACTION_ORDER, limit, cursor)
+        result = projection.serialize(rows)
         
         return jsonify({
             'success': True,
             'transactions': result,
-            'count': len(result)
+            'count': len(result),
+            'next_cursor': next_cursor
         })
         
+    except (CursorError, FieldsetError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -82,37 +86,22 @@ def get_transactions():
 def get_transaction(transaction_id):
     """Get a specific transaction with all related data"""
     try:
-        transaction = Transaction.query.get_or_404(transaction_id)
-        transaction_data = transaction.to_dict()
-        
-        # Add property information
-        if transaction.property:
-            transaction_data['property'] = transaction.property.to_dict()
-        
-        # Add client information
-        if transaction.client:
-            transaction_data['client'] = transaction.client.to_dict()
-        
-        # Add agent information
-        if transaction.listing_agent:
-            transaction_data['listing_agent'] = transaction.listing_agent.to_dict()
-        
-        if transaction.buyer_agent:
-            transaction_data['buyer_agent'] = transaction.buyer_agent.to_dict()
-        
-        # Add milestones
-        milestones = TransactionMilestone.query.filter_by(transaction_id=transaction.id).all()
-        transaction_data['milestones'] = [milestone.to_dict() for milestone in milestones]
-        
-        # Add documents
-        documents = TransactionDocument.query.filter_by(transaction_id=transaction.id).all()
-        transaction_data['documents'] = [doc.to_dict() for doc in documents]
+        fieldset = Fieldset.from_args(request.args, Transaction, TRANSACTION_DETAIL_RELATIONS)
+        transaction = Transaction.query.options(*fieldset.load_options()).filter(
+            Transaction.id == transaction_id
+        ).first_or_404()
+        transaction_data = fieldset.serialize(transaction)
         
         return jsonify({
             'success': True,
             'transaction': transaction_data
         })
         
+    except FieldsetError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -160,6 +149,7 @@ def create_transaction():
             {'name': 'Closing', 'status': 'Pending', 'due_date': transaction.closing_date}
         ]
         
+        milestones = []
         for milestone_data in default_milestones:
             milestone = TransactionMilestone(
                 transaction_id=transaction.id,
@@ -168,8 +158,12 @@ def create_transaction():
                 due_date=milestone_data['due_date']
             )
             db.session.add(milestone)
+            milestones.append(milestone)
         
+        db.session.flush()
+        deadline_index.milestone_changed(*[milestone.id for milestone in milestones])
         db.session.commit()
+        metrics_cache.invalidate(TRANSACTION_METRICS)
         
         return jsonify({
             'success': True,
@@ -209,6 +203,7 @@ def update_transaction(transaction_id):
                 transaction.buyer_commission = transaction.total_commission / 2
         
         db.session.commit()
+        metrics_cache.invalidate(TRANSACTION_METRICS)
         
         return jsonify({
             'success': True,
@@ -235,8 +230,12 @@ def update_milestone(transaction_id):
             transaction_id=transaction_id
         ).first_or_404()
         
-        # Update milestone
+        # Update milestone. A status change re-arms the overdue reminder:
+        # clear the sent flag and the fire ledger entry that would hold it back
         if 'milestone_status' in data:
+            if data['milestone_status'] != milestone.milestone_status:
+                milestone.auto_reminder_sent = False
+                automation_engine.fire_ledger.release('milestone_overdue', [milestone.id])
             milestone.milestone_status = data['milestone_status']
         
         if 'completed_date' in data and data['completed_date']:
@@ -257,7 +256,9 @@ def update_milestone(transaction_id):
         if total_milestones > 0:
             transaction.progress_percentage = int((completed_milestones / total_milestones) * 100)
         
+        deadline_index.milestone_changed(milestone.id)
         db.session.commit()
+        metrics_cache.invalidate(TRANSACTION_METRICS)
         
         return jsonify({
             'success': True,
@@ -276,57 +277,17 @@ def update_milestone(transaction_id):
 def get_transaction_metrics():
     """Get transaction metrics for dashboard"""
     try:
-        # Get basic counts
-        total_active = Transaction.query.filter(Transaction.transaction_status.in_(['Active', 'Under Contract', 'Pending'])).count()
-        
-        # Closing this week
-        from datetime import datetime, timedelta
-        today = datetime.now().date()
-        week_end = today + timedelta(days=7)
-        
-        closing_this_week = Transaction.query.filter(
-            Transaction.closing_date.between(today, week_end),
-            Transaction.transaction_status != 'Closed'
-        ).count()
-        
-        # At risk transactions (high risk level or overdue milestones)
-        at_risk = Transaction.query.filter(Transaction.risk_level == 'High').count()
-        
-        # Total volume
-        total_volume = db.session.query(db.func.sum(Transaction.sale_price)).filter(
-            Transaction.transaction_status == 'Closed'
-        ).scalar() or 0
-        
-        # Average days to close
-        closed_transactions = Transaction.query.filter(
-            Transaction.transaction_status == 'Closed',
-            Transaction.contract_date.isnot(None),
-            Transaction.actual_closing_date.isnot(None)
-        ).all()
-        
-        if closed_transactions:
-            total_days = sum([
-                (t.actual_closing_date - t.contract_date).days 
-                for t in closed_transactions
-            ])
-            avg_days_to_close = total_days / len(closed_transactions)
-        else:
-            avg_days_to_close = 0
-        
-        # Success rate
-        total_transactions = Transaction.query.count()
-        successful_transactions = Transaction.query.filter(Transaction.transaction_status == 'Closed').count()
-        success_rate = (successful_transactions / total_transactions * 100) if total_transactions > 0 else 0
+        metrics = metrics_cache.get(TRANSACTION_METRICS, transaction_metrics)
         
         return jsonify({
             'success': True,
             'metrics': {
-                'total_active': total_active,
-                'closing_this_week': closing_this_week,
-                'at_risk': at_risk,
-                'total_volume': total_volume,
-                'avg_days_to_close': round(avg_days_to_close),
-                'success_rate': round(success_rate)
+                'total_active': metrics['total_active'],
+                'closing_this_week': metrics['closing_this_week'],
+                'at_risk': metrics['at_risk'],
+                'total_volume': metrics['total_volume'],
+                'avg_days_to_close': round(metrics['avg_days_to_close']),
+                'success_rate': round(metrics['success_rate'])
             }
         })
         
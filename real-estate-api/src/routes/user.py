@@ -1,12 +1,42 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.routes.pagination import SortKey, CursorError, paginate, page_size
+from src.routes.fieldsets import Fieldset, FieldsetError, AGENT
+from src.routes.serializers import Projection
 
 user_bp = Blueprint('user', __name__)
 
+USER_ORDER = SortKey(User.id)
+
+# Relations a user response can embed with include=; none by default
+USER_RELATIONS = {
+    'manager': AGENT
+}
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    try:
+        fieldset = Fieldset.from_args(request.args, User, USER_RELATIONS, default_include=())
+        projection = Projection(fieldset, USER_ORDER.columns)
+        query = projection.apply(User.query)
+
+        # Unpaged unless limit or cursor is given; the next page's cursor is in X-Next-Cursor
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            users, next_cursor = query.order_by(User.id).all(), None
+        else:
+            users, next_cursor = paginate(
+                query,
+                USER_ORDER,
+                page_size(request.args.get('limit', 50, type=int)),
+                request.args.get('cursor')
+            )
+    except (CursorError, FieldsetError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify(projection.serialize(users))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -19,8 +49,13 @@ def create_user():
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    try:
+        fieldset = Fieldset.from_args(request.args, User, USER_RELATIONS, default_include=())
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+
+    user = User.query.options(*fieldset.load_options()).filter(User.id == user_id).first_or_404()
+    return jsonify(fieldset.serialize(user))
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -0,0 +1,78 @@
+"""
+Query Counting
+Test support that counts the SQL statements an endpoint runs, to check that
+list endpoints use a fixed number of queries whatever the page size
+"""
+from contextlib import contextmanager
+from typing import Dict, List, Any, Tuple
+from sqlalchemy import event
+from src.models.user import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Most queries each list endpoint may run, checked at page sizes 1 and 200
+ENDPOINT_QUERY_BUDGETS = {
+    '/api/leads': 1,  # leads joined with their agents
+    '/api/transactions': 3,  # transactions joined with property, client and agents; milestones; documents
+}
+
+class QueryCounter:
+    """SQL statements executed while counting"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+@contextmanager
+def count_queries(engine=None):
+    """Count statements run on the engine (default: the app's) inside the block"""
+    engine = engine or db.engine
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def assert_max_queries(client, path: str, max_queries: int) -> Tuple[Any, int]:
+    """
+    Request `path` with a Flask test client and raise AssertionError if it ran
+    more than `max_queries` statements. Returns (response, query count).
+    """
+    with count_queries() as counter:
+        response = client.get(path)
+
+    if response.status_code != 200:
+        raise AssertionError(f"GET {path} returned {response.status_code}")
+    if counter.count > max_queries:
+        statements = '\n'.join(counter.statements)
+        raise AssertionError(f"GET {path} ran {counter.count} queries, expected at most {max_queries}:\n{statements}")
+
+    return response, counter.count
+
+def check_query_budgets(app, budgets: Dict[str, int] = None, page_sizes: Tuple[int, ...] = (1, 200)) -> Dict[str, List[int]]:
+    """
+    Check every list endpoint against its query budget at each page size.
+    Returns the query counts by path; raises AssertionError on the first overrun.
+    """
+    budgets = budgets or ENDPOINT_QUERY_BUDGETS
+    counts = {}
+
+    with app.app_context():
+        client = app.test_client()
+        for path, max_queries in budgets.items():
+            counts[path] = []
+            for page_size in page_sizes:
+                separator = '&' if '?' in path else '?'
+                _, count = assert_max_queries(client, f"{path}{separator}limit={page_size}", max_queries)
+                counts[path].append(count)
+
+    return counts
@@ -0,0 +1,114 @@
+"""
+Stub SMTP Server
+Minimal in-process SMTP server for tests: speaks just enough of the protocol
+for smtplib (EHLO, MAIL, RCPT, DATA, NOOP, RSET, QUIT) on an ephemeral port,
+records every command and message, and can drop its open connections.
+"""
+import socket
+import socketserver
+import threading
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server.stub
+        server._opened(self.connection)
+        try:
+            self._reply('220 stub ESMTP')
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode('ascii', 'replace').strip()
+                verb = command.split(' ', 1)[0].upper()
+                server._command(verb)
+
+                if verb == 'EHLO':
+                    self._reply('250-stub', '250 8BITMIME')
+                elif verb == 'HELO':
+                    self._reply('250 stub')
+                elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                    self._reply('250 OK')
+                elif verb == 'DATA':
+                    self._reply('354 End data with <CR><LF>.<CR><LF>')
+                    server._message(self._read_data())
+                    self._reply('250 OK queued')
+                elif verb == 'QUIT':
+                    self._reply('221 Bye')
+                    return
+                else:
+                    self._reply('502 Command not implemented')
+        except OSError:
+            pass
+        finally:
+            server._closed(self.connection)
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b'.\r\n':
+                return b''.join(lines)
+            lines.append(line[1:] if line.startswith(b'..') else line)
+
+    def _reply(self, *lines: str):
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode('ascii'))
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class StubSMTPServer:
+    """SMTP server on 127.0.0.1 and a free port, run on a background thread"""
+
+    def __init__(self):
+        self.server = _Server(('127.0.0.1', 0), _Handler)
+        self.server.stub = self
+        self.host, self.port = self.server.server_address
+        self.lock = threading.Lock()
+        self.commands = []
+        self.messages = []
+        self.connections_total = 0
+        self.max_concurrent = 0
+        self.open_sockets = set()
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    def start(self) -> 'StubSMTPServer':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.drop_connections()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def drop_connections(self):
+        """Close every open session from the server side, as an idle timeout would"""
+        with self.lock:
+            sockets = list(self.open_sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def count(self, verb: str) -> int:
+        with self.lock:
+            return self.commands.count(verb)
+
+    def _opened(self, sock):
+        with self.lock:
+            self.open_sockets.add(sock)
+            self.connections_total += 1
+            self.max_concurrent = max(self.max_concurrent, len(self.open_sockets))
+
+    def _closed(self, sock):
+        with self.lock:
+            self.open_sockets.discard(sock)
+
+    def _command(self, verb: str):
+        with self.lock:
+            self.commands.append(verb)
+
+    def _message(self, data: bytes):
+        with self.lock:
+            self.messages.append(data)
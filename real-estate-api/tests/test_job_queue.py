@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from src.models.user import db
+from src.models.automation_job import AutomationJob
+from src.automation.job_queue import JobQueue
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def queue(app):
+    return JobQueue(lease_seconds=60, max_attempts=3, backoff_base=30, backoff_max=100)
+
+def job(job_id):
+    db.session.expire_all()
+    return db.session.get(AutomationJob, job_id)
+
+def expire_lease(job_id):
+    AutomationJob.query.filter(AutomationJob.id == job_id).update({
+        'locked_until': datetime.utcnow() - timedelta(seconds=1)
+    }, synchronize_session=False)
+    db.session.commit()
+
+def make_runnable(job_id):
+    AutomationJob.query.filter(AutomationJob.id == job_id).update({
+        'run_after': datetime.utcnow() - timedelta(seconds=1)
+    }, synchronize_session=False)
+    db.session.commit()
+
+def test_claims_never_share_a_job(queue):
+    ids = [queue.enqueue('new_lead', {'lead_id': number}).id for number in range(5)]
+
+    first = queue.claim('worker-a', limit=3)
+    second = queue.claim('worker-b', limit=10)
+
+    first_ids = {claimed['id'] for claimed in first}
+    second_ids = {claimed['id'] for claimed in second}
+    assert len(first_ids) == 3
+    assert first_ids.isdisjoint(second_ids)
+    assert first_ids | second_ids == set(ids)
+    assert queue.claim('worker-c', limit=10) == []
+    assert first[0]['context'] == {'lead_id': 0}
+    assert first[0]['lock_token'] != second[0]['lock_token']
+
+def test_claim_filters_by_workflow(queue):
+    queue.enqueue('new_lead', {})
+    report_id = queue.enqueue('daily_report_generation', {}).id
+
+    claimed = queue.claim('worker-a', workflow_names=['daily_report_generation'])
+
+    assert [claimed_job['id'] for claimed_job in claimed] == [report_id]
+
+def test_expired_lease_is_claimed_again(queue):
+    job_id = queue.enqueue('new_lead', {}).id
+    stale = queue.claim('worker-a')[0]
+
+    # A live lease keeps the job away from other workers
+    assert queue.claim('worker-b') == []
+
+    expire_lease(job_id)
+    taken = queue.claim('worker-b')
+
+    assert [claimed['id'] for claimed in taken] == [job_id]
+    assert taken[0]['attempts'] == 2
+    # The first worker has lost the job and cannot finish it
+    assert not queue.extend_lease(job_id, stale['lock_token'])
+    queue.complete(job_id, stale['lock_token'])
+    assert job(job_id).status == 'Running'
+    queue.complete(job_id, taken[0]['lock_token'])
+    assert job(job_id).status == 'Completed'
+
+@pytest.mark.parametrize('update_returning', [True, False])
+def test_extend_leases_renews_held_jobs_and_reports_lost_ones(app, queue, monkeypatch, update_returning):
+    monkeypatch.setattr(db.engine.dialect, 'update_returning', update_returning)
+    held_id = queue.enqueue('new_lead', {}).id
+    lost_id = queue.enqueue('new_lead', {}).id
+    claimed = {claimed_job['id']: claimed_job['lock_token'] for claimed_job in queue.claim('worker-a')}
+
+    expire_lease(held_id)
+    expire_lease(lost_id)
+    queue.claim('worker-b', limit=10)  # takes both over
+    AutomationJob.query.filter(AutomationJob.id == held_id).update({
+        'locked_by': claimed[held_id]
+    }, synchronize_session=False)
+    db.session.commit()
+
+    lost = queue.extend_leases(claimed)
+
+    assert lost == [lost_id]
+    assert job(held_id).locked_until > datetime.utcnow() + timedelta(seconds=50)
+    assert queue.extend_leases({}) == []
+
+def test_failures_back_off_exponentially_up_to_the_cap(queue):
+    queue.max_attempts = 5
+    job_id = queue.enqueue('new_lead', {}).id
+    delays = []
+
+    for _ in range(3):
+        make_runnable(job_id)
+        claimed = queue.claim('worker-a')[0]
+        before = datetime.utcnow()
+        queue.fail(job_id, 'boom', claimed['lock_token'])
+
+        failed = job(job_id)
+        assert failed.status == 'Pending'
+        assert failed.locked_by is None
+        assert failed.last_error == 'boom'
+        delays.append(round((failed.run_after - before).total_seconds()))
+        # Not runnable again until the backoff passes
+        assert queue.claim('worker-a') == []
+
+    assert delays == [30, 60, 100]
+
+def test_final_failure_dead_letters_the_job(queue):
+    job_id = queue.enqueue('new_lead', {}).id
+
+    for _ in range(queue.max_attempts):
+        make_runnable(job_id)
+        claimed = queue.claim('worker-a')[0]
+        queue.fail(job_id, 'boom', claimed['lock_token'])
+
+    dead = job(job_id)
+    assert dead.status == 'Dead'
+    assert dead.attempts == queue.max_attempts
+    make_runnable(job_id)
+    assert queue.claim('worker-a') == []
+
+    assert queue.retry(job_id)
+    retried = job(job_id)
+    assert (retried.status, retried.attempts, retried.last_error) == ('Pending', 0, None)
+    assert [claimed['id'] for claimed in queue.claim('worker-a')] == [job_id]
+
+def test_expired_final_attempt_is_dead_lettered_by_purge(queue):
+    queue.max_attempts = 1
+    job_id = queue.enqueue('new_lead', {}).id
+    queue.claim('worker-a')
+    expire_lease(job_id)
+
+    # Out of attempts, so the expired lease is not claimable
+    assert queue.claim('worker-b') == []
+    queue.purge(datetime.utcnow() - timedelta(days=7))
+
+    dead = job(job_id)
+    assert dead.status == 'Dead'
+    assert dead.last_error == 'Lease expired on final attempt'
+
+def test_release_returns_unstarted_jobs_without_using_an_attempt(queue):
+    job_id = queue.enqueue('new_lead', {}).id
+    claimed = queue.claim('worker-a')[0]
+
+    queue.release([job_id], claimed['lock_token'])
+
+    released = job(job_id)
+    assert (released.status, released.attempts, released.locked_by) == ('Pending', 0, None)
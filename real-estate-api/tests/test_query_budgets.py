@@ -0,0 +1,91 @@
+from datetime import date
+
+import pytest
+from flask import Flask
+
+from src.models.user import db, User
+from src.models.lead import Lead
+from src.models.client import Client
+from src.models.property import Property
+from src.models.transaction import Transaction, TransactionMilestone, TransactionDocument
+from src.routes.lead import lead_bp
+from src.routes.transaction import transaction_bp
+from src.routes.json_provider import FastJSONProvider
+from tests.query_count import ENDPOINT_QUERY_BUDGETS, assert_max_queries, check_query_budgets
+
+# More rows than the largest page, so every page size returns a full page
+ROWS = 210
+AGENTS = 20
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.register_blueprint(lead_bp, url_prefix='/api')
+    app.register_blueprint(transaction_bp, url_prefix='/api')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        seed()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def seed():
+    """Leads with agents, and transactions with property, client, agents, milestones and documents"""
+    db.session.execute(db.insert(User), [
+        {'username': f'agent{i}', 'first_name': 'Agent', 'last_name': str(i),
+         'email': f'agent{i}@example.com', 'role': 'Agent', 'status': 'Active'}
+        for i in range(AGENTS)
+    ])
+    db.session.execute(db.insert(Lead), [
+        {'first_name': 'Lead', 'last_name': str(i), 'email': f'lead{i}@example.com', 'phone': '555-0100',
+         'lead_source': 'Website', 'assigned_agent_id': i % AGENTS + 1}
+        for i in range(ROWS)
+    ])
+    db.session.execute(db.insert(Client), [
+        {'first_name': 'Client', 'last_name': str(i), 'email': f'client{i}@example.com', 'phone': '555-0100',
+         'client_type': 'Buyer', 'assigned_agent_id': i % AGENTS + 1}
+        for i in range(ROWS)
+    ])
+    db.session.execute(db.insert(Property), [
+        {'address': f'{i} Main St', 'city': 'Austin', 'state': 'TX', 'zip_code': '78701', 'property_type': 'Condo'}
+        for i in range(ROWS)
+    ])
+    db.session.execute(db.insert(Transaction), [
+        {'transaction_type': 'Purchase', 'transaction_status': 'Active', 'property_id': i + 1, 'client_id': i + 1,
+         'listing_agent_id': i % AGENTS + 1, 'buyer_agent_id': (i + 1) % AGENTS + 1, 'contract_date': date(2026, 1, 1)}
+        for i in range(ROWS)
+    ])
+    db.session.execute(db.insert(TransactionMilestone), [
+        {'transaction_id': i % ROWS + 1, 'milestone_name': f'Milestone {i}'}
+        for i in range(ROWS * 3)
+    ])
+    db.session.execute(db.insert(TransactionDocument), [
+        {'transaction_id': i % ROWS + 1, 'document_name': f'Document {i}', 'document_type': 'Contract',
+         'uploaded_by_id': 1}
+        for i in range(ROWS * 2)
+    ])
+    db.session.commit()
+
+def test_list_endpoints_stay_within_query_budgets(app):
+    counts = check_query_budgets(app, page_sizes=(1, 200))
+
+    assert set(counts) == set(ENDPOINT_QUERY_BUDGETS)
+    for path, (small_page, large_page) in counts.items():
+        # The query count does not grow with the page size
+        assert small_page == large_page, path
+
+@pytest.mark.parametrize('path, key', [('/api/leads', 'leads'), ('/api/transactions', 'transactions')])
+@pytest.mark.parametrize('page_size', [1, 200])
+def test_list_pages_are_full(app, path, key, page_size):
+    response, _ = assert_max_queries(app.test_client(), f'{path}?limit={page_size}', ENDPOINT_QUERY_BUDGETS[path])
+    rows = response.get_json()[key]
+
+    assert len(rows) == page_size
+    if key == 'transactions':
+        assert all(len(row['milestones']) == 3 and len(row['documents']) == 2 for row in rows)
+    else:
+        assert all('assigned_agent' in row for row in rows)
@@ -0,0 +1,149 @@
+import threading
+import time
+from contextlib import ExitStack
+from email.message import EmailMessage
+
+import pytest
+
+from src.automation.smtp_pool import SMTPConnectionPool
+from tests.smtp_server import StubSMTPServer
+
+@pytest.fixture
+def smtp_server():
+    server = StubSMTPServer().start()
+    yield server
+    server.stop()
+
+def make_pool(server, **kwargs):
+    kwargs.setdefault('use_tls', False)
+    kwargs.setdefault('timeout', 5)
+    return SMTPConnectionPool(server.host, server.port, **kwargs)
+
+def make_message(to_email='agent@example.com', subject='Test'):
+    message = EmailMessage()
+    message['From'] = 'crm@example.com'
+    message['To'] = to_email
+    message['Subject'] = subject
+    message.set_content('Body')
+    return message
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_sequential_sends_reuse_one_connection(smtp_server):
+    pool = make_pool(smtp_server, pool_size=2)
+
+    for number in range(5):
+        pool.send(make_message(subject=f'Message {number}'))
+    pool.close()
+
+    assert len(smtp_server.messages) == 5
+    assert smtp_server.connections_total == 1
+    assert smtp_server.count('EHLO') == 1
+    stats = pool.get_stats()
+    assert stats['connections_opened'] == 1
+    assert stats['messages_sent'] == 5
+
+def test_idle_connection_is_checked_with_noop(smtp_server):
+    pool = make_pool(smtp_server, keepalive_seconds=0)
+
+    pool.send(make_message())
+    pool.send(make_message())
+    pool.close()
+
+    assert smtp_server.count('NOOP') == 1
+    assert smtp_server.connections_total == 1
+
+def test_recently_used_connection_skips_noop(smtp_server):
+    pool = make_pool(smtp_server, keepalive_seconds=60)
+
+    pool.send(make_message())
+    pool.send(make_message())
+    pool.close()
+
+    assert smtp_server.count('NOOP') == 0
+
+def test_failed_noop_opens_a_new_connection(smtp_server):
+    pool = make_pool(smtp_server, keepalive_seconds=0)
+
+    pool.send(make_message())
+    smtp_server.drop_connections()
+    assert wait_for(lambda: not smtp_server.open_sockets)
+    pool.send(make_message())
+    pool.close()
+
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.connections_total == 2
+    assert pool.get_stats()['reconnects'] == 0
+
+def test_send_reconnects_after_server_drops_connection(smtp_server):
+    # A long keepalive skips the NOOP, so the drop only shows up on send
+    pool = make_pool(smtp_server, keepalive_seconds=60)
+
+    pool.send(make_message())
+    smtp_server.drop_connections()
+    assert wait_for(lambda: not smtp_server.open_sockets)
+    pool.send(make_message(subject='After drop'))
+    pool.close()
+
+    assert len(smtp_server.messages) == 2
+    assert b'After drop' in smtp_server.messages[1]
+    stats = pool.get_stats()
+    assert stats['reconnects'] == 1
+    assert stats['connections_opened'] == 2
+
+def test_send_copies_continue_on_a_fresh_connection(smtp_server):
+    pool = make_pool(smtp_server, keepalive_seconds=60)
+    pool.send(make_message())
+    smtp_server.drop_connections()
+    assert wait_for(lambda: not smtp_server.open_sockets)
+
+    recipients = [(f'agent{number}@example.com', None) for number in range(3)]
+    errors = pool.send_copies(make_message(), recipients)
+    pool.close()
+
+    assert errors == {}
+    assert len(smtp_server.messages) == 4
+    assert pool.get_stats()['reconnects'] == 1
+
+def test_pool_size_limits_open_connections(smtp_server):
+    pool = make_pool(smtp_server, pool_size=2)
+    acquired = threading.Event()
+
+    def borrow():
+        with pool.connection():
+            acquired.set()
+
+    with ExitStack() as stack:
+        stack.enter_context(pool.connection())
+        stack.enter_context(pool.connection())
+
+        waiter = threading.Thread(target=borrow)
+        waiter.start()
+        # Both slots are taken, so the third borrower waits
+        assert not acquired.wait(0.2)
+
+    waiter.join(2)
+    assert acquired.is_set()
+    assert pool.get_stats()['connections_opened'] == 2
+    pool.close()
+
+def test_concurrent_sends_stay_within_pool_size(smtp_server):
+    pool = make_pool(smtp_server, pool_size=2)
+
+    threads = [threading.Thread(target=pool.send, args=(make_message(subject=f'Message {number}'),))
+               for number in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    pool.close()
+
+    assert len(smtp_server.messages) == 10
+    assert smtp_server.max_concurrent <= 2
+    assert pool.get_stats()['connections_opened'] <= 2